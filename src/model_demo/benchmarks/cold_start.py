@@ -0,0 +1,100 @@
+"""
+Benchmark: cold start of the web service.
+
+    import time          `python -X importtime -c "import src.model_demo.web_service.fast_api"`, the self time of
+                         every imported module summed per top-level package, largest first
+    time to first        a fresh uvicorn process: time until it answers HTTP at all, until /ready returns 200
+    prediction           (model loaded and warmed up) and until the first /predict succeeds
+
+Run from the repository root (the app serves ./static and ./templates) with a trained model in
+models/model_demo.
+
+    python -m src.model_demo.benchmarks.cold_start
+    python -m src.model_demo.benchmarks.cold_start --top 25 --runs 5 --port 8123
+
+"""
+import argparse
+from collections import defaultdict
+import json
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+MODULE = "src.model_demo.web_service.fast_api"
+
+
+def import_times() -> dict[str, float]:
+    """ Self import time in seconds per top-level package, from one `python -X importtime` run. """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {MODULE}"],
+                            capture_output=True, text=True, check=True)
+    totals = defaultdict(float)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        package = ".".join(name.split(".")[:3]) if name.startswith("src.") else name.split(".")[0]
+        totals[package] += int(self_us) / 1e6
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+def _request(url: str, payload: dict | None = None) -> int:
+    data = None if payload is None else json.dumps(payload).encode()
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def time_to_first_prediction(port: int, timeout_s: float = 120.0) -> dict[str, float]:
+    """ Seconds from launching uvicorn until it first responds, is ready, and serves a prediction. """
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", f"{MODULE}:app", "--port", str(port), "--log-level", "warning"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    timings = {}
+    try:
+        while "ready_s" not in timings:
+            if time.perf_counter() - start > timeout_s or server.poll() is not None:
+                raise RuntimeError("The server did not become ready")
+            try:
+                status = _request(f"{base}/ready")
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+                continue
+            timings.setdefault("first_response_s", time.perf_counter() - start)
+            if status == 200:
+                timings["ready_s"] = time.perf_counter() - start
+            else:
+                time.sleep(0.005)
+        if _request(f"{base}/predict", {"feature_X_1": 10, "feature_X_2": 5}) != 200:
+            raise RuntimeError("The first prediction failed")
+        timings["first_prediction_s"] = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    return timings
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15, help="packages to list in the import time breakdown")
+    parser.add_argument("--runs", type=int, default=3, help="server launches to average")
+    parser.add_argument("--port", type=int, default=8123)
+    args = parser.parse_args()
+
+    totals = import_times()
+    print(f"import {MODULE}: {sum(totals.values()):.3f} s")
+    for package, seconds in list(totals.items())[:args.top]:
+        print(f"  {package:<40}{seconds * 1000:>10.1f} ms")
+
+    runs = [time_to_first_prediction(args.port) for _ in range(args.runs)]
+    print(f"\nuvicorn cold start, median of {args.runs} runs")
+    for key in ("first_response_s", "ready_s", "first_prediction_s"):
+        print(f"  {key:<40}{np.median([run[key] for run in runs]):>10.3f} s")
+
+if __name__ == "__main__":
+    main()
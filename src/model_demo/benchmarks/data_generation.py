@@ -0,0 +1,59 @@
+"""
+Benchmark: synthetic data generation, `synthesize_data` (one in-memory call) against the chunked
+`generate_sharded_dataset` with different numbers of worker processes.
+
+The chunked generator's time includes writing its shards to disk.
+The shard files must be byte-identical for every worker count; the benchmark checks it.
+
+    python -m src.model_demo.benchmarks.data_generation
+    python -m src.model_demo.benchmarks.data_generation --rows 200000000 --workers 1 4 8
+
+"""
+import argparse
+import hashlib
+import os
+from pathlib import Path
+import tempfile
+import time
+
+import torch
+
+from src.model_demo.data_prep.synthetic import generate_sharded_dataset
+from src.model_demo.utils import synthesize_data
+
+
+def digest(root: Path) -> str:
+    """ Hash of every shard file, in name order. """
+    sha = hashlib.sha256()
+    for path in sorted(root.glob("*.npy")):
+        sha.update(path.read_bytes())
+    return sha.hexdigest()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    size_gb = args.rows * 3 * 4 / 1e9
+    print(f"{args.rows} rows ({size_gb:.2f} GB float32), chunks of {args.chunk_rows}, {os.cpu_count()} CPUs")
+    print(f"{'':<22}{'seconds':>10}{'Mrows/s':>10}")
+
+    start = time.perf_counter()
+    synthesize_data(torch.tensor([2., -3.]), torch.tensor(4.), args.rows)
+    elapsed = time.perf_counter() - start
+    print(f"{'synthesize_data':<22}{elapsed:>10.2f}{args.rows / elapsed / 1e6:>10.1f}")
+
+    digests = set()
+    for workers in args.workers:
+        root = Path(tempfile.mkdtemp())
+        start = time.perf_counter()
+        generate_sharded_dataset(root, [2., -3.], 4., n_rows=args.rows, chunk_rows=args.chunk_rows, seed=0, workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"{f'sharded, {workers} workers':<22}{elapsed:>10.2f}{args.rows / elapsed / 1e6:>10.1f}")
+        digests.add(digest(root))
+    print(f"\nidentical output for every worker count: {len(digests) == 1}")
+
+if __name__ == "__main__":
+    main()
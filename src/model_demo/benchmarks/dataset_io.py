@@ -0,0 +1,60 @@
+"""
+Benchmark: the single `data_tensors.pt` pickle against the sharded, memory-mapped dataset.
+
+    open + first batch   time until the first training batch is available
+    full pass            time to read every row once, in batches (a streaming solver or evaluation pass)
+
+The .pt file has to be unpickled completely before anything can be used; the sharded dataset only maps
+its files and reads the pages that the batches touch. Run it twice to see the page-cache-warm numbers.
+
+    python -m src.model_demo.benchmarks.dataset_io
+    python -m src.model_demo.benchmarks.dataset_io --rows 50000000 --shard-rows 5000000
+
+"""
+import argparse
+from pathlib import Path
+import tempfile
+import time
+
+import torch
+
+from src.model_demo.datasets import ShardedDataset, ShardedDatasetWriter
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--shard-rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=65536)
+    args = parser.parse_args()
+
+    tmp_dir = Path(tempfile.mkdtemp())
+    X = torch.randn(args.rows, 2)
+    y = X @ torch.tensor([[2.], [-3.]]) + 4.
+    torch.save({"X_train": X, "y_train": y}, tmp_dir / "data_tensors.pt")
+    with ShardedDatasetWriter(tmp_dir / "data_shards", shard_rows=args.shard_rows) as writer:
+        writer.write("train", X, y)
+    del X, y
+    print(f"{args.rows} rows, {args.shard_rows} rows per shard, batches of {args.batch_size}")
+
+    def pt_batches():
+        tensors_dict = torch.load(tmp_dir / "data_tensors.pt")
+        return zip(tensors_dict["X_train"].split(args.batch_size), tensors_dict["y_train"].split(args.batch_size))
+
+    def sharded_batches():
+        return ShardedDataset(tmp_dir / "data_shards")["train"].batches(args.batch_size)
+
+    print(f"{'':<10}{'open + first batch':>20}{'full pass':>12}   (seconds)")
+    for name, batches in [(".pt", pt_batches), ("sharded", sharded_batches)]:
+        start = time.perf_counter()
+        iterator = iter(batches())
+        next(iterator)[0].sum()
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        for X_batch, _ in batches():
+            X_batch.sum()
+        full = time.perf_counter() - start
+        print(f"{name:<10}{first:>20.4f}{full:>12.3f}")
+
+if __name__ == "__main__":
+    main()
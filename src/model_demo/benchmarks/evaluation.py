@@ -0,0 +1,73 @@
+"""
+Benchmark: the previous `infer_evaluate_model` (one torch.cat per batch) against the preallocated version,
+with the predictions in memory and in a memory-mapped .npy file.
+
+The previous version copies everything predicted so far on every batch, so its time grows with the square
+of the number of batches; the preallocated one writes each batch into its slice of a buffer sized once.
+
+    python -m src.model_demo.benchmarks.evaluation
+    python -m src.model_demo.benchmarks.evaluation --rows 1000000 --batch-size 1000
+
+"""
+import argparse
+from pathlib import Path
+import tempfile
+import time
+
+import torch
+import torch.nn as nn
+
+from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.training import minibatches
+from src.model_demo.utils import infer_evaluate_model
+
+
+def previous_infer_evaluate_model(model, test_loader, criterion, device="cpu"):
+    """ The implementation before preallocation, kept for comparison. """
+    model.eval()
+    model.to(device)
+    predictions = torch.tensor([])
+    total_loss = 0.0
+    total_samples = 0
+    with torch.no_grad():
+        for inputs, labels in test_loader:
+            inputs, labels = inputs.to(device), labels.to(device)
+            outputs = model(inputs)
+            predictions = torch.cat((predictions, outputs))
+            loss = criterion(outputs, labels)
+            total_loss += loss.item() * inputs.size(0)
+            total_samples += inputs.size(0)
+    return predictions, total_loss / total_samples
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    X = torch.randn(args.rows, 2)
+    y = X @ torch.tensor([[2.], [-3.]]) + 4. + 0.1 * torch.randn(args.rows, 1)
+    model = LR(2, 1)
+    criterion = nn.MSELoss()
+    batches = lambda: minibatches(X, y, args.batch_size, shuffle=False)
+    tmp_dir = Path(tempfile.mkdtemp())
+
+    cases = {
+        "previous (torch.cat)": lambda: previous_infer_evaluate_model(model, batches(), criterion),
+        "preallocated": lambda: infer_evaluate_model(model, batches(), criterion, device="cpu", n_samples=args.rows),
+        "memmap": lambda: infer_evaluate_model(model, batches(), criterion, device="cpu", n_samples=args.rows,
+                                               predictions_path=tmp_dir / "predictions.npy"),
+    }
+    print(f"{args.rows} rows in {-(-args.rows // args.batch_size)} batches")
+    print(f"{'':<22}{'seconds':>10}{'loss':>12}")
+    for name, case in cases.items():
+        start = time.perf_counter()
+        predictions, result = case()
+        elapsed = time.perf_counter() - start
+        loss = result if isinstance(result, float) else result.loss
+        print(f"{name:<22}{elapsed:>10.3f}{loss:>12.5f}")
+    print(f"\nmetrics: {result}")
+
+if __name__ == "__main__":
+    main()
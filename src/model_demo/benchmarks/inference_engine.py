@@ -0,0 +1,68 @@
+"""
+Benchmark: `infer_model` against the prepared `LinearInferenceEngine` for batch sizes from 1 to 1M rows.
+
+    engine          torch backend, allocates the output tensor
+    engine+out      torch backend, writes into a preallocated output buffer
+    numpy           numpy backend (no torch on the serving path)
+    numpy+out       numpy backend with a preallocated output buffer
+
+    python -m src.model_demo.benchmarks.inference_engine
+    python -m src.model_demo.benchmarks.inference_engine --sizes 1 64 4096 --min-time 0.5
+
+"""
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.inference import LinearInferenceEngine
+from src.model_demo.utils import infer_model
+
+
+def time_per_call(fn, min_time: float) -> float:
+    """ Seconds per call, repeating until at least min_time has elapsed (after one warm-up call). """
+    fn()
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / calls
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds spent timing each case")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    model = LR(2, 1).eval()
+    engine = LinearInferenceEngine.from_model(model, device="cpu")
+    np_engine = LinearInferenceEngine.from_model(model, backend="numpy")
+
+    print(f"{'rows':>9}{'infer_model':>14}{'engine':>12}{'engine+out':>12}{'numpy':>12}{'numpy+out':>12}   (us/call)")
+    for n in args.sizes:
+        x = torch.randn(n, 2)
+        x_np = x.numpy()
+        out = torch.empty(n)
+        out_np = np.empty(n, dtype=np.float32)
+
+        reference = infer_model(model, x, device="cpu").reshape(-1)
+        assert torch.allclose(engine.predict(x), reference, atol=1e-5)
+        assert np.allclose(np_engine.predict(x_np), reference.numpy(), atol=1e-5)
+
+        cases = [
+            lambda: infer_model(model, x, device="cpu"),
+            lambda: engine.predict(x),
+            lambda: engine.predict(x, out=out),
+            lambda: np_engine.predict(x_np),
+            lambda: np_engine.predict(x_np, out=out_np),
+        ]
+        timings = [time_per_call(fn, args.min_time) * 1e6 for fn in cases]
+        print(f"{n:>9}" + "".join(f"{t:>12.1f}" if i else f"{t:>14.1f}" for i, t in enumerate(timings)))
+
+if __name__ == "__main__":
+    main()
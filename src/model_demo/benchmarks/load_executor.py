@@ -0,0 +1,102 @@
+"""
+Load test: p99 latency of small /predict requests while large /batch_predict requests run concurrently.
+
+Each executor mode ("inline" runs inference on the event loop as before, "thread" and "process" use the
+inference executor) is measured in its own subprocess, because the serving config is read when
+`fast_api` is imported. Requests go through an in-process ASGI client, so every request shares the one
+event loop of the app exactly like on a single uvicorn worker.
+
+    python -m src.model_demo.benchmarks.load_executor
+    python -m src.model_demo.benchmarks.load_executor --modes inline thread --batch-rows 100000 --duration 10
+
+"""
+import argparse
+import asyncio
+import json
+import logging
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+async def _small_client(client, stop_at: float, latencies: list) -> None:
+    payload = {"feature_X_1": 1.0, "feature_X_2": 2.0}
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        response = await client.post("/predict", json=payload)
+        if response.status_code == 200:
+            latencies.append((time.perf_counter() - start) * 1000)
+
+async def _batch_client(client, stop_at: float, rows: list, counts: dict) -> None:
+    payload = {"input_data": rows}
+    while time.perf_counter() < stop_at:
+        response = await client.post("/batch_predict", json=payload)
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+
+async def _phase(app, duration: float, small_clients: int, batch_clients: int, batch_rows: int) -> dict:
+    import httpx
+
+    rows = np.random.default_rng(0).normal(10, 3, (batch_rows, 2)).tolist()
+    latencies, batch_counts = [], {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        stop_at = time.perf_counter() + duration
+        await asyncio.gather(
+            *(_small_client(client, stop_at, latencies) for _ in range(small_clients)),
+            *(_batch_client(client, stop_at, rows, batch_counts) for _ in range(batch_clients)),
+            )
+    p50, p99 = np.percentile(latencies, [50, 99]) if latencies else (float("nan"), float("nan"))
+    return {
+        "small_requests": len(latencies),
+        "small_p50_ms": round(float(p50), 3),
+        "small_p99_ms": round(float(p99), 3),
+        "batch_responses": batch_counts,
+    }
+
+async def _run_child(args) -> dict:
+    from src.model_demo.configs.config import PathConfigSchema, ServingConfigSchema
+
+    # must happen before fast_api is imported, it reads the config at import time
+    ServingConfigSchema.executor = args.child
+    PathConfigSchema.data_dir = tempfile.mkdtemp(prefix="load_executor_")  # keep logs/predictions out of the repo
+
+    from src.model_demo.web_service import fast_api
+    logging.getLogger(fast_api.__name__).setLevel(logging.WARNING)
+
+    async with fast_api.app.router.lifespan_context(fast_api.app):
+        idle = await _phase(fast_api.app, args.duration, args.small_clients, 0, args.batch_rows)
+        loaded = await _phase(fast_api.app, args.duration, args.small_clients, args.batch_clients, args.batch_rows)
+    return {"executor": args.child, "small_only": idle, "with_batch_load": loaded}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["inline", "thread", "process"])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per phase")
+    parser.add_argument("--small-clients", type=int, default=16)
+    parser.add_argument("--batch-clients", type=int, default=2)
+    parser.add_argument("--batch-rows", type=int, default=50000)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_run_child(args))))
+        return
+
+    print(f"{'executor':<10}{'phase':<18}{'requests':>10}{'p50 ms':>10}{'p99 ms':>10}  batch responses")
+    for mode in args.modes:
+        out = subprocess.run(
+            [sys.executable, "-m", __spec__.name, "--child", mode, "--duration", str(args.duration),
+             "--small-clients", str(args.small_clients), "--batch-clients", str(args.batch_clients),
+             "--batch-rows", str(args.batch_rows)],
+            capture_output=True, text=True, check=True,
+            )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        for phase in ("small_only", "with_batch_load"):
+            r = result[phase]
+            print(f"{mode:<10}{phase:<18}{r['small_requests']:>10}{r['small_p50_ms']:>10}{r['small_p99_ms']:>10}  {r['batch_responses']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Microbenchmark: per-request overhead of turning a `/predict` body into a model input (and a log line).
+
+"pandas" is the previous path: one-row DataFrame -> NumPy -> tensor, plus the DataFrame repr that went
+into the log message and predictions.txt. "direct" is the current path: a tensor built straight from the
+`PredictionFeatures` fields and a plain string for the log. Both paths run the same forward pass, and
+their outputs are checked to match before timing.
+
+    python -m src.model_demo.benchmarks.predict_overhead
+    python -m src.model_demo.benchmarks.predict_overhead --repeat 20000
+
+"""
+import argparse
+import timeit
+
+import torch
+
+from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.utils import PredictionFeatures, infer_model
+
+
+def pandas_path(model, features: PredictionFeatures):
+    import pandas as pd
+
+    input_df = pd.DataFrame([{
+        "X_1": features.feature_X_1,
+        "X_2": features.feature_X_2
+    }])
+    inputs = torch.tensor(input_df.to_numpy(), dtype=torch.float32)
+    outputs = infer_model(model, inputs).tolist()
+    message = f"Input: {input_df}, Prediction: {outputs}"
+    return outputs, message
+
+def direct_path(model, features: PredictionFeatures):
+    row = [float(features.feature_X_1), float(features.feature_X_2)]
+    inputs = torch.tensor([row], dtype=torch.float32)
+    outputs = infer_model(model, inputs).tolist()
+    message = f"Input: X_1={features.feature_X_1}, X_2={features.feature_X_2}, Prediction: {outputs}"
+    return outputs, message
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5000, help="requests per measurement")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    model = LR(2, 1).eval()
+    features = PredictionFeatures(feature_X_1=20, feature_X_2=10.5)
+
+    assert pandas_path(model, features)[0] == direct_path(model, features)[0], "paths disagree"
+
+    results = {}
+    for name, fn in (("pandas", pandas_path), ("direct", direct_path)):
+        fn(model, features)  # warm up (imports, allocator)
+        best = min(timeit.repeat(lambda: fn(model, features), number=args.repeat, repeat=3))
+        results[name] = best / args.repeat * 1e6
+        print(f"{name:<8}{results[name]:>10.1f} us/request")
+    print(f"speedup  {results['pandas'] / results['direct']:>10.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: startup time and per-batch throughput of the serving runtimes.
+
+Startup is measured in fresh subprocesses (imports included, interpreter start excluded):
+    eager        import config + torch, build LR(2,1), load_state_dict from the .pth weights
+    torchscript  import torch, torch.jit.load the exported artifact, torch.jit.freeze it
+Throughput compares, per batch size, the eager module, the frozen TorchScript module, the prepared
+inference engine (the API default) and, with --compile, a torch.compile'd module (compile time reported).
+
+    python -m src.model_demo.benchmarks.serving_artifact
+    python -m src.model_demo.benchmarks.serving_artifact --compile --sizes 1 1024 1048576
+
+"""
+import argparse
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import torch
+
+from src.model_demo.benchmarks.inference_engine import time_per_call
+from src.model_demo.configs.config import MetadataConfigSchema
+from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.inference import LinearInferenceEngine
+from src.model_demo.models.model_demo import export_serving_artifact
+
+warnings.filterwarnings("ignore", category=FutureWarning)  # TorchScript deprecation notices in recent torch
+
+STARTUP_SNIPPETS = {
+    "eager": """
+import time; start = time.perf_counter()
+import torch
+from src.model_demo.configs.config import LinearRegressionModel as LR
+model = LR(2, 1)
+model.load_state_dict(torch.load({weights!r}, weights_only=True))
+model.eval()
+print(time.perf_counter() - start)
+""",
+    "torchscript": """
+import time; start = time.perf_counter()
+import warnings; warnings.filterwarnings("ignore", category=FutureWarning)
+import torch
+model = torch.jit.freeze(torch.jit.load({scripted!r}).eval())
+print(time.perf_counter() - start)
+""",
+}
+
+
+def startup_seconds(snippet: str, repeat: int) -> float:
+    """ Median import + load time over fresh interpreters. """
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 64, 4096, 262144, 1048576])
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per startup measurement")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds spent timing each case")
+    parser.add_argument("--compile", action="store_true", help="also measure torch.compile (needs a working inductor toolchain)")
+    args = parser.parse_args()
+
+    cfg = MetadataConfigSchema()
+    weights = Path(cfg.path.model_dir) / cfg.fname.model_fname
+    model = LR(2, 1)
+    model.load_state_dict(torch.load(weights, weights_only=True))
+    model.eval()
+
+    scripted_path = Path(cfg.path.model_dir) / cfg.fname.scripted_model_fname
+    if not scripted_path.exists():
+        scripted_path = Path(tempfile.mkdtemp()) / cfg.fname.scripted_model_fname
+        export_serving_artifact(model, scripted_path)
+
+    print("Startup (import + load, median of fresh interpreters)")
+    for name, snippet in STARTUP_SNIPPETS.items():
+        seconds = startup_seconds(snippet.format(weights=str(weights), scripted=str(scripted_path)), args.repeat)
+        print(f"  {name:<12}{seconds * 1000:>10.1f} ms")
+
+    runtimes = {
+        "eager": model,
+        "torchscript": torch.jit.freeze(torch.jit.load(scripted_path).eval()),
+        "engine": LinearInferenceEngine.from_model(model),
+    }
+    if args.compile:
+        compiled = torch.compile(model, dynamic=True)
+        start = time.perf_counter()
+        with torch.inference_mode():
+            compiled(torch.randn(8, 2))
+        print(f"  {'compile':<12}{(time.perf_counter() - start) * 1000:>10.1f} ms (first torch.compile call)")
+        runtimes["compiled"] = compiled
+
+    print("\nThroughput (million rows/s)")
+    print(f"{'rows':>9}" + "".join(f"{name:>13}" for name in runtimes))
+    for n in args.sizes:
+        x = torch.randn(n, 2)
+        row = []
+        with torch.inference_mode():
+            for runtime in runtimes.values():
+                seconds = time_per_call(lambda: runtime(x), args.min_time)
+                row.append(n / seconds / 1e6)
+        print(f"{n:>9}" + "".join(f"{value:>13.2f}" for value in row))
+
+if __name__ == "__main__":
+    main()
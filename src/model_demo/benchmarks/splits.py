@@ -0,0 +1,63 @@
+"""
+Benchmark: the copying train/test split data_prep used against the index-based splits.
+
+    choice + delete   np.random.choice(..., replace=False) for the train rows, np.delete for the test rows
+    permutation       permutation_split, rows gathered batch by batch through a RowSubset (one epoch)
+    offsets           offset_split, every batch a view of the data
+
+Peak memory is what numpy allocates on top of the data, measured with tracemalloc (which does not see torch's
+allocator, but the per-batch gathers are only batch-sized).
+
+    python -m src.model_demo.benchmarks.splits
+    python -m src.model_demo.benchmarks.splits --rows 50000000
+
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import torch
+
+from src.model_demo.splits import RowSubset, offset_split, permutation_split
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--batch-size", type=int, default=65536)
+    args = parser.parse_args()
+
+    X = np.random.default_rng(0).standard_normal((args.rows, 2), dtype=np.float32)
+    y = X @ np.array([[2.], [-3.]], dtype=np.float32) + 4.
+    print(f"{args.rows} rows, {X.nbytes / 2**20:.0f} MiB of X, batches of {args.batch_size}")
+
+    def choice_delete():
+        index = np.random.choice(len(X), size=int(len(X) * 0.8), replace=False)
+        X_train, y_train = X[index], y[index]
+        X_test, y_test = np.delete(X, index, axis=0), np.delete(y, index, axis=0)
+        for X_batch in torch.from_numpy(X_train).split(args.batch_size):
+            X_batch.sum()
+
+    def permutation():
+        train_rows, test_rows = permutation_split(len(X), 0.8, seed=0)
+        for X_batch, _ in RowSubset(X, y, train_rows).batches(args.batch_size):
+            X_batch.sum()
+
+    def offsets():
+        train_rows, test_rows = offset_split(len(X), 0.8)
+        for X_batch, _ in RowSubset(X, y, train_rows).batches(args.batch_size):
+            X_batch.sum()
+
+    print(f"{'':<18}{'split + epoch':>14}{'peak memory':>14}")
+    for name, run in [("choice + delete", choice_delete), ("permutation", permutation), ("offsets", offsets)]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:<18}{elapsed:>12.3f} s{peak / 2**20:>10.0f} MiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Microbenchmark suite with a stored baseline.
+
+The other scripts in this directory compare two implementations once and print a table. This suite times
+the building blocks of the project at fixed sizes and seeds:
+    synthesize_data, norm, load_data iteration, infer_model, infer_evaluate_model, one training step, and
+    the /predict and /batch_predict handlers, called in-process through the ASGI test client.
+It then compares every case with the stored `baseline.json`. A case whose best time exceeds its baseline
+by more than `--tolerance` is a regression, and the run exits with status 1, so it can gate CI.
+
+Every case is set up after `seed_everything(0)`, warmed up, then timed in `--rounds` rounds of calibrated
+length. It is compared by its best round, which other load on the machine can only make slower, so it is
+steadier than the median (also recorded).
+
+Timings only compare within one environment (Python, torch and numpy versions, CPU count, torch threads), so
+`baseline.json` keeps one baseline per environment. A run without a baseline for its own environment reports
+"no baseline for this environment" and exits with status 0, or 1 with `--require-baseline`; record one there
+with `--save-baseline`. CI records its baseline from the parent commit on the same runner, then gates on it:
+
+    python -m src.model_demo.benchmarks.suite --save-baseline --baseline /tmp/ci-baseline.json   # at HEAD^
+    python -m src.model_demo.benchmarks.suite --require-baseline --baseline /tmp/ci-baseline.json
+
+    python -m src.model_demo.benchmarks.suite                      # run every case, compare with baseline.json
+    python -m src.model_demo.benchmarks.suite -k infer -k predict  # cases whose name contains "infer" or "predict"
+    python -m src.model_demo.benchmarks.suite --save-baseline      # record a new baseline (after an intended change)
+
+"""
+import argparse
+from contextlib import ExitStack
+from functools import partial
+import json
+import logging
+import os
+from pathlib import Path
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from src.model_demo.configs.config import LinearRegressionModel as LR
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+SEED = 0
+
+# name[size] -> setup(size), which prepares the inputs and returns the zero-argument call that is timed
+CASES: dict[str, Callable[[], Callable[[], object]]] = {}
+# resources shared by several cases (the API test client), closed when the run ends
+_resources = ExitStack()
+_api_client = None
+
+
+def case(name: str, sizes: tuple[int, ...]) -> Callable:
+    """ Register `setup(size)` as the cases name[size] for every size. """
+    def register(setup: Callable[[int], Callable[[], object]]) -> Callable:
+        for size in sizes:
+            CASES[f"{name}[{size}]"] = partial(setup, size)
+        return setup
+    return register
+
+def seed_everything(seed: int = SEED) -> None:
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+@case("synthesize_data", (1_000, 1_000_000))
+def _synthesize_data(rows: int):
+    from src.model_demo.utils import synthesize_data
+
+    w, b = torch.tensor([2., -3.]), torch.tensor(4.)
+    return lambda: synthesize_data(w, b, rows)
+
+@case("norm", (1_000, 1_000_000))
+def _norm(rows: int):
+    from src.model_demo.utils import norm
+
+    x = np.random.normal(10, 3, rows)
+    return lambda: norm(x)
+
+@case("load_data", (1_000, 10_000))
+def _load_data(rows: int):
+    from src.model_demo.utils import load_data
+
+    tensors = (torch.randn(rows, 2), torch.randn(rows, 1))
+
+    def iterate():
+        for _ in load_data(tensors, 100, is_train=True):
+            pass
+    return iterate
+
+@case("infer_model", (1, 10_000, 1_000_000))
+def _infer_model(rows: int):
+    from src.model_demo.utils import infer_model
+
+    model, x = LR(2, 1), torch.randn(rows, 2)
+    return lambda: infer_model(model, x, device="cpu")
+
+@case("infer_evaluate_model", (10_000, 1_000_000))
+def _infer_evaluate_model(rows: int):
+    from src.model_demo.utils import infer_evaluate_model
+
+    model, criterion = LR(2, 1), nn.MSELoss()
+    X, y = torch.randn(rows, 2), torch.randn(rows, 1)
+    batches = list(zip(X.split(1000), y.split(1000)))
+    return lambda: infer_evaluate_model(model, batches, criterion, device="cpu", n_samples=rows)
+
+@case("train_step", (100, 10_000))
+def _train_step(batch_size: int):
+    model, criterion = LR(2, 1), nn.MSELoss()
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.01)
+    X, y = torch.randn(batch_size, 2), torch.randn(batch_size, 1)
+
+    def step():
+        optimizer.zero_grad(set_to_none=True)
+        criterion(model(X), y).backward()
+        optimizer.step()
+    return step
+
+def api_client():
+    """ A test client of the API with the model loaded, its log and audit files in a temporary directory. """
+    global _api_client
+    if _api_client is None:
+        from fastapi.testclient import TestClient
+
+        from src.model_demo.configs.config import PathConfigSchema
+
+        _resources.callback(setattr, PathConfigSchema, "data_dir", PathConfigSchema.data_dir)  # restored by close()
+        PathConfigSchema.data_dir = _resources.enter_context(tempfile.TemporaryDirectory())
+        from src.model_demo.web_service import fast_api
+
+        # thousands of per-request INFO records would be written to the console while timing
+        logging.getLogger(fast_api.__name__).setLevel(logging.WARNING)
+        _api_client = _resources.enter_context(TestClient(fast_api.app))
+        deadline = time.monotonic() + 30
+        while _api_client.get("/ready").status_code != 200:
+            if time.monotonic() > deadline:
+                raise RuntimeError("The API did not become ready, is there a trained model in models/model_demo?")
+            time.sleep(0.01)
+    return _api_client
+
+@case("api_predict", (1,))
+def _api_predict(_: int):
+    client = api_client()
+    return lambda: client.post("/predict", json={"feature_X_1": 20.0, "feature_X_2": 10.5}).raise_for_status()
+
+@case("api_batch_predict", (10, 1_000))
+def _api_batch_predict(rows: int):
+    client = api_client()
+    body = {"input_data": np.random.normal(10, 3, (rows, 2)).round(4).tolist()}
+    return lambda: client.post("/batch_predict", json=body).raise_for_status()
+
+
+def measure(fn: Callable[[], object], min_time: float = 0.5, rounds: int = 7) -> dict:
+    """
+    Seconds per call in `rounds` rounds of at least min_time / rounds each. Calls made during a warm-up of
+    the same length set how many calls make up a round.
+    """
+    warmup_calls, start = 0, time.perf_counter()
+    while warmup_calls == 0 or time.perf_counter() - start < min_time / rounds:
+        fn()
+        warmup_calls += 1
+    calls = max(1, round(warmup_calls * min_time / rounds / (time.perf_counter() - start)))
+    per_call = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        per_call.append((time.perf_counter() - start) / calls)
+    return {"min_s": min(per_call), "median_s": statistics.median(per_call), "calls_per_round": calls,
+            "rounds_s": per_call}
+
+def run(names: list[str], min_time: float = 0.5, rounds: int = 7, log: Callable[[str], None] = print) -> dict:
+    """ Set up and measure the named cases in order; {case: measurement}. Shared resources stay open until close(). """
+    results = {}
+    for name in names:
+        seed_everything()
+        results[name] = measure(CASES[name](), min_time, rounds)
+        log(f"{name:<34}{results[name]['min_s'] * 1e6:>14.1f} us")
+    return results
+
+def close() -> None:
+    global _api_client
+    _resources.close()
+    _api_client = None
+
+def environment() -> dict:
+    return {"python": platform.python_version(), "torch": torch.__version__, "numpy": np.__version__,
+            "machine": platform.machine(), "cpus": os.cpu_count(), "torch_threads": torch.get_num_threads()}
+
+def load_baselines(path: Path) -> list[dict]:
+    """ The baselines stored at path, one report per environment ([] when there is no file). """
+    if not path.exists():
+        return []
+    stored = json.loads(path.read_text())
+    return stored["baselines"] if "baselines" in stored else [stored]  # a single report, as first recorded
+
+def find_baseline(baselines: list[dict], env: dict) -> dict | None:
+    """ The baseline recorded in exactly this environment, if any. """
+    return next((baseline for baseline in baselines if baseline["environment"] == env), None)
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.3) -> list[dict]:
+    """
+    One row per measured case: its best time per call against the baseline's. status is "regression" when it
+    is more than `tolerance` slower, "faster" when more than `tolerance` faster, "new" without a baseline.
+    """
+    rows = []
+    for name, result in results.items():
+        old = baseline["results"].get(name)
+        ratio = result["min_s"] / old["min_s"] if old else None
+        if ratio is None:
+            status = "new"
+        elif ratio > 1 + tolerance:
+            status = "regression"
+        elif ratio < 1 / (1 + tolerance):
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append({"case": name, "baseline_s": old["min_s"] if old else None, "min_s": result["min_s"],
+                     "ratio": ratio, "status": status})
+    return rows
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="patterns", action="append", default=[], help="only cases whose name contains this (repeatable)")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds spent timing each case")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown against the baseline, 0.3 = 30%%")
+    parser.add_argument("--retries", type=int, default=2, help="times a case over the tolerance is measured again before it fails")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store the measurements as the new baseline")
+    parser.add_argument("--require-baseline", action="store_true", help="exit with status 1 when there is no baseline for this environment")
+    parser.add_argument("--output", type=Path, default=None, help="also write the measurements to this JSON file")
+    args = parser.parse_args(argv)
+
+    names = [name for name in CASES if not args.patterns or any(p in name for p in args.patterns)]
+    baselines = load_baselines(args.baseline)
+    baseline = find_baseline(baselines, environment())
+    try:
+        results = run(names, args.min_time, args.rounds)
+        # a slow measurement can be noise from other load on the machine: a regression has to be slow every time
+        for _ in range(0 if args.save_baseline or baseline is None else args.retries):
+            slow = [row["case"] for row in compare(results, baseline, args.tolerance) if row["status"] == "regression"]
+            if not slow:
+                break
+            print(f"Measuring again: {', '.join(slow)}")
+            for name, result in run(slow, args.min_time, args.rounds).items():
+                if result["min_s"] < results[name]["min_s"]:
+                    results[name] = result
+    finally:
+        close()
+    report = {"environment": environment(), "settings": {"min_time": args.min_time, "rounds": args.rounds, "seed": SEED},
+              "results": results}
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        if baseline is not None and args.patterns:
+            # a partial run only replaces the cases it measured
+            report["results"] = {**baseline["results"], **results}
+        baselines = [other for other in baselines if other is not baseline] + [report]
+        args.baseline.write_text(json.dumps({"baselines": baselines}, indent=2))
+        print(f"Baseline for {report['environment']} saved to {args.baseline}")
+        return
+    if baseline is None:
+        # timings from another machine or library version would flag (or hide) regressions that are not there
+        print(f"No baseline for this environment ({report['environment']}) in {args.baseline}; "
+              "record one with --save-baseline")
+        if args.require_baseline:
+            sys.exit(1)
+        return
+    rows = compare(results, baseline, args.tolerance)
+    print(f"\n{'case':<34}{'baseline us':>14}{'now us':>14}{'ratio':>8}  status")
+    for row in rows:
+        baseline_us = f"{row['baseline_s'] * 1e6:.1f}" if row["baseline_s"] else "-"
+        ratio = f"{row['ratio']:.2f}" if row["ratio"] else "-"
+        print(f"{row['case']:<34}{baseline_us:>14}{row['min_s'] * 1e6:>14.1f}{ratio:>8}  {row['status']}")
+    regressions = [row["case"] for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
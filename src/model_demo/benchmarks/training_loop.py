@@ -0,0 +1,87 @@
+"""
+Benchmark: the previous training loop against `training.fit` and the closed-form solvers, in wall time,
+epochs per second and final training loss.
+
+    previous           a DataLoader pass per epoch (num_workers=2), then one optimizer step on the last batch only
+    fit                on-device shuffled mini-batches, one optimizer step per batch
+    normal_equations   closed form, see solvers.py (one pass, no epochs)
+    lstsq
+    streaming_qr
+
+The SGD loops start from the same initial weights and use the configured learning rate and batch size.
+The final loss is the MSE over the whole training set.
+
+    python -m src.model_demo.benchmarks.training_loop
+    python -m src.model_demo.benchmarks.training_loop --rows 100000 --epochs 20
+
+"""
+import argparse
+import copy
+import time
+import warnings
+
+import torch
+import torch.nn as nn
+
+from src.model_demo.configs.config import MetadataConfigSchema
+from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.datasets import load_tensors
+from src.model_demo.solvers import SOLVERS, fit_closed_form
+from src.model_demo.training import fit
+from src.model_demo.utils import load_data, synthesize_data
+
+warnings.filterwarnings("ignore", category=UserWarning, module="torch.utils.data")  # pin_memory/num_workers notices
+
+
+def previous_loop(model, X, y, optimizer, criterion, epochs: int, batch_size: int) -> None:
+    """ The loop `train()` used to run, kept verbatim apart from logging. """
+    data_iter = load_data((X, y), batch_size)
+    for epoch in range(epochs):
+        for X_batch, y_batch in data_iter:
+            X_batch, y_batch = X_batch.to("cpu"), y_batch.to("cpu")
+        optimizer.zero_grad()
+        loss = criterion(model(X_batch), y_batch)
+        loss.backward()
+        optimizer.step()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=0, help="synthesize this many training rows instead of loading data_tensors.pt")
+    parser.add_argument("--epochs", type=int, default=None)
+    args = parser.parse_args()
+
+    cfg = MetadataConfigSchema()
+    params = cfg.modelinstance
+    epochs = args.epochs or params.epochs
+    torch.manual_seed(0)
+    if args.rows:
+        X, y = synthesize_data(torch.tensor([2., -3.]), torch.tensor(4.), args.rows)
+        X = (X - X.mean(0)) / X.std(0)  # normalized like data_prep.py, otherwise SGD at lr 0.01 diverges
+    else:
+        tensors_dict = load_tensors(cfg.path.data_dir, cfg.fname.data_fname, cfg.fname.dataset_dirname)
+        X, y = tensors_dict["X_train"], tensors_dict["y_train"]
+
+    initial = LR(X.shape[-1], y.shape[-1])
+    criterion = nn.MSELoss()
+    loops = {
+        "previous": lambda model, optimizer: previous_loop(model, X, y, optimizer, criterion, epochs, params.batch_size),
+        "fit": lambda model, optimizer: fit(model, X, y, optimizer, criterion, epochs, params.batch_size),
+    }
+    for solver in SOLVERS[1:]:
+        loops[solver] = lambda model, optimizer, solver=solver: fit_closed_form(model, X, y, solver, params.solver_chunk_rows)
+
+    print(f"{len(X)} rows, batch_size {params.batch_size}, {epochs} epochs")
+    print(f"{'loop':<18}{'seconds':>10}{'epochs/s':>12}{'final loss':>14}")
+    for name, loop in loops.items():
+        model = copy.deepcopy(initial)
+        optimizer = torch.optim.SGD(model.parameters(), lr=params.learning_rate)
+        start = time.perf_counter()
+        loop(model, optimizer)
+        elapsed = time.perf_counter() - start
+        with torch.no_grad():
+            final_loss = criterion(model(X), y).item()
+        rate = f"{epochs / elapsed:>12.2f}" if name in ("previous", "fit") else f"{'-':>12}"
+        print(f"{name:<18}{elapsed:>10.4f}{rate}{final_loss:>14.4g}")
+
+if __name__ == "__main__":
+    main()
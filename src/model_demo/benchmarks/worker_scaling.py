@@ -0,0 +1,85 @@
+"""
+Benchmark: /batch_predict throughput of serve.py with 1 to N worker processes.
+
+For every worker count a fresh `serve.py` is started (the model loaded once, weights shared, cores split
+between the workers), and client processes send /batch_predict requests over keep-alive connections for
+a fixed time. Clients run on the same machine, so leave some cores for them or compare the relative scaling.
+
+    python -m src.model_demo.benchmarks.worker_scaling
+    python -m src.model_demo.benchmarks.worker_scaling --workers 1 2 4 8 --rows 256 --duration 10
+
+"""
+import argparse
+import http.client
+import json
+from multiprocessing import Pool
+import os
+import subprocess
+import sys
+import time
+
+
+def _client(port: int, body: bytes, duration: float) -> int:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Content-Type": "application/json"}
+    done, stop_at = 0, time.perf_counter() + duration
+    while time.perf_counter() < stop_at:
+        connection.request("POST", "/batch_predict", body, headers)
+        response = connection.getresponse()
+        response.read()
+        done += response.status == 200
+    connection.close()
+    return done
+
+def _wait_until_ready(port: int, workers: int, timeout_s: float = 120.0) -> None:
+    # /ready lands on any worker; several 200s in a row make it likely that all of them are up
+    deadline, streak = time.perf_counter() + timeout_s, 0
+    while streak < 4 * workers:
+        if time.perf_counter() > deadline:
+            raise RuntimeError("serve.py did not become ready")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/ready")
+            streak = streak + 1 if connection.getresponse().status == 200 else 0
+            connection.close()
+        except (ConnectionError, OSError):
+            streak = 0
+            time.sleep(0.05)
+
+def measure(workers: int, clients: int, rows: int, duration: float, port: int) -> float:
+    """ Successful requests per second against serve.py with `workers` processes. """
+    server = subprocess.Popen([sys.executable, "-m", "src.model_demo.web_service.serve", "--workers", str(workers),
+                               "--port", str(port)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_until_ready(port, workers)
+        body = json.dumps({"input_data": [[10.0, 5.0]] * rows}).encode()
+        with Pool(clients) as pool:
+            start = time.perf_counter()
+            done = sum(pool.starmap(_client, [(port, body, duration)] * clients))
+            elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    return done / elapsed
+
+def main() -> None:
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, *(n for n in (2, 4, 8, 16) if n <= cpus), cpus}))
+    parser.add_argument("--clients", type=int, default=0, help="client processes, 0 for 2 per worker")
+    parser.add_argument("--rows", type=int, default=64, help="rows per /batch_predict request")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8124)
+    args = parser.parse_args()
+
+    print(f"{cpus} CPUs, {args.rows} rows per request, {args.duration}s per run")
+    print(f"{'workers':>8}{'requests/s':>14}{'speedup':>10}")
+    baseline = None
+    for workers in args.workers:
+        throughput = measure(workers, args.clients or 2 * workers, args.rows, args.duration, args.port)
+        baseline = baseline or throughput
+        print(f"{workers:>8}{throughput:>14.1f}{throughput / baseline:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -32,15 +32,33 @@ class ModelParametersConfigSchema:
     """ Configuration schema for the model training parameters. """
     test_after_training: bool =True
     train_size: float = 0.8
+    split_method: str = "offsets"    # data_prep train/test split: "offsets" (rows are i.i.d.), "permutation" or "stratified"
+    split_buckets: int = 10          # target quantile buckets of the stratified split
+    sample_size: int = 1000          # rows of synthetic data generated by data_prep
+    data_seed: int = 0               # seed of the chunked generator, same data for any data_workers
+    data_workers: int = 0            # data_prep generator processes, 0 for one per CPU
+    data_format: str = "sharded"     # data_prep output: "sharded" (memory-mapped .npy shards + manifest) or "pt" (one torch.save file)
+    shard_rows: int = 1000000        # rows per shard file of the sharded dataset
     batch_size: int = 100   # batch_size should be a positive integer value
     epochs: int = 100
     learning_rate: float = 0.01
+    normalize_features: bool = True  # fit per-feature mean/std on the training set, saved as fname.normalizer_fname
+    solver: str = "sgd"              # "sgd", or an exact least-squares fit: "normal_equations", "lstsq", "streaming_qr"
+    solver_chunk_rows: int = 65536   # rows per chunk for the streaming solvers
+    grad_accumulation_steps: int = 1    # batches per optimizer step
+    early_stopping_patience: int = 0    # stop after this many epochs without improvement, 0 disables
+    early_stopping_min_delta: float = 0.0  # smallest epoch loss decrease that counts as an improvement
+    export_torchscript: bool = True  # also save a TorchScript serving artifact next to the weights
+    register_model: bool = True      # publish the trained artifacts as a new version of the model registry
+    registry_keep_versions: int = 5  # registry versions kept for rollback, 0 keeps all
 
 @dataclass
 class PathConfigSchema:
     """ Configuration schema for paths.  """
     data_dir: str = "data/model_demo"
     model_dir: str = "models/model_demo"
+    registry_dir: str = "models/model_demo/registry"  # versioned model artifacts, see registry.py
+    models_dir: str = "models/model_demo/models"     # one subdirectory per model id served under /models/{id}/
 # Default values for fields can be provided using the normal assignment syntax or by providing a value to the default argument
 
 
@@ -49,8 +67,45 @@ class FNameConfigSchema:
     """ Configuration schema for file names. """
     # non-default argument should preceed default argument
     data_fname: str = "data_tensors.pt"
+    dataset_dirname: str = "data_shards"  # sharded dataset directory, read instead of data_fname when it exists
     data_prep_log_fname: str = "data_logfile.log"
     model_fname: str = "demo_model_weights.pth"
+    normalizer_fname: str = "demo_model_normalizer.json"  # feature mean/std the model was trained with, folded in at serving
+    scripted_model_fname: str = "demo_model_scripted.pt"  # TorchScript serving artifact, loaded by the API when present
+    audit_fname: str = "predictions.jsonl"
+
+@dataclass
+class ServingConfigSchema:
+    """ Configuration schema for the model serving (web service) parameters. """
+    enable_batching: bool = True   # coalesce single-row /predict requests into one forward pass
+    max_batch_size: int = 64       # dispatch as soon as this many rows are queued
+    max_wait_ms: float = 2.0       # or once the oldest queued row has waited this long
+    runtime: str = "engine"        # how inference runs: "engine" (prepared engine), "torchscript" (frozen graph) or "eager"
+    engine_backend: str = "torch"  # prepared inference engine backend: "torch" or "numpy"
+    executor: str = "thread"       # where inference runs: "thread", "process" or "inline" (on the event loop)
+    max_workers: int = 4           # size of the inference thread/process pool
+    max_queue_depth: int = 256     # pending inference jobs allowed before requests get a 503
+    stream_chunk_rows: int = 8192  # rows per inference call on /batch_predict/stream
+    stream_max_line_bytes: int = 65536  # longest NDJSON line /batch_predict/stream buffers before answering with an error line
+    ready_timeout_s: float = 30.0  # how long requests arriving while the model still loads wait for it
+    workers: int = 1               # uvicorn worker processes started by serve.py, sharing one copy of the weights
+    threads_per_worker: int = 0    # torch intra-op threads per worker process, 0 for cores // workers under serve.py (torch's default otherwise)
+    registry_poll_s: float = 1.0   # how often the server checks the registry's LATEST version, 0 disables hot reload
+    model_cache_mb: float = 256.0  # memory budget of the /models/{id} model cache (LRU eviction), 0 for no limit
+    result_cache_entries: int = 0  # rows kept in the /predict and /batch_predict result cache, 0 disables it
+    result_cache_ttl_s: float = 300.0  # seconds a cached prediction stays valid, 0 for no expiry
+    result_cache_max_rows: int = 1000  # larger /batch_predict requests bypass the result cache (lookups cost ~1us per row)
+    log_mode: str = "queue"        # API logging: "queue" (formatted and written on a listener thread) or "sync"
+    log_format: str = "json"       # API log records: "json" (one object per line) or "text"
+    log_sample_rate: float = 1.0   # share of the per-request prediction log records that are kept
+    log_max_items: int = 8         # logged inputs/predictions are cut to this many rows (shape and dtype are kept)
+    log_max_chars: int = 512       # and strings to this many characters
+    audit_format: str = "jsonl"    # prediction audit log format: "jsonl" or "parquet" (needs pyarrow)
+    audit_flush_size: int = 512    # the audit writer flushes every audit_flush_size records
+    audit_flush_interval_s: float = 1.0  # or every audit_flush_interval_s seconds
+    audit_max_bytes: int = 52428800      # rotate the audit file at 50MB
+    audit_backup_count: int = 5
+    audit_max_queue_rows: int = 1000000  # rows waiting to be written; records past it are dropped and counted (/stats/audit)
 
 @dataclass
 class MetadataConfigSchema:
@@ -60,6 +115,7 @@ class MetadataConfigSchema:
     path: PathConfigSchema = PathConfigSchema
     fname: FNameConfigSchema = FNameConfigSchema
     modelinstance: ModelParametersConfigSchema = ModelParametersConfigSchema
+    serving: ServingConfigSchema = ServingConfigSchema
 
 
 # Pydantic is unable to generate a schema for a custom class torch.nn.Linear    
@@ -7,8 +7,11 @@ from pathlib import Path
 
 import numpy as np
 import numpy.typing as npt
-from src.model_demo.utils import synthesize_data, norm
+from src.model_demo.utils import synthesize_data
 from src.model_demo.configs.config import MetadataConfigSchema
+from src.model_demo.data_prep.synthetic import generate_sharded_dataset
+from src.model_demo.datasets import DATA_FORMATS
+from src.model_demo.splits import RowSubset, train_test_rows
 import torch
 
 
@@ -46,34 +49,54 @@ def main(cfg: MetadataConfigSchema) -> None:
     true_w = torch.tensor([2., -3.])
     true_b = torch.tensor(4.)
 
-    X, y = synthesize_data(true_w, true_b, 1000)
-
-    print(cfg, type(cfg))
-
-    size = int(X.shape[-2]*cfg.modelinstance.train_size)
-
-    # np.random.choice() generates a random sample from a given 1D array. here is is sampling size/total_size 
-    index = np.random.choice(X.shape[-2], size=size, replace=False) 
-
-    # Prepare the traing set. Note the synthetic data are torch.Tensors. Here it is transform into NumpyArray first for norm operation then reverse back to Tensor.
-    X_train = torch.from_numpy(norm(X[index].numpy()))
-    y_train = y[index]
-
-    ## Prepare the test set.
-    X_test = torch.from_numpy(norm(np.delete(X, index, axis=0).numpy()))
-    y_test = np.delete(y, index, axis=0)
-    # Store tensors in a dictionary
-    tensors_dict = {
-       'X_train': X_train,
-       'X_test': X_test,
-       'y_train': y_train,
-       'y_test': y_test
-       }
-    # Save to a file - A common PyTorch convention is to save tensors using .pt file extension.
-    torch.save(tensors_dict, f"{hydra.utils.get_original_cwd()}/{cfg.path.data_dir}/{cfg.fname.data_fname}") 
-    # Hydra automatically changing directories behaviour may cause issues, so it is advised to specify path with get_original_cwd()
-
-    logger.info(f"Data is saved as: {hydra.utils.get_original_cwd()}/{cfg.path.data_dir}/{cfg.fname.data_fname})")
+    if cfg.modelinstance.data_format == "sharded":
+        # Generated chunk by chunk on a process pool, each chunk written straight to its train/test shards;
+        # per-chunk seeds make the files identical for any number of workers
+        dataset_dir = f"{hydra.utils.get_original_cwd()}/{cfg.path.data_dir}/{cfg.fname.dataset_dirname}"
+        dataset = generate_sharded_dataset(
+            dataset_dir, true_w.tolist(), true_b.item(),
+            n_rows=cfg.modelinstance.sample_size,
+            chunk_rows=cfg.modelinstance.shard_rows,
+            train_size=cfg.modelinstance.train_size,
+            seed=cfg.modelinstance.data_seed,
+            workers=cfg.modelinstance.data_workers,
+            split_method=cfg.modelinstance.split_method,
+            split_buckets=cfg.modelinstance.split_buckets,
+            )
+        logger.info(f"Data is saved as: {dataset_dir} ({len(dataset['train'])} train / {len(dataset['test'])} test rows)")
+    elif cfg.modelinstance.data_format == "pt":
+        X, y = synthesize_data(true_w, true_b, cfg.modelinstance.sample_size)
+
+        # The split is only row numbers (a slice for "offsets", one shuffled index array otherwise); each part is
+        # gathered once into its own tensor, without the full copies np.random.choice + np.delete used to make
+        train_rows, test_rows = train_test_rows(
+            len(X), cfg.modelinstance.train_size, cfg.modelinstance.split_method,
+            seed=cfg.modelinstance.data_seed, y=y, n_buckets=cfg.modelinstance.split_buckets,
+            )
+
+        # Prepare the traing set. Features are stored unscaled: training fits a per-feature normalizer on X_train
+        # and applies the same statistics to the test set and at serving time (see normalization.py)
+        X_train, y_train = RowSubset(X, y, train_rows).tensors()
+
+        ## Prepare the test set.
+        X_test, y_test = RowSubset(X, y, test_rows).tensors()
+        if isinstance(train_rows, slice):
+            # slices are views, and torch.save would write the whole underlying storage with each of them
+            X_train, y_train, X_test, y_test = (t.clone() for t in (X_train, y_train, X_test, y_test))
+        # Store tensors in a dictionary
+        tensors_dict = {
+           'X_train': X_train,
+           'X_test': X_test,
+           'y_train': y_train,
+           'y_test': y_test
+           }
+        # Save to a file - A common PyTorch convention is to save tensors using .pt file extension.
+        torch.save(tensors_dict, f"{hydra.utils.get_original_cwd()}/{cfg.path.data_dir}/{cfg.fname.data_fname}") 
+        # Hydra automatically changing directories behaviour may cause issues, so it is advised to specify path with get_original_cwd()
+
+        logger.info(f"Data is saved as: {hydra.utils.get_original_cwd()}/{cfg.path.data_dir}/{cfg.fname.data_fname})")
+    else:
+        raise ValueError(f"data_format should be one of {DATA_FORMATS}, got {cfg.modelinstance.data_format!r}")
     # Output dir is the current working dir.
    
     logger.info(f"Output directory: {hydra.core.hydra_config.HydraConfig.get().runtime.output_dir}")
@@ -0,0 +1,84 @@
+"""
+Chunked, parallel synthetic data generation.
+
+`synthesize_data` builds the whole X and y in one call, which caps the data set at what fits in memory
+and runs on one core. `generate_sharded_dataset` splits the rows into fixed-size chunks and generates them
+on a process pool. Every worker writes its chunk straight to disk as one train shard and one test shard of a
+ShardedDataset, and only the manifest entries come back to the parent.
+
+Chunk `i` is generated from its own random stream, `SeedSequence(seed, spawn_key=(i,))`, so the output only
+depends on (seed, n_rows, chunk_rows): any number of workers, on any machine, writes identical files.
+
+    generate_sharded_dataset("data/model_demo/data_shards", w=[2., -3.], b=4., n_rows=100_000_000,
+                             chunk_rows=1_000_000, seed=0, workers=8)
+
+"""
+from concurrent.futures import ProcessPoolExecutor
+import os
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from src.model_demo.datasets import ShardedDataset, ShardedDatasetWriter, write_shard
+from src.model_demo.splits import RowSubset, train_test_rows
+
+
+def chunk_rng(seed: int, index: int) -> np.random.Generator:
+    """ The random stream of chunk `index`, independent of which process draws it. """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+
+def synthesize_chunk(w: Sequence[float], b: float, n_rows: int, seed: int, index: int,
+                     loc: float = 10., scale: float = 3., noise_std: float = 0.01) -> tuple[np.ndarray, np.ndarray]:
+    """ y = xW^T + b + noise for one chunk, X ~ N(loc, scale) as in synthesize_data; float32 (n_rows, d) and (n_rows, 1). """
+    rng = chunk_rng(seed, index)
+    w = np.asarray(w, dtype=np.float32)
+    X = rng.standard_normal((n_rows, len(w)), dtype=np.float32)
+    X *= scale
+    X += loc
+    y = X @ w
+    y += b
+    y += noise_std * rng.standard_normal(n_rows, dtype=np.float32)
+    return X, y.reshape(-1, 1)
+
+def _generate_chunk(root: str, w: Sequence[float], b: float, n_rows: int, seed: int, index: int,
+                    train_size: float, split_method: str = "offsets", split_buckets: int = 10) -> tuple[dict, dict]:
+    """ Worker job: generate chunk `index`, split it into train/test rows and write both shards. """
+    X, y = synthesize_chunk(w, b, n_rows, seed, index)
+    # rows are i.i.d. draws, so with "offsets" taking the first ones for training is already a uniformly random
+    # split, without a permutation and copy. The other methods draw from their own stream of the chunk's seed.
+    split_seed = np.random.SeedSequence(seed, spawn_key=(index, 1))
+    train_rows, test_rows = train_test_rows(n_rows, train_size, split_method, split_seed, y, split_buckets)
+    train = write_shard(root, "train", index, *RowSubset(X, y, train_rows).tensors())
+    test = write_shard(root, "test", index, *RowSubset(X, y, test_rows).tensors())
+    return train, test
+
+def generate_sharded_dataset(root: str | Path, w: Sequence[float], b: float, n_rows: int, chunk_rows: int = 1_000_000,
+                             train_size: float = 0.8, seed: int = 0, workers: int = 0,
+                             split_method: str = "offsets", split_buckets: int = 10) -> ShardedDataset:
+    """
+    Generate n_rows of synthetic data into a sharded dataset at root, chunk_rows rows per chunk.
+    Parameters:
+        workers (int): generator processes; 0 uses every CPU, 1 generates in this process.
+        split_method (str): how each chunk is split into train/test rows, one of splits.SPLIT_METHODS.
+    Features are written unscaled; training fits a FeatureNormalizer on them (see normalization.py).
+    """
+    if chunk_rows < 1 or n_rows < 1:
+        raise ValueError(f"n_rows and chunk_rows should be positive integers, got {n_rows} and {chunk_rows}")
+    root = Path(root)
+    writer = ShardedDatasetWriter(root, shard_rows=chunk_rows)
+    w = [float(v) for v in w]
+    jobs = [(str(root), w, float(b), min(chunk_rows, n_rows - start), seed, index, train_size, split_method, split_buckets)
+            for index, start in enumerate(range(0, n_rows, chunk_rows))]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) == 1:
+        entries = [_generate_chunk(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(min(workers, len(jobs))) as pool:
+            entries = list(pool.map(_generate_chunk, *zip(*jobs)))
+    for train, test in entries:
+        writer.add_shard("train", train, n_features=len(w), n_targets=1)
+        writer.add_shard("test", test, n_features=len(w), n_targets=1)
+    writer.close()
+    return ShardedDataset(root)
@@ -0,0 +1,197 @@
+"""
+Sharded, memory-mapped on-disk dataset.
+
+`data_tensors.pt` is a single pickle holding X_train, y_train, X_test and y_test; reading any of it means
+reading all of it. The sharded layout stores every split as a sequence of raw float32 `.npy` shards plus a
+small JSON manifest:
+
+    data/model_demo/data_shards/
+    ├── manifest.json              {"format_version": 1, "dtype": "float32", "splits": {"train": {...}, "test": {...}}}
+    ├── train-00000-X.npy          (rows, n_features)
+    ├── train-00000-y.npy          (rows, n_targets)
+    ├── ...
+    └── test-00000-X.npy ...
+
+Shards are opened with `np.load(mmap_mode="c")`, so tensors built on them are backed by the page cache and
+only the rows that are touched are read. Copy-on-write mode keeps the files read-only while still giving
+torch a writable buffer.
+
+    with ShardedDatasetWriter("data/model_demo/data_shards", shard_rows=1_000_000) as writer:
+        writer.write("train", X_train, y_train)     # any number of calls, rows are appended
+    dataset = ShardedDataset("data/model_demo/data_shards")
+    for X, y in dataset["train"].chunks():          # one memory-mapped shard at a time
+        ...
+    batches = load_data(dataset["train"], 100)      # shuffled mini-batches, one shard in memory at a time
+    tensors_dict = load_tensors(data_dir)           # small data only: every split in RAM, as data_tensors.pt
+
+Training (SGD and the streaming solvers) and evaluation read the splits through chunks()/batches(); tensors(),
+to_tensors_dict() and load_tensors() concatenate a multi-shard split in memory and are kept for small data
+and for the data_tensors.pt layout.
+
+"""
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+import torch
+
+MANIFEST_FNAME = "manifest.json"
+FORMAT_VERSION = 1
+DATA_FORMATS = ("pt", "sharded")
+
+
+class ShardedSplit:
+    """ One split (e.g. "train") of a ShardedDataset: a list of (X, y) shards with the same column counts. """
+    def __init__(self, root: Path, name: str, entry: dict):
+        self.root = root
+        self.name = name
+        self.n_rows = entry["n_rows"]
+        self.n_features = entry["n_features"]
+        self.n_targets = entry["n_targets"]
+        self.shards = entry["shards"]
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def shard(self, index: int) -> tuple[torch.Tensor, torch.Tensor]:
+        """ Memory-mapped (X, y) tensors of one shard; nothing is read until the rows are used. """
+        entry = self.shards[index]
+        X = np.load(self.root / entry["X"], mmap_mode="c")
+        y = np.load(self.root / entry["y"], mmap_mode="c")
+        return torch.from_numpy(X), torch.from_numpy(y)
+
+    def chunks(self) -> Iterator[tuple[torch.Tensor, torch.Tensor]]:
+        """ Every shard in order, e.g. for the streaming solvers or evaluation. """
+        for index in range(len(self.shards)):
+            yield self.shard(index)
+
+    def batches(self, batch_size: int, shuffle: bool = False,
+                generator: torch.Generator | None = None) -> Iterator[tuple[torch.Tensor, torch.Tensor]]:
+        """ Mini-batches, shuffling the shard order and the rows within each shard when shuffle is set. """
+        order = torch.randperm(len(self.shards), generator=generator).tolist() if shuffle else range(len(self.shards))
+        for index in order:
+            X, y = self.shard(index)
+            if shuffle:
+                perm = torch.randperm(len(X), generator=generator)
+                X, y = X[perm], y[perm]
+            yield from zip(X.split(batch_size), y.split(batch_size))
+
+    def tensors(self) -> tuple[torch.Tensor, torch.Tensor]:
+        """ The whole split as (X, y); memory-mapped for a single shard, concatenated in memory otherwise (small data only). """
+        if len(self.shards) == 1:
+            return self.shard(0)
+        if not self.shards:
+            return torch.empty(0, self.n_features), torch.empty(0, self.n_targets)
+        Xs, ys = zip(*self.chunks())
+        return torch.cat(Xs), torch.cat(ys)
+
+
+class ShardedDataset:
+    """ Open a sharded dataset directory written by ShardedDatasetWriter. """
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        with open(self.root / MANIFEST_FNAME) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported dataset format version {self.manifest.get('format_version')!r} in {self.root}")
+        self.splits = {name: ShardedSplit(self.root, name, entry) for name, entry in self.manifest["splits"].items()}
+
+    def __getitem__(self, split: str) -> ShardedSplit:
+        return self.splits[split]
+
+    def __contains__(self, split: str) -> bool:
+        return split in self.splits
+
+    def to_tensors_dict(self) -> dict:
+        """ The {'X_train', 'y_train', 'X_test', 'y_test', ...} layout of data_tensors.pt, in memory: for data that fits in RAM. """
+        tensors_dict = {}
+        for name, split in self.splits.items():
+            tensors_dict[f"X_{name}"], tensors_dict[f"y_{name}"] = split.tensors()
+        return tensors_dict
+
+
+class ShardedDatasetWriter:
+    """
+    Append (X, y) rows to the splits of a sharded dataset; the manifest is written on close().
+    Parameters:
+        root (str or Path): dataset directory, created if needed. Existing shards of the same split names are overwritten.
+        shard_rows (int): rows per shard file (the last shard of a split may be smaller).
+    """
+    def __init__(self, root: str | Path, shard_rows: int = 1_000_000):
+        if shard_rows < 1:
+            raise ValueError(f"shard_rows should be a positive integer, got {shard_rows}")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.shard_rows = shard_rows
+        self.splits: dict[str, dict] = {}
+        self._pending: dict[str, list] = {}
+
+    def __enter__(self) -> "ShardedDatasetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+
+    def write(self, split: str, X: Any, y: Any) -> None:
+        """ Append rows to `split`; full shards are written to disk right away. """
+        X = np.asarray(X, dtype=np.float32)
+        y = np.asarray(y, dtype=np.float32)
+        if y.ndim == 1:
+            y = y.reshape(-1, 1)
+        if X.ndim != 2 or len(X) != len(y):
+            raise ValueError(f"X should be (rows, n_features) and y have as many rows, got {X.shape} and {y.shape}")
+        entry = self.splits.setdefault(split, {"n_rows": 0, "n_features": X.shape[1], "n_targets": y.shape[1], "shards": []})
+        if (X.shape[1], y.shape[1]) != (entry["n_features"], entry["n_targets"]):
+            raise ValueError(f"Split {split!r} has {entry['n_features']} features and {entry['n_targets']} targets, got {X.shape[1]} and {y.shape[1]}")
+        pending = self._pending.setdefault(split, [])
+        pending.append((X, y))
+        if sum(len(X) for X, _ in pending) >= self.shard_rows:
+            X, y = np.concatenate([X for X, _ in pending]), np.concatenate([y for _, y in pending])
+            full = len(X) - len(X) % self.shard_rows
+            for start in range(0, full, self.shard_rows):
+                self._write_shard(split, X[start:start + self.shard_rows], y[start:start + self.shard_rows])
+            self._pending[split] = [(X[full:], y[full:])] if full < len(X) else []
+
+    def add_shard(self, split: str, entry: dict, n_features: int, n_targets: int) -> None:
+        """ Append a shard written elsewhere with `write_shard` (e.g. by a worker process) to `split`. """
+        split_entry = self.splits.setdefault(split, {"n_rows": 0, "n_features": n_features, "n_targets": n_targets, "shards": []})
+        split_entry["shards"].append(entry)
+        split_entry["n_rows"] += entry["n_rows"]
+
+    def _write_shard(self, split: str, X: np.ndarray, y: np.ndarray) -> None:
+        entry = self.splits[split]
+        entry["shards"].append(write_shard(self.root, split, len(entry["shards"]), X, y))
+        entry["n_rows"] += len(X)
+
+    def close(self) -> None:
+        for split, pending in self._pending.items():
+            if pending:
+                self._write_shard(split, np.concatenate([X for X, _ in pending]), np.concatenate([y for _, y in pending]))
+        self._pending = {}
+        manifest = {"format_version": FORMAT_VERSION, "dtype": "float32", "splits": self.splits}
+        # write then rename, so readers never see a half-written manifest
+        tmp_path = self.root / f"{MANIFEST_FNAME}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.root / MANIFEST_FNAME)
+
+
+def write_shard(root: str | Path, split: str, index: int, X: np.ndarray, y: np.ndarray) -> dict:
+    """ Write shard `index` of `split` as two float32 .npy files under root and return its manifest entry. """
+    stem = f"{split}-{index:05d}"
+    np.save(Path(root) / f"{stem}-X.npy", np.ascontiguousarray(X, dtype=np.float32))
+    np.save(Path(root) / f"{stem}-y.npy", np.ascontiguousarray(y, dtype=np.float32).reshape(len(X), -1))
+    return {"X": f"{stem}-X.npy", "y": f"{stem}-y.npy", "n_rows": len(X)}
+
+def load_tensors(data_dir: str | Path, data_fname: str = "data_tensors.pt", dataset_dirname: str = "data_shards") -> dict:
+    """
+    The train/test tensors dict, from the sharded dataset in data_dir/dataset_dirname when it has a manifest,
+    otherwise from the data_dir/data_fname pickle written by earlier versions of data_prep.
+    """
+    data_dir = Path(data_dir)
+    if (data_dir / dataset_dirname / MANIFEST_FNAME).exists():
+        return ShardedDataset(data_dir / dataset_dirname).to_tensors_dict()
+    return torch.load(data_dir / data_fname)
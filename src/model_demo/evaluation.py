@@ -0,0 +1,113 @@
+"""
+Streaming regression metrics for `infer_evaluate_model`.
+
+`StreamingRegressionMetrics` is updated once per batch and keeps a fixed amount of state no matter how many
+batches it sees: per-output running sums for MSE, MAE and the target variance behind R^2 (targets are
+shifted by the first batch's mean, so the variance does not suffer from cancellation), and a uniform
+random sample of the residuals, capped at `sample_size`, for the residual quantiles. The quantiles are exact while the
+data set has at most `sample_size` rows. Everything stays on the device of the outputs until `compute()`.
+
+    metrics = StreamingRegressionMetrics()
+    for outputs, labels in batches:
+        metrics.update(outputs, labels)
+    metrics.compute()   # EvaluationMetrics(n_samples=..., mse=..., mae=..., r2=..., residual_quantiles={...})
+
+"""
+from dataclasses import dataclass, field
+
+import torch
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+@dataclass
+class EvaluationMetrics:
+    """ Metrics over a whole evaluation set. R^2 is averaged over the output columns. """
+    n_samples: int
+    mse: float
+    mae: float
+    r2: float
+    residual_quantiles: dict[float, float] = field(default_factory=dict)  # quantiles of (prediction - target)
+    loss: float | None = None  # mean of the evaluation criterion weighted by batch size, if one was given
+
+
+class StreamingRegressionMetrics:
+    """
+    Accumulate regression metrics batch by batch in constant memory.
+    Parameters:
+        quantiles (tuple): residual quantile levels to report.
+        sample_size (int): number of residuals kept for the quantiles.
+        generator (torch.Generator): for a reproducible residual sample.
+    """
+    def __init__(self, quantiles: tuple = QUANTILES, sample_size: int = 65536, generator: torch.Generator | None = None):
+        self.quantiles = quantiles
+        self.sample_size = sample_size
+        self.generator = generator
+        self.n_samples = 0
+        self.loss_sum = None
+        self.shift = None
+        self.sums = None
+        self.sample_keys = []
+        self.sample_residuals = []
+        self.buffered = 0
+
+    def update(self, outputs: torch.Tensor, targets: torch.Tensor, loss: torch.Tensor | None = None) -> None:
+        """ Add one batch; `loss` is the batch's mean criterion value, if the caller computed one. """
+        n = len(outputs)
+        if n == 0:
+            return
+        device = "cpu" if outputs.device.type == "mps" else outputs.device  # MPS has no float64
+        outputs = outputs.detach().to(device, torch.float64).reshape(n, -1)
+        targets = targets.detach().to(device, torch.float64).reshape(n, -1)
+        if self.shift is None:
+            # targets are summed around the first batch's mean, which keeps the variance free of cancellation
+            self.shift = targets.mean(0)
+            self.sums = outputs.new_zeros(4, targets.shape[1])
+        residuals = outputs - targets
+        centered = targets - self.shift
+        # one reduction per batch: squared error, absolute error, sum and sum of squares of the centered targets
+        self.sums += torch.stack([residuals.square(), residuals.abs(), centered, centered.square()]).sum(1)
+        if loss is not None:
+            loss = loss.detach().to(device, torch.float64) * n
+            self.loss_sum = loss if self.loss_sum is None else self.loss_sum + loss
+        self.n_samples += n
+        self._sample(residuals.reshape(-1))
+
+    def _sample(self, residuals: torch.Tensor) -> None:
+        # bottom-k sampling: every residual gets a uniform random key and the k smallest keys are kept, which
+        # is a uniform sample without replacement of everything seen so far. Batches are buffered and cut back
+        # to k once the buffer holds 2k, so each residual costs O(1) amortized.
+        keys = torch.rand(len(residuals), device=residuals.device, dtype=torch.float64, generator=self.generator)
+        self.sample_keys.append(keys)
+        self.sample_residuals.append(residuals)
+        self.buffered += len(keys)
+        if self.buffered > 2 * self.sample_size:
+            self._compact()
+
+    def _compact(self) -> None:
+        keys, residuals = torch.cat(self.sample_keys), torch.cat(self.sample_residuals)
+        if len(keys) > self.sample_size:
+            keys, index = torch.topk(keys, self.sample_size, largest=False, sorted=False)
+            residuals = residuals[index]
+        self.sample_keys, self.sample_residuals, self.buffered = [keys], [residuals], len(keys)
+
+    def compute(self) -> EvaluationMetrics:
+        if self.n_samples == 0:
+            raise ValueError("No batches to evaluate")
+        squared_error, absolute_error, centered_sum, centered_sq_sum = self.sums
+        n_values = squared_error.numel() * self.n_samples
+        total_ss = centered_sq_sum - centered_sum.square() / self.n_samples
+        # a constant target column has no variance to explain, R^2 is not finite there
+        r2 = (1 - squared_error / total_ss).mean().item()
+        self._compact()
+        residuals = self.sample_residuals[0]
+        levels = torch.tensor(self.quantiles, dtype=torch.float64, device=residuals.device)
+        quantiles = torch.quantile(residuals, levels).tolist()
+        return EvaluationMetrics(
+            n_samples=self.n_samples,
+            mse=squared_error.sum().item() / n_values,
+            mae=absolute_error.sum().item() / n_values,
+            r2=r2,
+            residual_quantiles=dict(zip(self.quantiles, quantiles)),
+            loss=None if self.loss_sum is None else self.loss_sum.item() / self.n_samples,
+            )
@@ -0,0 +1,139 @@
+"""
+Prepared inference engine for the linear model.
+
+`infer_model` calls `model.eval()` and `model.to(device)`, casts the inputs and squeezes the outputs on
+every call. For a 2 -> 1 `nn.Linear` that bookkeeping costs more than the arithmetic. `LinearInferenceEngine`
+is built once from a trained `LinearRegressionModel`; it keeps the weights as contiguous buffers and
+computes y = xW^T + b with one fused call (`torch.addmv`/`torch.addmm`, a column-wise multiply-add for
+large single-output batches, or `np.dot` + bias), optionally into a caller-provided output buffer so
+steady-state inference allocates nothing.
+
+The "numpy" backend needs no torch at all, so a model exported with `save_npz` can be served without
+importing torch:
+
+    engine = LinearInferenceEngine.from_model(model)             # torch backend
+    engine.save_npz("models/model_demo/demo_model_weights.npz")
+    engine = LinearInferenceEngine.from_npz("models/model_demo/demo_model_weights.npz", backend="numpy")
+    y = engine.predict(X)                                        # shape (n_rows,) for a single output
+
+"""
+import os
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+BACKENDS = ("torch", "numpy")
+
+# BLAS gemv is slow on tall, very narrow inputs (n x 2); past this many rows a column-wise multiply-add is faster
+COLUMNWISE_MIN_ROWS = 4096
+COLUMNWISE_MAX_FEATURES = 8
+
+
+def worker_threads(workers: int, threads_per_worker: int = 0, cpu_count: int | None = None) -> int:
+    """ torch threads per worker process: the configured number, or an equal share of the cores (at least one). """
+    if threads_per_worker > 0:
+        return threads_per_worker
+    return max(1, (cpu_count or os.cpu_count() or 1) // workers)
+
+
+class LinearInferenceEngine:
+    """
+    y = xW^T + b for a trained linear model.
+    Parameters:
+        weight (array): (output_dim, input_dim) weight matrix, as in nn.Linear.
+        bias (array): (output_dim,) bias vector.
+        backend (str): "torch" (inputs/outputs are tensors) or "numpy" (inputs/outputs are arrays).
+        device (str): torch device holding the weights (torch backend only).
+    """
+    def __init__(self, weight: Any, bias: Any, backend: str = "torch", device: str = "cpu"):
+        if backend not in BACKENDS:
+            raise ValueError(f"backend should be one of {BACKENDS}, got {backend!r}")
+        weight = np.asarray(weight, dtype=np.float32)
+        bias = np.ascontiguousarray(np.asarray(bias, dtype=np.float32).reshape(-1))
+        if weight.ndim != 2 or bias.shape != (weight.shape[0],):
+            raise ValueError(f"weight must be (output_dim, input_dim) and bias (output_dim,), got {weight.shape} and {bias.shape}")
+        self.backend = backend
+        self.device = device
+        self.output_dim, self.input_dim = weight.shape
+
+        if backend == "torch":
+            import torch
+
+            self._torch = torch
+            # x @ W^T reads W^T column-wise; keep it (input_dim, output_dim) contiguous once instead of per call.
+            # No copy when W is the transpose of a contiguous buffer, e.g. the shared weights of shared_weights.py
+            self.weight_t = torch.from_numpy(np.ascontiguousarray(weight.T)).to(device)
+            self.weight_vec = self.weight_t[:, 0].contiguous() if self.output_dim == 1 else None
+            self.bias = torch.from_numpy(bias).to(device)
+            self._columnwise = self.output_dim == 1 and self.input_dim <= COLUMNWISE_MAX_FEATURES
+            self._weight_floats = weight[0].tolist() if self._columnwise else None
+            self._bias_float = float(bias[0]) if self._columnwise else None
+        else:
+            self.weight_t = np.ascontiguousarray(weight.T)
+            self.weight_vec = np.ascontiguousarray(weight[0]) if self.output_dim == 1 else None
+            self.bias = bias
+
+    @classmethod
+    def from_model(cls, model, backend: str = "torch", device: str | None = None) -> "LinearInferenceEngine":
+        """ Build from a LinearRegressionModel (or anything with a `.linear` nn.Linear). """
+        linear = model.linear
+        weight = linear.weight.detach().cpu().numpy()
+        bias = linear.bias.detach().cpu().numpy()
+        return cls(weight, bias, backend=backend, device=device or str(linear.weight.device))
+
+    @classmethod
+    def from_npz(cls, path: str | Path, backend: str = "numpy", device: str = "cpu") -> "LinearInferenceEngine":
+        """ Load weights exported with `save_npz`; works without torch for the numpy backend. """
+        with np.load(path) as arrays:
+            return cls(arrays["weight"], arrays["bias"], backend=backend, device=device)
+
+    def save_npz(self, path: str | Path) -> None:
+        np.savez(path, weight=self.weight, bias=self.bias_numpy)
+
+    @property
+    def weight(self) -> np.ndarray:
+        w_t = self.weight_t.cpu().numpy() if self.backend == "torch" else self.weight_t
+        return np.ascontiguousarray(w_t.T)
+
+    @property
+    def bias_numpy(self) -> np.ndarray:
+        return self.bias.cpu().numpy() if self.backend == "torch" else self.bias
+
+    def predict(self, inputs: Any, out: Any = None) -> Any:
+        """
+        Predict for a (n_rows, input_dim) batch.
+        Returns (n_rows,) when output_dim == 1, else (n_rows, output_dim). If `out` is given (a tensor/array of
+        that shape and float32), the result is written into it and `out` is returned.
+        """
+        if self.backend == "torch":
+            return self._predict_torch(inputs, out)
+        return self._predict_numpy(inputs, out)
+
+    __call__ = predict
+
+    def _predict_torch(self, inputs, out):
+        torch = self._torch
+        if not isinstance(inputs, torch.Tensor):
+            inputs = torch.as_tensor(inputs)
+        if inputs.dtype != torch.float32 or inputs.device != self.bias.device:
+            inputs = inputs.to(self.bias.device, torch.float32)
+        if self._columnwise and inputs.shape[0] >= COLUMNWISE_MIN_ROWS:
+            w = self._weight_floats
+            out = torch.mul(inputs[:, 0], w[0], out=out)
+            for j in range(1, self.input_dim):
+                out.add_(inputs[:, j], alpha=w[j])
+            return out.add_(self._bias_float)
+        if self.weight_vec is not None:
+            # a (1,) bias would broadcast a zero-row batch to one row; expanding it is a view, not a copy
+            return torch.addmv(self.bias.expand(inputs.shape[0]), inputs, self.weight_vec, out=out)
+        return torch.addmm(self.bias, inputs, self.weight_t, out=out)
+
+    def _predict_numpy(self, inputs, out):
+        inputs = np.asarray(inputs, dtype=np.float32)
+        if self.weight_vec is not None:
+            out = np.dot(inputs, self.weight_vec, out=out)
+        else:
+            out = np.matmul(inputs, self.weight_t, out=out)
+        out += self.bias
+        return out
@@ -5,6 +5,7 @@ pydantic is used in model_demo.py configuration file config.py
 
 """
 
+from dataclasses import asdict, fields
 import logging
 from pathlib import Path
 
@@ -13,32 +14,79 @@ import numpy as np
 import torch
 import torch.nn as nn
 
-from src.model_demo.utils import load_data, infer_evaluate_model, get_device, setup_logger
+from src.model_demo.utils import infer_evaluate_model, get_device, load_data, setup_logger
 from src.model_demo.configs.config import MetadataConfigSchema
 from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.datasets import MANIFEST_FNAME, ShardedDataset, ShardedSplit, load_tensors
+from src.model_demo.normalization import FeatureNormalizer
+from src.model_demo.registry import ModelRegistry
+from src.model_demo.solvers import STREAMING_SOLVERS, fit_closed_form, fit_closed_form_chunks
+from src.model_demo.training import fit, fit_batches, minibatches
 
 def get_data() -> dict:
-    """ Fetch data from the data dir """
+    """
+    Fetch data from the data dir as in-memory tensors: the sharded dataset if there is one (a multi-shard split
+    is concatenated in RAM), else data_tensors.pt. Training and evaluation use get_split() when they can.
+    """
     try:
-        tensors_dict = torch.load(Path(__file__).parent.parent.parent.parent/cfg.path.data_dir/cfg.fname.data_fname)
+        tensors_dict = load_tensors(Path(__file__).parent.parent.parent.parent/cfg.path.data_dir, cfg.fname.data_fname, cfg.fname.dataset_dirname)
     except FileNotFoundError:
         logger.error('Data or path not fund!')
     return tensors_dict
 
+def get_split(name: str = "train") -> ShardedSplit | None:
+    """ A split of the sharded dataset, read from its memory-mapped shards, or None when the data is still a single .pt file """
+    dataset_dir = Path(__file__).parent.parent.parent.parent/cfg.path.data_dir/cfg.fname.dataset_dirname
+    if not (dataset_dir/MANIFEST_FNAME).exists():
+        return None
+    return ShardedDataset(dataset_dir)[name]
+
+def export_serving_artifact(model: nn.Module, path: Path) -> None:
+    """
+    Save a TorchScript version of the trained model for serving.
+    The scripted module carries its own graph and weights, so the API can load it without rebuilding
+    LR(2,1) and calling load_state_dict; it is frozen (weights inlined, graph optimized) at load time.
+    """
+    model = model.to("cpu").eval()
+    scripted = torch.jit.script(model)
+    torch.jit.save(scripted, path)
+
+def config_to_dict(cfg) -> dict:
+    """ {section: {field: value}} of the configuration, for the registry metadata """
+    return {section.name: {f.name: getattr(getattr(cfg, section.name), f.name) for f in fields(getattr(cfg, section.name))}
+            for section in fields(cfg)}
+
+def register_model(cfg, metrics: dict | None = None) -> str:
+    """
+    Publish the artifacts just saved in the model dir as a new registry version (see registry.py);
+    a running API switches to it without a restart. Returns the version name.
+    """
+    model_dir = Path(__file__).parent.parent.parent.parent/cfg.path.model_dir
+    registry = ModelRegistry(Path(__file__).parent.parent.parent.parent/cfg.path.registry_dir,
+                             keep=cfg.modelinstance.registry_keep_versions)
+    fnames = [cfg.fname.model_fname, cfg.fname.normalizer_fname]
+    if cfg.modelinstance.export_torchscript:
+        fnames.append(cfg.fname.scripted_model_fname)  # a scripted file left by an earlier run is not this model
+    files = {fname: model_dir/fname for fname in fnames}
+    return registry.publish(files, config=config_to_dict(cfg), metrics=metrics)
+
 def train(model, cfg: DictConfig) -> None:
     # Step 1: Get data ready
-    tensors_dict = get_data()
+    # SGD and the streaming solvers read a sharded training set one shard at a time, it never has to fit in memory
+    train_split = get_split("train") if cfg.modelinstance.solver in ("sgd", *STREAMING_SOLVERS) else None
+    if train_split is None:
+        tensors_dict = get_data()
 
-    X_train = tensors_dict['X_train']
-    y_train = tensors_dict['y_train']
+        X_train = tensors_dict['X_train']
+        y_train = tensors_dict['y_train']
 
     ## Model training
     # Step 1: Create model class
     # in the utils.py
 
     # Step 2: Get model ready
-    input_dim = X_train.shape[-1]
-    output_dim = y_train.shape[-1]
+    input_dim = X_train.shape[-1] if train_split is None else train_split.n_features
+    output_dim = y_train.shape[-1] if train_split is None else train_split.n_targets
 
     # Instantiate the model, the default of modelinstance in MetadataConfigSchema is an instance already not a callable 
     model = model(input_dim, output_dim)
@@ -51,6 +99,14 @@ def train(model, cfg: DictConfig) -> None:
 
     model.to(device)
 
+    # Per-feature mean/std of the training set, in one streaming pass over the chunks/shards. The model is
+    # trained on standardized features; the statistics are saved with the weights and folded in at serving.
+    normalizer = None
+    if cfg.modelinstance.normalize_features:
+        chunks = train_split.chunks() if train_split is not None else X_train.split(cfg.modelinstance.solver_chunk_rows)
+        normalizer = FeatureNormalizer.fit(chunks)
+        logger.info(f"Feature mean {normalizer.mean.tolist()}, std {normalizer.std.tolist()}")
+
     # Step 3: Instantiate Loss class and Optimizer class
     # learning_rate = 0.01
     optimizer = torch.optim.SGD(model.parameters(), lr=cfg.modelinstance.learning_rate)
@@ -60,25 +116,55 @@ def train(model, cfg: DictConfig) -> None:
     # batch_size = 100   # batch_size should be a positive integer value
     # epochs = 100
 
-    # Data loader combines a dataset and a sampler, and provides an iterable over the given dataset.
-    data_iter = load_data((X_train, y_train), cfg.modelinstance.batch_size)
-
-    for epoch in range(cfg.modelinstance.epochs):
-        epoch += 1 # Logging starts at 1 instead of 0
-        for X, y in data_iter:
-            X = X.to(device)
-            y = y.to(device)
-        
-        optimizer.zero_grad() # Clear gradients w.r.t. parameters
-        outputs = model(X) # Forward to get output
-        loss = criterion(outputs, y) # Calculate Loss
-
-        # loss_list.append(loss.item())
-        # epoch_list.append(epoch)
-        logger.info('epoch {}, loss {}'.format(epoch, loss.item())) # Logging
-        
-        loss.backward() # Getting gradients w.r.t. parameters
-        optimizer.step() # Updating parameters
+    # The data set is already in memory: move it to the device once and shuffle on-device every epoch,
+    # instead of a DataLoader pass (and its worker processes) per epoch.
+    if train_split is None:
+        X_train = X_train.to(device)
+        y_train = y_train.to(device)
+        if normalizer is not None:
+            X_train = normalizer.transform(X_train)  # one fused multiply-add on the device
+
+    if cfg.modelinstance.solver == "sgd" and train_split is not None:
+        # shards are visited in a new random order every epoch and shuffled within, one batch in memory at a time
+        def epoch_batches():
+            for X, y in load_data(train_split, cfg.modelinstance.batch_size, is_train=True):
+                X, y = X.to(device), y.to(device)
+                yield (normalizer.transform(X) if normalizer is not None else X), y
+
+        history = fit_batches(
+            model, epoch_batches, len(train_split), optimizer, criterion,
+            epochs=cfg.modelinstance.epochs,
+            accumulation_steps=cfg.modelinstance.grad_accumulation_steps,
+            patience=cfg.modelinstance.early_stopping_patience,
+            min_delta=cfg.modelinstance.early_stopping_min_delta,
+            on_epoch_end=lambda epoch, loss: logger.info('epoch {}, loss {}'.format(epoch, loss)), # Logging
+            )
+        if history.stopped_early:
+            logger.info(f"Early stopping after {history.epochs_run} epochs, loss {history.final_loss}")
+    elif cfg.modelinstance.solver == "sgd":
+        history = fit(
+            model, X_train, y_train, optimizer, criterion,
+            epochs=cfg.modelinstance.epochs,
+            batch_size=cfg.modelinstance.batch_size,
+            accumulation_steps=cfg.modelinstance.grad_accumulation_steps,
+            patience=cfg.modelinstance.early_stopping_patience,
+            min_delta=cfg.modelinstance.early_stopping_min_delta,
+            on_epoch_end=lambda epoch, loss: logger.info('epoch {}, loss {}'.format(epoch, loss)), # Logging
+            )
+        if history.stopped_early:
+            logger.info(f"Early stopping after {history.epochs_run} epochs, loss {history.final_loss}")
+    elif train_split is not None:
+        chunks = train_split.chunks()
+        if normalizer is not None:
+            chunks = ((normalizer.transform(X), y) for X, y in chunks)
+        fit_closed_form_chunks(model, chunks, solver=cfg.modelinstance.solver)
+        logger.info(f"Solved with {cfg.modelinstance.solver} over {len(train_split)} rows in {len(train_split.shards)} shards")
+    else:
+        # ordinary least squares has a closed form: one pass over the data instead of epochs of SGD
+        fit_closed_form(model, X_train, y_train, solver=cfg.modelinstance.solver, chunk_rows=cfg.modelinstance.solver_chunk_rows)
+        with torch.no_grad():
+            loss = criterion(model(X_train), y_train)
+        logger.info(f"Solved with {cfg.modelinstance.solver}, loss {loss.item()}")
 
     # step 5: Persist the trained model 
     model_path = Path(__file__).parent.parent.parent.parent/cfg.path.model_dir/cfg.fname.model_fname
@@ -86,6 +172,21 @@ def train(model, cfg: DictConfig) -> None:
     
     logger.info("Model training accomplished!")
     logger.info(f"Model is saved as {model_path}")
+
+    normalizer_path = model_path.with_name(cfg.fname.normalizer_fname)
+    if normalizer is not None:
+        normalizer.save(normalizer_path)
+        logger.info(f"Feature normalizer is saved as {normalizer_path}")
+    else:
+        normalizer_path.unlink(missing_ok=True)  # statistics of an earlier model must not be applied to this one
+
+    scripted_path = model_path.with_name(cfg.fname.scripted_model_fname)
+    if cfg.modelinstance.export_torchscript:
+        export_serving_artifact(model, scripted_path)
+        model.to(device)
+        logger.info(f"TorchScript serving artifact is saved as {scripted_path}")
+    else:
+        scripted_path.unlink(missing_ok=True)  # the API prefers it over the weights: an earlier model would be served
     return model
 
 ## Model inference
@@ -111,16 +212,31 @@ if __name__ == "__main__":
         model.eval()
         model.to(device)
 
-        # Process the test data set
-        tensors_dict = get_data()
+        # the test set is scaled with the training set's statistics, not its own
+        normalizer_path = Path(cfg.path.model_dir) / cfg.fname.normalizer_fname
+        normalizer = FeatureNormalizer.load(normalizer_path) if normalizer_path.exists() else None
 
-        X_test = tensors_dict['X_test'].to(device)
-        y_test = tensors_dict['y_test'].to(device)
+        # Process the test data set: batch by batch from the memory-mapped shards, or in memory from data_tensors.pt
+        test_split = get_split("test")
+        if test_split is not None:
+            test_data_iter = load_data(test_split, cfg.modelinstance.batch_size, is_train=False)
+            if normalizer is not None:
+                test_data_iter = ((normalizer.transform(X), y) for X, y in test_data_iter)
+            n_test = len(test_split)
+        else:
+            tensors_dict = get_data()
 
-        test_data_iter = load_data((X_test, y_test), cfg.modelinstance.batch_size, is_train=False)
+            X_test = tensors_dict['X_test'].to(device)
+            y_test = tensors_dict['y_test'].to(device)
+            if normalizer is not None:
+                X_test = normalizer.transform(X_test)
+
+            test_data_iter = minibatches(X_test, y_test, cfg.modelinstance.batch_size, shuffle=False)
+            n_test = len(X_test)
 
         # Perform inference
-        predictions, avg_loss = infer_evaluate_model(model, test_data_iter, nn.MSELoss())
+        predictions, metrics = infer_evaluate_model(model, test_data_iter, nn.MSELoss(), device=device, n_samples=n_test)
+        logger.info(f"Test metrics: {metrics}")
 
         # Convert to NumPy and save
         numpy_predictions = predictions.cpu().numpy()
@@ -129,6 +245,11 @@ if __name__ == "__main__":
         np.savetxt(Path(cfg.path.data_dir) / 'predictions.csv', numpy_predictions, delimiter=',', fmt='%d')
         logger.info(f"Inference result is saved in directory: {cfg.path.data_dir}")
 
+    if cfg.modelinstance.register_model:
+        metrics_dict = asdict(metrics) if cfg.modelinstance.test_after_training else None
+        version = register_model(cfg, metrics_dict)
+        logger.info(f"Model is registered as version {version} in {cfg.path.registry_dir}")
+
 
 """
 To save the trained model for later use
@@ -181,7 +302,7 @@ y_test = y_test.to(device)
 test_data_iter = load_data((X_test, y_test), batch_size, is_train=False)
 
 # Perform inference
-predictions, avg_loss = infer_evaluate_model(model, test_data_iter, criterion)
+predictions, metrics = infer_evaluate_model(model, test_data_iter, criterion)
 
 # Convert model output to NumPy and save
 numpy_predictions = predictions.cpu().numpy()
@@ -0,0 +1,122 @@
+"""
+Per-feature standardization fitted in one streaming pass and persisted with the model.
+
+`norm()` standardized each array with its own global (scalar) mean and std, so train and test were scaled
+differently and the API served raw inputs to a model trained on scaled ones. `FeatureNormalizer` instead
+accumulates a per-feature mean and variance over (X) chunks with the parallel (Chan et al.) merge of
+Welford's statistics, which works for data of any size and in float64 regardless of chunk order. The
+fitted statistics are saved as a small JSON file next to the model weights and reused everywhere:
+
+    training / evaluation   X * scale + shift in one fused `torch.addcmul` per tensor or chunk
+    serving                 folded into the linear layer once at startup (W' = W * scale, b' = b + W @ shift),
+                            so raw request features go straight through the unchanged inference path
+
+    normalizer = FeatureNormalizer.fit(train_split.chunks())        # or FeatureNormalizer().update(X_train)
+    normalizer.save("models/model_demo/demo_model_normalizer.json")
+    X_scaled = normalizer.transform(X)
+
+"""
+import json
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+
+
+class FeatureNormalizer:
+    """
+    Per-feature (x - mean) / std, with statistics accumulated chunk by chunk.
+    Features with zero variance keep std = 1 so they pass through centered instead of dividing by zero.
+    """
+    def __init__(self, mean: Any = None, std: Any = None, count: int = 0):
+        self.count = count
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float64)
+        self.m2 = None if std is None else np.square(np.asarray(std, dtype=np.float64)) * count
+        self._std = None if std is None else np.asarray(std, dtype=np.float64)
+
+    @classmethod
+    def fit(cls, chunks: Iterable) -> "FeatureNormalizer":
+        """ Fit over an iterable of X chunks or (X, y) chunks. """
+        normalizer = cls()
+        for chunk in chunks:
+            normalizer.update(chunk[0] if isinstance(chunk, tuple) else chunk)
+        return normalizer
+
+    def update(self, X: Any) -> "FeatureNormalizer":
+        """ Merge the statistics of one (rows, n_features) chunk. """
+        X = np.asarray(X.detach().cpu() if hasattr(X, "detach") else X)
+        n = len(X)
+        if n == 0:
+            return self
+        batch_mean = X.mean(axis=0, dtype=np.float64)
+        batch_m2 = np.square(X - batch_mean).sum(axis=0, dtype=np.float64)
+        if self.mean is None:
+            self.count, self.mean, self.m2 = n, batch_mean, batch_m2
+        else:
+            total = self.count + n
+            delta = batch_mean - self.mean
+            self.mean = self.mean + delta * (n / total)
+            self.m2 = self.m2 + batch_m2 + np.square(delta) * (self.count * n / total)
+            self.count = total
+        self._std = None
+        return self
+
+    @property
+    def std(self) -> np.ndarray:
+        if self._std is None:
+            if self.mean is None:
+                raise ValueError("The normalizer has not seen any data")
+            std = np.sqrt(self.m2 / self.count)  # population std, as np.std in norm()
+            self._std = np.where(std > 0, std, 1.0)
+        return self._std
+
+    @property
+    def scale(self) -> np.ndarray:
+        return (1.0 / self.std).astype(np.float32)
+
+    @property
+    def shift(self) -> np.ndarray:
+        return (-self.mean / self.std).astype(np.float32)
+
+    def transform(self, X: Any) -> Any:
+        """ Standardize a tensor (one fused addcmul on its device) or an array; returns a new tensor/array. """
+        if hasattr(X, "detach"):
+            import torch
+
+            scale = torch.from_numpy(self.scale).to(X.device)
+            shift = torch.from_numpy(self.shift).to(X.device)
+            return torch.addcmul(shift, X.to(torch.float32), scale)
+        X = np.asarray(X, dtype=np.float32)
+        out = np.multiply(X, self.scale)
+        out += self.shift
+        return out
+
+    def fold_into_linear(self, weight: Any, bias: Any) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Weights of a linear layer that takes raw inputs, from one trained on standardized inputs:
+        W (x * scale + shift) + b = (W * scale) x + (b + W @ shift).
+        """
+        weight = np.asarray(weight, dtype=np.float64)
+        bias = np.asarray(bias, dtype=np.float64).reshape(-1)
+        scale, shift = 1.0 / self.std, -self.mean / self.std
+        return (weight * scale).astype(np.float32), (bias + weight @ shift).astype(np.float32)
+
+    def fold_into_model(self, model) -> None:
+        """ Fold into `model.linear` (an nn.Linear, also inside a TorchScript module) in place. """
+        import torch
+
+        linear = model.linear
+        weight, bias = self.fold_into_linear(linear.weight.detach().cpu().numpy(), linear.bias.detach().cpu().numpy())
+        with torch.no_grad():
+            linear.weight.copy_(torch.from_numpy(weight))
+            linear.bias.copy_(torch.from_numpy(bias))
+
+    def save(self, path: str | Path) -> None:
+        with open(path, "w") as f:
+            json.dump({"count": self.count, "mean": self.mean.tolist(), "std": self.std.tolist()}, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "FeatureNormalizer":
+        with open(path) as f:
+            stats = json.load(f)
+        return cls(stats["mean"], stats["std"], stats["count"])
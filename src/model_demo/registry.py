@@ -0,0 +1,156 @@
+"""
+Local, versioned model registry.
+
+Training used to overwrite the artifacts in `models/model_demo`, so replacing a model lost the previous
+one and the server had to be restarted to pick it up. A registry keeps every published version in its own
+directory, with the training config, the evaluation metrics and a checksum of every file, and a `LATEST`
+pointer that the web service watches:
+
+    models/model_demo/registry/
+    ├── LATEST                          "v0003"
+    ├── v0001/
+    │   ├── metadata.json               {"version", "created", "config", "metrics", "files": {fname: sha256}}
+    │   ├── demo_model_weights.pth
+    │   ├── demo_model_normalizer.json
+    │   └── demo_model_scripted.pt
+    ├── v0002/ ...
+    └── v0003/ ...
+
+A version directory is written under a temporary name and renamed into place, and `LATEST` is replaced
+atomically afterwards, so a reader never sees a half-written version. Old versions are kept (the newest
+`keep` of them, and always the one `LATEST` points at) so a rollback is `registry.set_latest("v0002")`.
+
+    registry = ModelRegistry("models/model_demo/registry")
+    version = registry.publish({"demo_model_weights.pth": path, ...}, config=cfg_dict, metrics={"mse": ...})
+    registry.latest(), registry.versions(), registry.metadata(version), registry.path(version)
+
+"""
+from datetime import datetime, timezone
+import hashlib
+import json
+import os
+from pathlib import Path
+import re
+import shutil
+from typing import Any
+
+LATEST_FNAME = "LATEST"
+METADATA_FNAME = "metadata.json"
+VERSION_PATTERN = re.compile(r"^v(\d+)$")
+
+
+def file_sha256(path: str | Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class ModelRegistry:
+    """
+    A directory of versioned model artifacts.
+    Parameters:
+        root (str or Path): registry directory, created on the first publish.
+        keep (int): versions to retain when publishing; older ones are deleted. 0 keeps every version.
+    """
+    def __init__(self, root: str | Path, keep: int = 0):
+        self.root = Path(root)
+        self.keep = keep
+
+    def versions(self) -> list[str]:
+        """ Published versions, oldest first. """
+        if not self.root.is_dir():
+            return []
+        found = [(int(m.group(1)), p.name) for p in self.root.iterdir()
+                 if p.is_dir() and (m := VERSION_PATTERN.match(p.name)) and (p / METADATA_FNAME).exists()]
+        return [name for _, name in sorted(found)]
+
+    def latest(self) -> str | None:
+        """ The version LATEST points at, or None for an empty registry. """
+        try:
+            version = (self.root / LATEST_FNAME).read_text().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def __contains__(self, version: str) -> bool:
+        return VERSION_PATTERN.match(version or "") is not None and (self.root / version / METADATA_FNAME).exists()
+
+    def path(self, version: str) -> Path:
+        if version not in self:
+            raise KeyError(f"Unknown model version {version!r} in {self.root}")
+        return self.root / version
+
+    def metadata(self, version: str) -> dict:
+        with open(self.path(version) / METADATA_FNAME) as f:
+            return json.load(f)
+
+    def verify(self, version: str) -> None:
+        """ Raise ValueError if a file of `version` is missing or does not match its recorded checksum. """
+        directory = self.path(version)
+        for fname, checksum in self.metadata(version)["files"].items():
+            if not (directory / fname).exists() or file_sha256(directory / fname) != checksum:
+                raise ValueError(f"Model version {version!r}: {fname} is missing or does not match its checksum")
+
+    def publish(self, files: dict[str, str | Path], config: dict | None = None, metrics: dict | None = None,
+                set_latest: bool = True) -> str:
+        """
+        Copy `files` ({name in the version directory: source path}) into a new version and return its name.
+        Sources that do not exist are skipped (e.g. no normalizer when normalization is off).
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        versions = self.versions()
+        number = int(VERSION_PATTERN.match(versions[-1]).group(1)) + 1 if versions else 1
+        version = f"v{number:04d}"
+        staging = self.root / f".{version}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+        checksums = {}
+        for fname, source in files.items():
+            if source is not None and Path(source).exists():
+                shutil.copyfile(source, staging / fname)
+                checksums[fname] = file_sha256(staging / fname)
+        metadata = {
+            "version": version,
+            "created": datetime.now(timezone.utc).isoformat(),
+            "config": config or {},
+            "metrics": metrics or {},
+            "files": checksums,
+            }
+        with open(staging / METADATA_FNAME, "w") as f:
+            json.dump(metadata, f, indent=2, default=_json_default)
+        os.replace(staging, self.root / version)
+        if set_latest:
+            self.set_latest(version)
+        self.prune()
+        return version
+
+    def set_latest(self, version: str) -> None:
+        """ Point LATEST at an existing version, e.g. to roll back; watching servers switch to it. """
+        self.path(version)
+        _write_atomic(self.root / LATEST_FNAME, version + "\n")
+
+    def prune(self) -> list[str]:
+        """ Delete the oldest versions beyond `keep`, never the LATEST one; returns the deleted versions. """
+        if self.keep <= 0:
+            return []
+        latest = self.latest()
+        versions = self.versions()
+        removed = [v for v in versions[:-self.keep] if v != latest]
+        for version in removed:
+            shutil.rmtree(self.root / version, ignore_errors=True)
+        return removed
+
+
+def _json_default(value: Any) -> Any:
+    # config dataclasses, paths and numpy scalars in the metadata
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
@@ -0,0 +1,249 @@
+"""
+Offline bulk scoring, without the web service.
+
+Scoring a large file used to mean POSTing it to /batch_predict or reusing the inference snippet in
+`model_demo.py`. `score` streams the input in chunks of `chunk_rows` rows and runs them on a process pool.
+Each worker loads the model once, with the feature normalizer folded in as in the API, and runs with a
+fixed number of torch threads. It writes the predictions of its chunk straight to the output directory,
+in the input's format:
+
+    input                                   output directory
+    rows.csv     (pandas, read in chunks)   part-00000.csv ...      "prediction" column ("prediction_j" for several outputs)
+    rows.npy     (memory-mapped)            part-00000.npy ...
+    rows.parquet (row batches, pyarrow)     part-00000.parquet ...
+    data_shards/ (one split of a ShardedDataset)   a ShardedDataset of the same split: X = features, y = predictions
+
+`progress.json` in the output directory records every completed chunk and is rewritten after each one.
+If a run is interrupted, starting it again with `resume=True` (`--resume`) scores only the missing chunks.
+Resuming is refused unless the input, the chunking, the backend and the model (weights and normalizer,
+by sha256) are the same as in the interrupted run, so one output never mixes two models.
+
+    python -m src.model_demo.scoring data/model_demo/data_shards data/model_demo/scored --split test
+    python -m src.model_demo.scoring rows.csv scored/ --columns feature_X_1,feature_X_2 --workers 4 --chunk-rows 500000
+    python -m src.model_demo.scoring rows.csv scored/ --resume
+
+"""
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import json
+import logging
+import os
+from pathlib import Path
+import time
+from typing import Iterator, Sequence
+
+import numpy as np
+import torch
+
+from src.model_demo.datasets import MANIFEST_FNAME, ShardedDataset, ShardedDatasetWriter, write_shard
+from src.model_demo.inference import worker_threads
+from src.model_demo.registry import file_sha256
+from src.model_demo.web_service.model_loading import load_linear_engine
+
+INPUT_FORMATS = ("csv", "npy", "parquet", "sharded")
+PROGRESS_FNAME = "progress.json"
+
+logger = logging.getLogger(__name__)
+
+
+def input_format(path: str | Path) -> str:
+    """ "sharded" for a dataset directory with a manifest, else the file suffix (csv, npy or parquet). """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"No input at {path}")
+    if path.is_dir():
+        if not (path / MANIFEST_FNAME).exists():
+            raise ValueError(f"{path} is a directory without a {MANIFEST_FNAME}")
+        return "sharded"
+    fmt = path.suffix.lstrip(".").lower()
+    if fmt not in INPUT_FORMATS:
+        raise ValueError(f"Input should be a .csv, .npy or .parquet file or a sharded dataset, got {path}")
+    return fmt
+
+def read_chunks(path: str | Path, fmt: str, chunk_rows: int, columns: Sequence[str] | None = None, split: str = "test",
+                skip: set[int] = frozenset()) -> Iterator[tuple[int, np.ndarray]]:
+    """
+    (index, float32 (rows, n_features)) chunks of the input in order, leaving out the indexes in `skip`.
+    Chunk boundaries only depend on the input and chunk_rows, so the indexes are the same in every run.
+    CSV and Parquet chunks are read by column name (all columns by default); skipped CSV chunks are still parsed.
+    """
+    if fmt == "npy":
+        X = np.load(path, mmap_mode="r")
+        if X.ndim != 2:
+            raise ValueError(f"Input must be a 2D array of (rows, n_features), got shape {X.shape}")
+        for index, start in enumerate(range(0, len(X), chunk_rows)):
+            if index not in skip:
+                yield index, np.ascontiguousarray(X[start:start + chunk_rows], dtype=np.float32)
+    elif fmt == "sharded":
+        index = 0
+        for X, _ in ShardedDataset(path)[split].chunks():  # one memory-mapped shard at a time
+            for start in range(0, len(X), chunk_rows):
+                if index not in skip:
+                    yield index, np.ascontiguousarray(X[start:start + chunk_rows].numpy())
+                index += 1
+    elif fmt == "csv":
+        import pandas as pd
+
+        reader = pd.read_csv(path, usecols=columns, dtype=np.float32, chunksize=chunk_rows)
+        for index, frame in enumerate(reader):
+            if index not in skip:
+                yield index, frame.to_numpy(np.float32) if columns is None else frame[list(columns)].to_numpy(np.float32)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        for index, batch in enumerate(pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns)):
+            if index not in skip:
+                yield index, np.column_stack([column.to_numpy(zero_copy_only=False) for column in batch.columns]).astype(np.float32)
+    else:
+        raise ValueError(f"fmt should be one of {INPUT_FORMATS}, got {fmt!r}")
+
+def write_chunk(output_dir: str | Path, fmt: str, index: int, X: np.ndarray, predictions: np.ndarray, split: str = "test") -> dict:
+    """ Write the predictions of chunk `index` and return its progress entry. """
+    predictions = predictions.reshape(len(X), -1)
+    columns = ["prediction"] if predictions.shape[1] == 1 else [f"prediction_{j}" for j in range(predictions.shape[1])]
+    entry = {"index": index, "n_rows": len(X), "n_features": X.shape[1], "n_outputs": predictions.shape[1]}
+    if fmt == "sharded":
+        return {**entry, "shard": write_shard(output_dir, split, index, X, predictions)}
+    path = Path(output_dir) / f"part-{index:05d}.{fmt}"
+    if fmt == "npy":
+        np.save(path, predictions if predictions.shape[1] > 1 else predictions[:, 0])
+    elif fmt == "csv":
+        np.savetxt(path, predictions, fmt="%.9g", delimiter=",", header=",".join(columns), comments="")
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pq.write_table(pa.table({name: predictions[:, j] for j, name in enumerate(columns)}), path)
+    return {**entry, "file": path.name}
+
+
+## Process pool workers load the model once, in the pool initializer
+_engine = None
+
+def _init_worker(model_path: str, normalizer_path: str | None, backend: str, threads: int) -> None:
+    global _engine
+    torch.set_num_threads(threads)
+    _engine = load_linear_engine(model_path, normalizer_path, backend)
+
+def _score_chunk(output_dir: str, fmt: str, split: str, index: int, X: np.ndarray) -> dict:
+    """ Worker job: predict one chunk and write it, only the small progress entry goes back to the parent. """
+    return write_chunk(output_dir, fmt, index, X, np.asarray(_engine.predict(X)), split)
+
+
+def artifact_identity(path: str | Path | None) -> dict | None:
+    """ Resolved path and sha256 of a model file, None when there is none. """
+    if path is None or not Path(path).exists():
+        return None
+    return {"path": str(Path(path).resolve()), "sha256": file_sha256(path)}
+
+def load_progress(output_dir: Path, settings: dict, resume: bool) -> dict:
+    """ The progress of an earlier run with the same settings when resuming, otherwise a new, empty one. """
+    path = output_dir / PROGRESS_FNAME
+    if resume and path.exists():
+        with open(path) as f:
+            progress = json.load(f)
+        if progress["settings"] != settings:
+            raise ValueError(f"Cannot resume: {path} was written with {progress['settings']}, not {settings}")
+        return progress
+    return {"settings": settings, "chunks": [], "complete": False}
+
+def save_progress(output_dir: Path, progress: dict) -> None:
+    # write then rename, so an interruption never leaves a half-written progress file
+    tmp_path = output_dir / f"{PROGRESS_FNAME}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(progress, f, indent=2)
+    os.replace(tmp_path, output_dir / PROGRESS_FNAME)
+
+def score(input_path: str | Path, output_dir: str | Path, model_path: str | Path, normalizer_path: str | Path | None = None,
+          chunk_rows: int = 1_000_000, workers: int = 1, threads_per_worker: int = 0, backend: str = "torch",
+          columns: Sequence[str] | None = None, split: str = "test", resume: bool = False) -> dict:
+    """
+    Score the input into output_dir chunk by chunk and return a summary (rows, chunks, seconds, rows_per_s).
+    Parameters:
+        workers (int): scoring processes; 1 scores in this process.
+        threads_per_worker (int): torch threads per process, 0 for an equal share of the cores.
+        columns (list of str): CSV/Parquet feature columns, in model input order; all columns by default.
+        split (str): the split of a sharded dataset input.
+        resume (bool): keep the chunks an earlier run with the same settings completed and score the others.
+    """
+    if chunk_rows < 1 or workers < 1:
+        raise ValueError(f"chunk_rows and workers should be positive integers, got {chunk_rows} and {workers}")
+    fmt = input_format(input_path)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    settings = {"input": str(Path(input_path).resolve()), "format": fmt, "chunk_rows": chunk_rows,
+                "columns": list(columns) if columns else None, "split": split if fmt == "sharded" else None,
+                "model": artifact_identity(model_path), "normalizer": artifact_identity(normalizer_path), "backend": backend}
+    progress = load_progress(output_dir, settings, resume)
+    done = {entry["index"] for entry in progress["chunks"]}
+    threads = worker_threads(workers, threads_per_worker)
+    initargs = (str(model_path), None if normalizer_path is None else str(normalizer_path), backend, threads)
+    chunks = read_chunks(input_path, fmt, chunk_rows, columns, split, skip=done)
+    start, rows = time.perf_counter(), 0
+
+    def record(entry: dict) -> None:
+        nonlocal rows
+        rows += entry["n_rows"]
+        progress["chunks"].append(entry)
+        save_progress(output_dir, progress)
+        seconds = time.perf_counter() - start
+        logger.info(f"chunk {entry['index']}: {entry['n_rows']} rows, {rows} rows in {seconds:.1f} s ({rows / seconds:,.0f} rows/s)")
+
+    if workers == 1:
+        _init_worker(*initargs)
+        for index, X in chunks:
+            record(_score_chunk(str(output_dir), fmt, split, index, X))
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as pool:
+            pending = set()
+            for index, X in chunks:
+                pending.add(pool.submit(_score_chunk, str(output_dir), fmt, split, index, X))
+                if len(pending) >= 2 * workers:  # bound the chunks held in memory, reading stays ahead of scoring
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        record(future.result())
+            for future in wait(pending).done:
+                record(future.result())
+    seconds = time.perf_counter() - start
+
+    progress["chunks"].sort(key=lambda entry: entry["index"])
+    if fmt == "sharded" and progress["chunks"]:
+        writer = ShardedDatasetWriter(output_dir)
+        for entry in progress["chunks"]:
+            writer.add_shard(split, entry["shard"], n_features=entry["n_features"], n_targets=entry["n_outputs"])
+        writer.close()
+    summary = {"rows": rows, "chunks": len(progress["chunks"]) - len(done), "resumed_chunks": len(done),
+               "seconds": round(seconds, 3), "rows_per_s": round(rows / seconds, 1) if seconds else None}
+    progress.update(complete=True, summary=summary)
+    save_progress(output_dir, progress)
+    return summary
+
+
+def main() -> None:
+    from src.model_demo.configs.config import MetadataConfigSchema
+    from src.model_demo.registry import ModelRegistry
+
+    cfg = MetadataConfigSchema()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", type=Path, help="a .csv, .npy or .parquet file, or a sharded dataset directory")
+    parser.add_argument("output", type=Path, help="output directory")
+    parser.add_argument("--model-dir", type=Path, default=Path(cfg.path.model_dir))
+    parser.add_argument("--version", default=None, help="score with this registry version instead of --model-dir")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads-per-worker", type=int, default=0, help="0 for cores // workers")
+    parser.add_argument("--backend", choices=("torch", "numpy"), default=cfg.serving.engine_backend)
+    parser.add_argument("--columns", type=lambda s: s.split(","), default=None, help="CSV/Parquet feature columns, comma separated")
+    parser.add_argument("--split", default="test", help="split of a sharded dataset input")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run into the same output directory")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    model_dir = ModelRegistry(cfg.path.registry_dir).path(args.version) if args.version else args.model_dir
+    summary = score(args.input, args.output, model_dir / cfg.fname.model_fname, model_dir / cfg.fname.normalizer_fname,
+                    args.chunk_rows, args.workers, args.threads_per_worker, args.backend, args.columns, args.split, args.resume)
+    print(f"Scored {summary['rows']} rows in {summary['chunks']} chunks ({summary['resumed_chunks']} done earlier) "
+          f"in {summary['seconds']} s: {summary['rows_per_s']} rows/s, written to {args.output}")
+
+if __name__ == "__main__":
+    main()
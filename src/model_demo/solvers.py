@@ -0,0 +1,132 @@
+"""
+Closed-form least-squares solvers for the linear model.
+
+`LinearRegressionModel` is ordinary least squares, so its optimal weights have a closed form and do not
+need epochs of SGD. With a column of ones appended to X (for the bias), the solvers compute
+argmin ||[X 1] theta - y||^2 in one pass over the data:
+
+    normal_equations   accumulate X^T X and X^T y chunk by chunk, then a Cholesky solve
+    streaming_qr       keep only the R factor of the QR decomposition of [X 1 | y], updated chunk by chunk;
+                       one pass like normal_equations, but without squaring the condition number
+    lstsq              torch.linalg.lstsq on the whole data set at once (needs it all in memory)
+
+The streaming solvers hold O(n_features^2) state, so data that does not fit in memory can be fed as an
+iterable of (X, y) chunks:
+
+    weight, bias = solve_least_squares(chunks, solver="streaming_qr")
+    fit_closed_form(model, X_train, y_train, solver="normal_equations")
+
+Accumulation is done in float64 and the result is cast back to the model's dtype.
+
+"""
+from typing import Iterable
+
+import torch
+import torch.nn as nn
+
+SOLVERS = ("sgd", "normal_equations", "lstsq", "streaming_qr")
+STREAMING_SOLVERS = ("normal_equations", "streaming_qr")
+
+
+def _float64(t: torch.Tensor) -> torch.Tensor:
+    # MPS has no float64, accumulate on the CPU there
+    return t.to("cpu" if t.device.type == "mps" else t.device, torch.float64)
+
+def _with_intercept(X: torch.Tensor) -> torch.Tensor:
+    X = _float64(X)
+    return torch.cat([X, X.new_ones(len(X), 1)], dim=1)
+
+def _as_2d(y: torch.Tensor) -> torch.Tensor:
+    return _float64(y).reshape(len(y), -1)
+
+def _lstsq(A: torch.Tensor, b: torch.Tensor) -> torch.Tensor:
+    # gelsd handles rank-deficient systems but is CPU-only; CUDA only has gels
+    return torch.linalg.lstsq(A, b, driver="gelsd" if A.device.type == "cpu" else None).solution
+
+
+class StreamingLeastSquares:
+    """
+    One-pass least-squares fit over (X, y) chunks.
+    Parameters:
+        method (str): "normal_equations" (accumulate X^T X, X^T y) or "qr" (update the R factor of [X 1 | y]).
+    """
+    def __init__(self, method: str = "qr"):
+        if method not in ("normal_equations", "qr"):
+            raise ValueError(f"method should be 'normal_equations' or 'qr', got {method!r}")
+        self.method = method
+        self.n_rows = 0
+        self.n_outputs = None
+        self.gram = None    # X^T X, or the R factor for method="qr"
+        self.moment = None  # X^T y (normal equations only)
+
+    def update(self, X: torch.Tensor, y: torch.Tensor) -> "StreamingLeastSquares":
+        if len(X) != len(y):
+            raise ValueError(f"X and y should have the same number of rows, got {len(X)} and {len(y)}")
+        if len(X) == 0:
+            return self
+        Xa, y = _with_intercept(X), _as_2d(y)
+        if self.n_outputs is not None and y.shape[1] != self.n_outputs:
+            raise ValueError(f"y should have {self.n_outputs} columns, got {y.shape[1]}")
+        self.n_outputs = y.shape[1]
+        self.n_rows += len(Xa)
+        if self.method == "normal_equations":
+            gram, moment = Xa.T @ Xa, Xa.T @ y
+            self.gram = gram if self.gram is None else self.gram + gram
+            self.moment = moment if self.moment is None else self.moment + moment
+        else:
+            stacked = torch.cat([Xa, y], dim=1)
+            if self.gram is not None:
+                stacked = torch.cat([self.gram, stacked])
+            self.gram = torch.linalg.qr(stacked, mode="r").R
+        return self
+
+    def solve(self) -> tuple[torch.Tensor, torch.Tensor]:
+        """ Returns (weight, bias) shaped like nn.Linear's: (output_dim, input_dim) and (output_dim,). """
+        if self.gram is None:
+            raise ValueError("No data to fit, call update() first")
+        if self.method == "normal_equations":
+            A, b = self.gram, self.moment
+            L, info = torch.linalg.cholesky_ex(A)
+            theta = torch.cholesky_solve(b, L) if info == 0 else None
+        else:
+            # [X 1 | y] = QR with R = [[R11, R12], [0, R22]]; the least-squares solution solves R11 theta = R12
+            p = self.gram.shape[1] - self.n_outputs
+            A, b = self.gram[:p, :p], self.gram[:p, p:]
+            full_rank = len(A) == p and bool((A.diagonal().abs() > 1e-12 * A.diagonal().abs().max()).all())
+            theta = torch.linalg.solve_triangular(A, b, upper=True) if full_rank else None
+        if theta is None:
+            # singular system (collinear features or fewer rows than coefficients): minimum-norm solution
+            theta = _lstsq(A, b)
+        return theta[:-1].T.contiguous(), theta[-1].contiguous()
+
+
+def solve_least_squares(chunks: Iterable[tuple[torch.Tensor, torch.Tensor]],
+                        solver: str = "streaming_qr") -> tuple[torch.Tensor, torch.Tensor]:
+    """ Exact least-squares (weight, bias) over an iterable of (X, y) chunks, in float64. """
+    if solver == "lstsq":
+        chunks = list(chunks)
+        Xa = _with_intercept(torch.cat([X for X, _ in chunks]))
+        y = _as_2d(torch.cat([y for _, y in chunks]))
+        theta = _lstsq(Xa, y)
+        return theta[:-1].T.contiguous(), theta[-1].contiguous()
+    if solver not in STREAMING_SOLVERS:
+        raise ValueError(f"solver should be one of {SOLVERS[1:]}, got {solver!r}")
+    accumulator = StreamingLeastSquares("qr" if solver == "streaming_qr" else "normal_equations")
+    for X, y in chunks:
+        accumulator.update(X, y)
+    return accumulator.solve()
+
+def fit_closed_form(model: nn.Module, X: torch.Tensor, y: torch.Tensor, solver: str = "normal_equations",
+                    chunk_rows: int = 65536) -> nn.Module:
+    """ Write the exact least-squares weights into `model.linear` (an nn.Linear), fitting in chunks of rows. """
+    return fit_closed_form_chunks(model, zip(X.split(chunk_rows), y.split(chunk_rows)), solver)
+
+def fit_closed_form_chunks(model: nn.Module, chunks: Iterable[tuple[torch.Tensor, torch.Tensor]],
+                           solver: str = "normal_equations") -> nn.Module:
+    """ Same as fit_closed_form, over an iterable of (X, y) chunks such as the shards of a ShardedSplit. """
+    linear = model.linear
+    weight, bias = solve_least_squares(chunks, solver)
+    with torch.no_grad():
+        linear.weight.copy_(weight.reshape(linear.weight.shape))
+        linear.bias.copy_(bias.reshape(linear.bias.shape))
+    return model
@@ -0,0 +1,185 @@
+"""
+Index-based train/test and k-fold splits.
+
+Splitting by copying rows (`np.random.choice(..., replace=False)` and then `np.delete` on X and y) holds the
+data set several times over while it runs. Here a split is only integers, and the rows are read through
+them when they are used:
+
+    offsets      rows already in random order (the synthetic generators draw i.i.d. rows) are cut at a row
+                 offset; each part is a slice, so a zero-copy view of the tensors or memory-mapped shards
+    permutation  one shuffled array of row numbers (int32 below 2**31 rows), each part a sorted view of it
+    stratified   like permutation, but every bucket of the target keeps the train/test ratio
+    folds        one uint8 fold id per row, for k-fold and stratified k-fold splits
+
+`RowSubset` binds a split's rows to (X, y) and is read like a ShardedSplit: slices are views, index arrays
+are gathered one batch or chunk at a time, so nothing the size of the data set is copied.
+
+    train_rows, test_rows = permutation_split(len(X), train_size=0.8, seed=0)
+    train = RowSubset(X, y, train_rows)
+    for X_batch, y_batch in train.batches(100, shuffle=True):
+        ...
+    for train_rows, test_rows in kfold_splits(len(X), k=5, seed=0, strata=bucketize(y)):
+        ...
+
+"""
+from typing import Any, Iterator
+
+import numpy as np
+import torch
+
+SPLIT_METHODS = ("offsets", "permutation", "stratified")
+
+Rows = slice | np.ndarray
+
+
+def _index_dtype(n: int) -> type:
+    return np.int32 if n < 2**31 else np.int64
+
+def _n_train(n: int, train_size: float) -> int:
+    if not 0 < train_size < 1:
+        raise ValueError(f"train_size should be between 0 and 1, got {train_size}")
+    return int(n * train_size)
+
+def _shuffled_rows(n: int, seed: Any) -> np.ndarray:
+    rows = np.arange(n, dtype=_index_dtype(n))
+    np.random.default_rng(seed).shuffle(rows)
+    return rows
+
+def _grouped_rows(strata: np.ndarray, seed: Any) -> tuple[np.ndarray, np.ndarray]:
+    """ Row numbers in random order within each stratum, strata in increasing order, and the stratum sizes. """
+    strata = np.asarray(strata)
+    rows = _shuffled_rows(len(strata), seed)
+    rows = rows[np.argsort(strata[rows], kind="stable")]
+    return rows, np.bincount(strata)
+
+
+def offset_split(n: int, train_size: float = 0.8) -> tuple[slice, slice]:
+    """ The first n * train_size rows for training, the rest for testing; only valid for rows in random order. """
+    n_train = _n_train(n, train_size)
+    return slice(0, n_train), slice(n_train, n)
+
+def permutation_split(n: int, train_size: float = 0.8, seed: Any = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    A uniformly random train/test split of n rows, as two views of one shuffled index array.
+    Each part is sorted, so gathering it reads the (memory-mapped) data front to back.
+    """
+    n_train = _n_train(n, train_size)
+    rows = _shuffled_rows(n, seed)
+    train, test = rows[:n_train], rows[n_train:]
+    train.sort()
+    test.sort()
+    return train, test
+
+def bucketize(y: Any, n_buckets: int = 10) -> np.ndarray:
+    """ Quantile bucket (0 .. n_buckets - 1) of every row's first target column, to stratify a continuous target. """
+    if not 1 <= n_buckets <= 256:
+        raise ValueError(f"n_buckets should be between 1 and 256, got {n_buckets}")
+    y = np.asarray(y.detach().cpu() if hasattr(y, "detach") else y)
+    y = y.reshape(len(y), -1)[:, 0]
+    edges = np.quantile(y, np.linspace(0, 1, n_buckets + 1)[1:-1])
+    return np.searchsorted(edges, y, side="right").astype(np.uint8)
+
+def stratified_split(strata: Any, train_size: float = 0.8, seed: Any = None) -> tuple[np.ndarray, np.ndarray]:
+    """ A random train/test split that takes train_size of the rows of every stratum (e.g. from `bucketize`). """
+    _n_train(len(strata), train_size)
+    rows, counts = _grouped_rows(strata, seed)
+    # position of every row within its stratum; the first train_size of each stratum go to training
+    starts = np.cumsum(counts) - counts
+    rank = np.arange(len(rows)) - np.repeat(starts, counts)
+    in_train = rank < np.repeat((counts * train_size).astype(np.int64), counts)
+    train, test = rows[in_train], rows[~in_train]
+    train.sort()
+    test.sort()
+    return train, test
+
+def assign_folds(n: int, k: int = 5, seed: Any = None, strata: Any = None) -> np.ndarray:
+    """
+    A uint8 fold id for every row: a random assignment with fold sizes that differ by at most one, also within
+    every stratum when strata is given.
+    """
+    if not 2 <= k <= 256:
+        raise ValueError(f"k should be between 2 and 256, got {k}")
+    if strata is not None and len(strata) != n:
+        raise ValueError(f"strata should have one entry per row, got {len(strata)} for {n} rows")
+    rows = _shuffled_rows(n, seed) if strata is None else _grouped_rows(strata, seed)[0]
+    # dealing consecutive rows round-robin balances every fold, and every stratum since strata are contiguous
+    folds = np.empty(n, dtype=np.uint8)
+    folds[rows] = np.arange(n) % k
+    return folds
+
+def kfold_splits(n: int, k: int = 5, seed: Any = None, strata: Any = None) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """ (train rows, test rows) of each of the k folds, as sorted index arrays. """
+    folds = assign_folds(n, k, seed, strata)
+    for fold in range(k):
+        in_test = folds == fold
+        yield np.flatnonzero(~in_test), np.flatnonzero(in_test)
+
+def train_test_rows(n: int, train_size: float = 0.8, method: str = "offsets", seed: Any = None,
+                    y: Any = None, n_buckets: int = 10) -> tuple[Rows, Rows]:
+    """ Train and test rows with one of SPLIT_METHODS; "stratified" buckets the targets y. """
+    if method == "offsets":
+        return offset_split(n, train_size)
+    if method == "permutation":
+        return permutation_split(n, train_size, seed)
+    if method == "stratified":
+        if y is None:
+            raise ValueError("A stratified split needs the targets y")
+        return stratified_split(bucketize(y, n_buckets), train_size, seed)
+    raise ValueError(f"method should be one of {SPLIT_METHODS}, got {method!r}")
+
+
+class RowSubset:
+    """
+    The rows of (X, y) selected by a slice or an index array, read without copying the rest of the data.
+    X and y are tensors or arrays (memory-mapped ones included), with rows along the first axis.
+    """
+    def __init__(self, X: Any, y: Any, rows: Rows):
+        self.X = X if torch.is_tensor(X) else torch.from_numpy(np.asarray(X))
+        self.y = y if torch.is_tensor(y) else torch.from_numpy(np.asarray(y))
+        if len(self.X) != len(self.y):
+            raise ValueError(f"X and y should have the same number of rows, got {len(self.X)} and {len(self.y)}")
+        self.rows = rows if isinstance(rows, slice) else np.asarray(rows)
+
+    def __len__(self) -> int:
+        if isinstance(self.rows, slice):
+            return len(range(*self.rows.indices(len(self.X))))
+        return len(self.rows)
+
+    def _take(self, rows: Rows) -> tuple[torch.Tensor, torch.Tensor]:
+        if isinstance(rows, slice):
+            return self.X[rows], self.y[rows]
+        index = torch.as_tensor(rows, dtype=torch.int64)
+        return self.X.index_select(0, index), self.y.index_select(0, index)
+
+    def _positions(self, start: int, stop: int) -> Rows:
+        # rows start:stop of this subset, as a slice of the data when possible
+        if isinstance(self.rows, slice):
+            first, _, step = self.rows.indices(len(self.X))
+            return slice(first + start * step, first + stop * step, step)
+        return self.rows[start:stop]
+
+    def tensors(self) -> tuple[torch.Tensor, torch.Tensor]:
+        """ The whole subset: views for a slice, one gather (a copy of just these rows) for an index array. """
+        return self._take(self.rows)
+
+    def chunks(self, chunk_rows: int = 65536) -> Iterator[tuple[torch.Tensor, torch.Tensor]]:
+        """ Consecutive (X, y) chunks in row order, e.g. for the normalizer or the streaming solvers. """
+        for start in range(0, len(self), chunk_rows):
+            yield self._take(self._positions(start, min(start + chunk_rows, len(self))))
+
+    def batches(self, batch_size: int, shuffle: bool = False,
+                generator: torch.Generator | None = None) -> Iterator[tuple[torch.Tensor, torch.Tensor]]:
+        """ Mini-batches; with shuffle, a new permutation of the subset's rows is gathered batch by batch. """
+        if batch_size < 1:
+            raise ValueError(f"batch_size should be a positive integer, got {batch_size}")
+        if not shuffle:
+            yield from self.chunks(batch_size)
+            return
+        order = torch.randperm(len(self), generator=generator).numpy()
+        for start in range(0, len(order), batch_size):
+            positions = order[start:start + batch_size]
+            if isinstance(self.rows, slice):
+                first, _, step = self.rows.indices(len(self.X))
+                yield self._take(first + positions * step)
+            else:
+                yield self._take(self.rows[positions])
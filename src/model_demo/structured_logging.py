@@ -0,0 +1,136 @@
+"""
+Structured, non-blocking logging for `setup_logger`.
+
+The endpoints used to log f-strings of whole input tensors at INFO, formatted and written to the console
+and a rotating file from the request coroutine, so logging cost grew with the batch size and file I/O
+stalled the event loop. With `mode="queue"` the logger only puts records on a queue (`QueueHandler`); a
+`QueueListener` thread formats them and does the I/O. Two logger filters keep the request-path cost
+constant:
+
+- `SamplingFilter` keeps only `sample_rate` of the records marked `extra={"sampled": True}` (the
+  per-request prediction logs); everything else always passes.
+- `PayloadFilter` replaces the `payload` of a record with a bounded summary: tensors and arrays become
+  {"shape", "dtype", "head": first rows}, long lists and strings are cut at `max_items`/`max_chars`.
+
+    logger = setup_logger("api", "api.log", mode="queue", fmt="json", sample_rate=0.1)
+    logger.info("/batch_predict", extra={"sampled": True, "payload": {"inputs": inputs, "predictions": y}})
+    stop_listeners()   # at shutdown: writes the records still queued
+
+`fmt="json"` writes one JSON object per line ({"time", "level", "logger", "message", "payload", ...}).
+
+"""
+import atexit
+from datetime import datetime
+import json
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import random
+
+LOG_MODES = ("sync", "queue")
+LOG_FORMATS = ("text", "json")
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+TEXT_DATEFMT = '%m/%d/%Y %I:%M:%S %p'
+
+# attributes every LogRecord has; anything else on a record came in through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+_listeners: dict[str, QueueListener] = {}
+
+
+def summarize(value, max_items: int = 8, max_chars: int = 512):
+    """ A JSON-ready copy of `value` whose size does not depend on the size of `value`. """
+    if hasattr(value, "shape") and hasattr(value, "tolist"):  # torch tensor or NumPy array
+        if value.ndim == 0:
+            return value.item()
+        if len(value) <= max_items:
+            return summarize(value.tolist(), max_items, max_chars)
+        return {"shape": list(value.shape), "dtype": str(value.dtype),
+                "head": summarize(value[:max_items].tolist(), max_items, max_chars)}
+    if isinstance(value, (list, tuple)):
+        head = [summarize(item, max_items, max_chars) for item in value[:max_items]]
+        return head if len(value) <= max_items else {"len": len(value), "head": head}
+    if isinstance(value, dict):
+        return {key: summarize(item, max_items, max_chars) for key, item in list(value.items())[:max_items]}
+    if isinstance(value, str):
+        return value if len(value) <= max_chars else f"{value[:max_chars]}...({len(value) - max_chars} more chars)"
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    return summarize(str(value), max_items, max_chars)
+
+
+class SamplingFilter(logging.Filter):
+    """ Pass `sample_rate` of the records logged with extra={"sampled": True}; all other records pass. """
+    def __init__(self, sample_rate: float = 1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.seen = self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sampled", False) or self.sample_rate >= 1.0:
+            return True
+        self.seen += 1
+        if random.random() < self.sample_rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class PayloadFilter(logging.Filter):
+    """ Replace record.payload with its bounded summary before it is queued or formatted. """
+    def __init__(self, max_items: int = 8, max_chars: int = 512):
+        super().__init__()
+        self.max_items = max_items
+        self.max_chars = max_chars
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if hasattr(record, "payload"):
+            record.payload = summarize(record.payload, self.max_items, self.max_chars)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """ One JSON object per record: time, level, logger, message, the extra fields and the traceback if any. """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """ The classic text line, followed by the record's payload (already summarized) as JSON. """
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        if hasattr(record, "payload"):
+            text = f"{text} | {json.dumps(record.payload, default=str)}"
+        return text
+
+
+def make_formatter(fmt: str = "text") -> logging.Formatter:
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"fmt should be one of {LOG_FORMATS}, got {fmt!r}")
+    return JsonFormatter() if fmt == "json" else TextFormatter(TEXT_FORMAT, datefmt=TEXT_DATEFMT)
+
+def attach_queue(logger: logging.Logger, handlers: list[logging.Handler]) -> QueueListener:
+    """ Route `logger` through a queue to `handlers`, which then run on a listener thread. """
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners[logger.name] = listener
+    return listener
+
+def stop_listeners(*logger_names: str) -> None:
+    """ Stop the listener threads of the named loggers (all by default) once they have written every queued record. """
+    for name in logger_names or list(_listeners):
+        listener = _listeners.pop(name, None)
+        if listener is not None:
+            listener.stop()
+
+atexit.register(stop_listeners)
@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+
+import pytest
+import torch
+
+from src.model_demo.web_service.audit import AuditLogWriter
+
+
+def test_audit_writer_drains_jsonl_on_close(tmp_path) -> None:
+    path = tmp_path / "predictions.jsonl"
+    audit = AuditLogWriter(path, flush_size=4, flush_interval_s=60)
+    audit.start()
+    audit.write("/predict", [[1.0, 2.0]], -18.1)
+    for i in range(5):
+        audit.write("/batch_predict", torch.tensor([[i, i], [i, -i]], dtype=torch.float32), torch.tensor([0.5, 1.5]))
+    audit.close()
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(records) == 6 and audit.written == 6
+    assert records[0]["endpoint"] == "/predict" and records[0]["predictions"] == [-18.1]
+    assert records[-1]["inputs"] == [[4.0, 4.0], [4.0, -4.0]]
+
+
+def test_audit_writer_rotates(tmp_path) -> None:
+    path = tmp_path / "predictions.jsonl"
+    audit = AuditLogWriter(path, flush_size=1, max_bytes=200, backup_count=2)
+    audit.start()
+    for i in range(10):
+        audit.write("/predict", [[float(i), 0.0]], float(i))
+    audit.close()
+
+    assert (tmp_path / "predictions.jsonl.1").exists()
+    assert (tmp_path / "predictions.jsonl.2").exists()
+    assert not (tmp_path / "predictions.jsonl.3").exists()
+
+
+def test_audit_writer_bounds_queued_rows(tmp_path) -> None:
+    path = tmp_path / "predictions.jsonl"
+    audit = AuditLogWriter(path, flush_size=100, flush_interval_s=60, max_queue_rows=1000)
+    # not started: nothing is written, so the queued rows only grow
+    audit.write("/batch_predict", torch.zeros(600, 2), torch.zeros(600))
+    audit.write("/batch_predict", torch.zeros(600, 2), torch.zeros(600))  # would hold 1200 rows
+    audit.write("/predict", [[1.0, 2.0]], 0.5)
+    assert audit.stats()["queued_rows"] == 601
+    assert audit.dropped == 1 and audit.dropped_rows == 600
+
+    audit.start()
+    audit.close()
+    assert audit.written == 2 and audit.queued_rows == 0
+    audit.write("/batch_predict", torch.zeros(600, 2), torch.zeros(600))  # room again once written
+    assert audit.dropped == 1
+
+
+def test_audit_writer_survives_failed_flushes(tmp_path) -> None:
+    path = tmp_path / "predictions.jsonl"
+    path.mkdir()  # every open(path, "a") fails
+    audit = AuditLogWriter(path, flush_size=1, max_queue_rows=1000)
+    audit.start()
+    for _ in range(3):
+        # 600 rows each: without the budget of a failed record released, every later one would be dropped
+        audit.write("/batch_predict", torch.zeros(600, 2), torch.zeros(600))
+        deadline = time.monotonic() + 5
+        while audit.queued_rows and time.monotonic() < deadline:
+            time.sleep(0.01)
+    audit.close()
+
+    assert audit.failed == 3 and audit.written == 0
+    assert audit.queued_rows == 0 and audit.dropped == 0  # the budget of the failed records was released
+
+
+def test_audit_writer_close_does_not_block_on_a_stuck_writer(tmp_path) -> None:
+    audit = AuditLogWriter(tmp_path / "predictions.jsonl", flush_size=1, max_queue=1, close_timeout_s=0.1)
+    release = threading.Event()
+    audit._flush = lambda items: release.wait()
+    audit.start()
+    audit.write("/predict", [[1.0, 2.0]], 0.5)  # taken by the writer thread, which then hangs
+    deadline = time.monotonic() + 5
+    while audit.queue.qsize() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    audit.write("/predict", [[1.0, 2.0]], 0.5)  # fills the queue
+
+    start = time.monotonic()
+    audit.close()
+    assert time.monotonic() - start < 5
+    release.set()
+
+
+def test_audit_writer_parquet_keeps_one_schema(tmp_path) -> None:
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "predictions.parquet"
+    audit = AuditLogWriter(path, fmt="parquet", flush_size=1)
+    audit.start()
+    audit.write("/predict", [[1.0, 2.0]], -18.1)
+    audit.write("/batch_predict/stream", torch.zeros(2, 2), torch.zeros(2), version="v0001", first_row=0)
+    audit.close()
+
+    table = pq.read_table(path)
+    assert audit.failed == 0 and table.num_rows == 2
+    assert table.column("version").to_pylist() == [None, "v0001"]
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+import torch
+
+from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.utils import infer_model
+from src.model_demo.web_service.batching import MicroBatcher
+
+
+def test_microbatcher_matches_single_row_inference() -> None:
+    model = LR(2, 1)
+    rows = [[float(i), float(-i)] for i in range(10)]
+
+    async def run():
+        batcher = MicroBatcher(lambda inputs: infer_model(model, inputs), max_batch_size=4, max_wait_ms=50)
+        await batcher.start()
+        results = await asyncio.gather(*(batcher.submit(row) for row in rows))
+        await batcher.stop()
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(run())
+    expected = [infer_model(model, torch.tensor([row])).item() for row in rows]
+
+    assert results == pytest.approx(expected, rel=1e-6)
+    assert stats["requests"] == len(rows)
+    assert sum(int(size) * n for size, n in stats["batch_size_histogram"].items()) == len(rows)
+    assert max(int(size) for size in stats["batch_size_histogram"]) <= 4
+
+
+def test_microbatcher_propagates_errors() -> None:
+    def failing(inputs):
+        raise ValueError("boom")
+
+    async def run():
+        batcher = MicroBatcher(failing, max_wait_ms=1)
+        await batcher.start()
+        try:
+            await batcher.submit([1.0, 2.0])
+        finally:
+            await batcher.stop()
+
+    with pytest.raises(ValueError, match="boom"):
+        asyncio.run(run())
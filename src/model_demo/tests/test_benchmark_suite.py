@@ -0,0 +1,64 @@
+import json
+from pathlib import Path
+import subprocess
+import sys
+
+import pytest
+
+from src.model_demo.benchmarks.suite import CASES, compare, environment, find_baseline, load_baselines, main, measure, run
+
+
+def test_measure_and_run_cases() -> None:
+    calls = []
+    result = measure(lambda: calls.append(1), min_time=0.01, rounds=3)
+    assert 0 < result["min_s"] <= result["median_s"] and len(result["rounds_s"]) == 3
+    assert len(calls) >= 3 * result["calls_per_round"]
+
+    assert {"norm[1000]", "infer_model[1]", "api_predict[1]", "api_batch_predict[1000]"} <= set(CASES)
+    results = run(["norm[1000]", "train_step[100]"], min_time=0.01, rounds=2, log=lambda line: None)
+    assert set(results) == {"norm[1000]", "train_step[100]"}
+
+
+def test_compare_flags_regressions_beyond_tolerance() -> None:
+    baseline = {"results": {"a": {"min_s": 1.0}, "b": {"min_s": 1.0}, "c": {"min_s": 1.0}}}
+    results = {"a": {"min_s": 1.2}, "b": {"min_s": 1.5}, "c": {"min_s": 0.5}, "d": {"min_s": 1.0}}
+    statuses = {row["case"]: row["status"] for row in compare(results, baseline, tolerance=0.3)}
+    assert statuses == {"a": "ok", "b": "regression", "c": "faster", "d": "new"}
+
+
+def test_gates_only_against_a_baseline_of_the_same_environment(tmp_path, capsys) -> None:
+    path = tmp_path / "baseline.json"
+    impossible = {"results": {"norm[1000]": {"min_s": 1e-12}}}  # any measurement is a regression against it
+    other = {**impossible, "environment": {**environment(), "cpus": -1}}
+    path.write_text(json.dumps({"baselines": [other]}))
+    args = ["-k", "norm[1000]", "--min-time", "0.01", "--rounds", "2", "--retries", "0", "--baseline", str(path)]
+
+    main(args)  # returns, no exit status 1
+    assert "No baseline for this environment" in capsys.readouterr().out
+    with pytest.raises(SystemExit) as exit_info:
+        main(args + ["--require-baseline"])
+    assert exit_info.value.code == 1
+
+    main(args + ["--save-baseline"])
+    baselines = load_baselines(path)
+    assert len(baselines) == 2 and find_baseline(baselines, environment())["results"].keys() == {"norm[1000]"}
+
+    path.write_text(json.dumps({"baselines": [other, {**impossible, "environment": environment()}]}))
+    with pytest.raises(SystemExit) as exit_info:
+        main(args)
+    assert exit_info.value.code == 1
+
+
+def test_close_restores_the_api_data_dir() -> None:
+    # in a subprocess: the API module is imported once per process, with the data_dir of that moment
+    script = """
+from src.model_demo.benchmarks.suite import close, run
+from src.model_demo.configs.config import PathConfigSchema
+
+data_dir = PathConfigSchema.data_dir
+run(["api_predict[1]"], min_time=0.01, rounds=1, log=lambda line: None)
+assert PathConfigSchema.data_dir != data_dir
+close()
+assert PathConfigSchema.data_dir == data_dir
+"""
+    subprocess.run([sys.executable, "-c", script], check=True, cwd=Path(__file__).parents[3], capture_output=True)
@@ -0,0 +1,30 @@
+import numpy as np
+import torch
+
+from src.model_demo.datasets import ShardedDataset, ShardedDatasetWriter, load_tensors
+
+
+def test_sharded_round_trip(tmp_path) -> None:
+    X, y = torch.randn(25, 2), torch.randn(25, 1)
+    with ShardedDatasetWriter(tmp_path / "shards", shard_rows=10) as writer:
+        writer.write("train", X[:7], y[:7])
+        writer.write("train", X[7:], y[7:])
+        writer.write("test", X[:3], y[:3])
+
+    dataset = ShardedDataset(tmp_path / "shards")
+    train = dataset["train"]
+    assert len(train) == 25 and [shard["n_rows"] for shard in train.shards] == [10, 10, 5]
+    assert isinstance(np.load(tmp_path / "shards" / train.shards[0]["X"], mmap_mode="c"), np.memmap)
+
+    tensors_dict = load_tensors(tmp_path, dataset_dirname="shards")
+    assert torch.equal(tensors_dict["X_train"], X) and torch.equal(tensors_dict["y_train"], y)
+    assert torch.equal(tensors_dict["X_test"], X[:3])
+
+    rows = torch.cat([X_batch for X_batch, _ in train.batches(4, shuffle=True)])
+    assert sorted(rows[:, 0].tolist()) == sorted(X[:, 0].tolist())
+
+
+def test_load_tensors_falls_back_to_pt(tmp_path) -> None:
+    torch.save({"X_train": torch.ones(3, 2)}, tmp_path / "data_tensors.pt")
+
+    assert torch.equal(load_tensors(tmp_path)["X_train"], torch.ones(3, 2))
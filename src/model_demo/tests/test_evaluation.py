@@ -0,0 +1,39 @@
+import numpy as np
+import torch
+import torch.nn as nn
+
+from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.evaluation import StreamingRegressionMetrics
+from src.model_demo.training import minibatches
+from src.model_demo.utils import infer_evaluate_model
+
+
+def test_streaming_metrics_match_full_batch() -> None:
+    torch.manual_seed(0)
+    outputs, targets = torch.randn(1000, 1), torch.randn(1000, 1) + 100.
+    metrics = StreamingRegressionMetrics()
+    for o, t in zip(outputs.split(64), targets.split(64)):
+        metrics.update(o, t)
+    result = metrics.compute()
+
+    residuals = (outputs - targets).double()
+    r2 = 1 - residuals.square().sum() / (targets.double() - targets.double().mean()).square().sum()
+    assert result.n_samples == 1000 and result.loss is None
+    assert np.isclose(result.mse, residuals.square().mean().item())
+    assert np.isclose(result.mae, residuals.abs().mean().item())
+    assert np.isclose(result.r2, r2.item())
+    assert np.isclose(result.residual_quantiles[0.5], residuals.median().item(), atol=1e-3)
+
+
+def test_infer_evaluate_model_writes_memmap(tmp_path) -> None:
+    torch.manual_seed(0)
+    X, y = torch.randn(250, 2), torch.randn(250, 1)
+    model = LR(2, 1)
+    expected = model(X).detach()
+
+    predictions, metrics = infer_evaluate_model(model, minibatches(X, y, 100, shuffle=False), nn.MSELoss(),
+                                                device="cpu", n_samples=len(X), predictions_path=tmp_path / "predictions.npy")
+
+    assert torch.allclose(predictions, expected)
+    assert np.allclose(np.load(tmp_path / "predictions.npy"), expected.numpy())
+    assert np.isclose(metrics.loss, nn.MSELoss()(expected, y).item())
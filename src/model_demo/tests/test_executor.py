@@ -0,0 +1,41 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.model_demo.web_service.executor import InferenceExecutor, ServerBusyError
+
+
+def test_executor_runs_off_the_event_loop() -> None:
+    executor = InferenceExecutor("thread", max_workers=2)
+
+    async def run():
+        return await executor.run(threading.get_ident), threading.get_ident()
+
+    try:
+        worker_thread, loop_thread = asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+    assert worker_thread != loop_thread
+
+
+def test_executor_rejects_past_queue_depth() -> None:
+    executor = InferenceExecutor("thread", max_workers=1, max_queue_depth=2)
+    release = threading.Event()
+
+    async def run():
+        jobs = [asyncio.create_task(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)  # let both jobs reach the pool
+        with pytest.raises(ServerBusyError):
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.gather(*jobs)
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+    assert executor.rejected == 1
+    assert executor.pending == 0
@@ -0,0 +1,282 @@
+import io
+import json
+import time
+import warnings
+
+import numpy as np
+import pytest
+import torch
+from fastapi.testclient import TestClient
+
+from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.configs.config import PathConfigSchema
+
+
+@pytest.fixture(scope="module")
+def api(tmp_path_factory):
+    # keep the API log and prediction records out of the tracked data directory
+    data_dir = PathConfigSchema.data_dir
+    PathConfigSchema.data_dir = str(tmp_path_factory.mktemp("api"))
+    from src.model_demo.web_service import fast_api
+    with TestClient(fast_api.app) as client:
+        # the model loads on a worker thread after startup
+        deadline = time.monotonic() + 30
+        while client.get("/ready").status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        yield fast_api, client
+    PathConfigSchema.data_dir = data_dir
+
+
+def test_ready_after_model_load(api) -> None:
+    fast_api, client = api
+    response = client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json()["ready"] is True and response.json()["load_s"] >= 0
+    assert fast_api.model is not None
+
+
+def test_predict_matches_model(api) -> None:
+    fast_api, client = api
+    response = client.post("/predict", json={"feature_X_1": 20, "feature_X_2": 10.5})
+
+    expected = fast_api.model(torch.tensor([[20.0, 10.5]])).item()
+    assert response.status_code == 200
+    assert response.json()["Model prediction"] == pytest.approx(expected, rel=1e-6)
+
+
+def test_batch_predict_matches_model(api) -> None:
+    fast_api, client = api
+    rows = [[20, 10], [10, 5], [5, 2]]
+    response = client.post("/batch_predict", json={"input_data": rows})
+
+    expected = fast_api.model(torch.tensor(rows, dtype=torch.float32)).flatten().tolist()
+    assert response.status_code == 200
+    assert response.json()["Model prediction"] == pytest.approx(expected, rel=1e-6)
+
+
+def test_batch_predict_rejects_bad_rows(api) -> None:
+    _, client = api
+    response = client.post("/batch_predict", json={"input_data": [[1, 2, 3]]})
+
+    assert response.status_code == 422
+
+
+def test_batch_predict_binary_formats(api) -> None:
+    fast_api, client = api
+    rows = np.array([[20, 10], [10, 5], [5, 2]], dtype=np.float32)
+    expected = fast_api.model(torch.from_numpy(rows)).flatten().tolist()
+
+    raw = client.post("/batch_predict", content=rows.astype("<f4").tobytes(),
+                      headers={"Content-Type": "application/octet-stream", "X-Row-Count": "3", "Accept": "application/octet-stream"})
+    assert raw.status_code == 200 and raw.headers["x-row-count"] == "3"
+    assert np.frombuffer(raw.content, dtype="<f4").tolist() == pytest.approx(expected, rel=1e-6)
+
+    buffer = io.BytesIO()
+    np.save(buffer, rows.astype(np.float64))
+    npy = client.post("/batch_predict", content=buffer.getvalue(),
+                      headers={"Content-Type": "application/x-npy", "Accept": "application/x-npy"})
+    assert npy.status_code == 200
+    assert np.load(io.BytesIO(npy.content)).tolist() == pytest.approx(expected, rel=1e-6)
+
+    # binary in, JSON out (the default response format)
+    mixed = client.post("/batch_predict", content=rows.tobytes(),
+                        headers={"Content-Type": "application/octet-stream", "X-Row-Count": "3"})
+    assert mixed.json()["Model prediction"] == pytest.approx(expected, rel=1e-6)
+
+
+def test_batch_predict_arrow_formats(api) -> None:
+    pa = pytest.importorskip("pyarrow")
+    fast_api, client = api
+    rows = np.array([[20, 10], [10, 5], [5, 2]], dtype=np.float32)
+    expected = fast_api.model(torch.from_numpy(rows)).flatten().tolist()
+    table = pa.table({"feature_X_1": rows[:, 0], "feature_X_2": rows[:, 1]})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    response = client.post("/batch_predict", content=sink.getvalue().to_pybytes(),
+                           headers={"Content-Type": "application/vnd.apache.arrow.stream",
+                                    "Accept": "application/vnd.apache.arrow.file"})
+    assert response.status_code == 200
+    predictions = pa.ipc.open_file(response.content).read_all().column("prediction").to_pylist()
+    assert predictions == pytest.approx(expected, rel=1e-6)
+
+
+def test_batch_predict_arrow_without_pyarrow(api, monkeypatch) -> None:
+    fast_api, client = api
+    monkeypatch.setattr(fast_api.codecs, "HAS_PYARROW", False)
+    arrow = "application/vnd.apache.arrow.stream"
+
+    body = client.post("/batch_predict", content=b"\xff" * 8, headers={"Content-Type": arrow})
+    assert body.status_code == 415 and "pyarrow" in body.json()["detail"]
+    accept = client.post("/batch_predict", json={"input_data": [[1, 2]]}, headers={"Accept": arrow})
+    assert accept.status_code == 406 and "pyarrow" in accept.json()["detail"]
+    # a lower-preference alternative is used instead
+    fallback = client.post("/batch_predict", json={"input_data": [[1, 2]]}, headers={"Accept": f"{arrow}, application/json;q=0.5"})
+    assert fallback.status_code == 200 and len(fallback.json()["Model prediction"]) == 1
+
+
+def test_batch_predict_zero_rows(api) -> None:
+    _, client = api
+    headers = {"Content-Type": "application/octet-stream", "X-Row-Count": "0"}
+
+    assert client.post("/batch_predict", content=b"", headers=headers).json()["Model prediction"] == []
+    raw = client.post("/batch_predict", content=b"", headers={**headers, "Accept": "application/octet-stream"})
+    assert raw.status_code == 200 and raw.content == b"" and raw.headers["x-row-count"] == "0"
+
+
+def test_binary_decoding_silences_the_read_only_warning_locally() -> None:
+    from src.model_demo.web_service import codecs
+
+    body = np.array([[20, 10], [10, 5]], dtype="<f4").tobytes()
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        inputs = codecs.decode_batch(body, "application/octet-stream", "2")
+
+    assert inputs.tolist() == [[20, 10], [10, 5]]
+    assert not [w for w in caught if "not writable" in str(w.message)]
+    # importing the codecs must not hide the warning for the rest of the process
+    assert not [f for f in warnings.filters if f[1] is not None and f[1].search("The given NumPy array is not writable")]
+
+
+def test_batch_predict_format_errors(api) -> None:
+    _, client = api
+    short = client.post("/batch_predict", content=b"\x00" * 20,
+                        headers={"Content-Type": "application/octet-stream", "X-Row-Count": "3"})
+    assert short.status_code == 400
+
+    assert client.post("/batch_predict", content=b"1,2", headers={"Content-Type": "text/csv"}).status_code == 415
+    assert client.post("/batch_predict", json={"input_data": [[1, 2]]}, headers={"Accept": "text/html"}).status_code == 406
+
+
+def test_batch_predict_stream(api, monkeypatch) -> None:
+    fast_api, client = api
+    monkeypatch.setattr(fast_api.cfg.serving, "stream_chunk_rows", 2)
+    rows = [[20, 10], [10, 5], [5, 2], [1, 1], [0, 3]]
+    expected = fast_api.model(torch.tensor(rows, dtype=torch.float32)).flatten().tolist()
+
+    body = "\n".join(json.dumps(row) for row in rows[:-1]) + '\n{"feature_X_1": 0, "feature_X_2": 3}\n'
+    ndjson = client.post("/batch_predict/stream", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert ndjson.status_code == 200
+    assert [json.loads(line) for line in ndjson.text.splitlines()] == pytest.approx(expected, rel=1e-6)
+
+    raw = client.post("/batch_predict/stream", content=np.array(rows, dtype="<f4").tobytes(),
+                      headers={"Content-Type": "application/octet-stream"})
+    assert np.frombuffer(raw.content, dtype="<f4").tolist() == pytest.approx(expected, rel=1e-6)
+
+
+def test_batch_predict_stream_reports_bad_row(api, monkeypatch) -> None:
+    fast_api, client = api
+    monkeypatch.setattr(fast_api.cfg.serving, "stream_chunk_rows", 2)
+    body = "[1, 2]\n[3, 4]\n[5, \"x\"]\n"
+    response = client.post("/batch_predict/stream", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 3
+    assert lines[-1]["row"] == 2
+
+
+def test_batch_predict_stream_finds_the_bad_row_within_a_chunk(api, monkeypatch) -> None:
+    fast_api, client = api
+    monkeypatch.setattr(fast_api.cfg.serving, "stream_chunk_rows", 4)
+    body = "[1, 2]\n[3, 4\n[5, 6]\n"  # a JSON syntax error on row 1
+    response = client.post("/batch_predict/stream", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0] == pytest.approx(fast_api.model(torch.tensor([[1., 2.]])).item(), rel=1e-6)
+    assert len(lines) == 2 and lines[1]["row"] == 1
+
+
+def test_batch_predict_stream_limits_line_length(api, monkeypatch) -> None:
+    fast_api, client = api
+    monkeypatch.setattr(fast_api.cfg.serving, "stream_max_line_bytes", 32)
+
+    def body():
+        yield b"[1, 2]\n["
+        for _ in range(10):
+            yield b"1" * 16  # never a newline
+    response = client.post("/batch_predict/stream", content=body(), headers={"Content-Type": "application/x-ndjson"})
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 2 and "longer than 32 bytes" in lines[1]["error"] and lines[1]["row"] == 1
+
+
+def test_batch_predict_stream_aborts_truncated_binary_body(api, monkeypatch) -> None:
+    from src.model_demo.web_service.streaming import StreamAborted
+
+    fast_api, client = api
+    monkeypatch.setattr(fast_api.cfg.serving, "stream_chunk_rows", 2)
+    body = np.array([[1, 2], [3, 4], [5, 6]], dtype="<f4").tobytes()[:-4]  # the last row is cut in half
+    # the 200 status and the first chunk are already out; the connection is aborted, not ended cleanly
+    with pytest.raises(StreamAborted, match="after 2 rows"):
+        client.post("/batch_predict/stream", content=body, headers={"Content-Type": "application/octet-stream"})
+
+
+def test_responses_name_the_model_version(api) -> None:
+    fast_api, client = api
+    response = client.post("/predict", json={"feature_X_1": 20, "feature_X_2": 10.5})
+
+    version = fast_api.store.current.version
+    assert response.headers["x-model-version"] == version and response.json()["Model version"] == version
+    assert client.get("/models/versions").json()["current"] == version
+
+    unknown = client.post("/batch_predict", json={"input_data": [[1, 2]]}, headers={"X-Model-Version": "v9999"})
+    assert unknown.status_code == 404
+
+
+def test_models_by_id(api, tmp_path, monkeypatch) -> None:
+    fast_api, client = api
+    monkeypatch.setattr(fast_api.cfg.path, "models_dir", str(tmp_path))
+    torch.manual_seed(0)
+    model = LR(3, 2)
+    (tmp_path / "customer-1").mkdir()
+    torch.save(model.state_dict(), tmp_path / "customer-1" / fast_api.cfg.fname.model_fname)
+
+    rows = [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]
+    expected = model(torch.tensor(rows)).tolist()
+    single = client.post("/models/customer-1/predict", json={"features": rows[0]})
+    batch = client.post("/models/customer-1/batch_predict", json={"input_data": rows})
+    assert single.status_code == 200 and single.json()["Model prediction"] == pytest.approx(expected[0], rel=1e-5)
+    assert batch.status_code == 200 and np.allclose(batch.json()["Model prediction"], expected, rtol=1e-5)
+
+    assert client.post("/models/customer-1/predict", json={"features": [1.0, 2.0]}).status_code == 422
+    assert client.post("/models/customer-2/predict", json={"features": [1.0]}).status_code == 404
+    stats = client.get("/stats/models").json()
+    assert stats["loaded"] == ["customer-1"] and stats["hits"] >= 2
+
+
+def test_result_cache_runs_only_the_misses(api, monkeypatch) -> None:
+    from src.model_demo.web_service.result_cache import PredictionCache
+
+    fast_api, client = api
+    cache = PredictionCache(max_entries=100)
+    monkeypatch.setattr(fast_api, "result_cache", cache)
+
+    first = client.post("/predict", json={"feature_X_1": 3, "feature_X_2": 4}).json()["Model prediction"]
+    rows = [[1, 2], [3, 4], [1, 2], [5, 6]]
+    batch = client.post("/batch_predict", json={"input_data": rows}).json()["Model prediction"]
+
+    expected = fast_api.model(torch.tensor(rows, dtype=torch.float32)).flatten().tolist()
+    assert batch == pytest.approx(expected, rel=1e-6) and batch[1] == first
+    # [3, 4] came from /predict; [1, 2] and [5, 6] ran once; the repeated [1, 2] is a miss of the same batch
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 4)
+
+    fast_api.invalidate_results(fast_api.store.current)
+    assert len(cache) == 0
+
+
+def test_metrics_break_requests_down_by_stage(api) -> None:
+    _, client = api
+    client.post("/predict", json={"feature_X_1": 20, "feature_X_2": 10.5})
+    client.post("/batch_predict", json={"input_data": [[1, 2], [3, 4]]})
+    assert client.post("/predict", content=b"{not json", headers={"Content-Type": "application/json"}).status_code == 422
+
+    response = client.get("/metrics")
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    for stage in ("parse", "validate", "tensorize", "infer", "serialize", "audit"):
+        assert f'model_demo_stage_duration_seconds_count{{endpoint="/predict",stage="{stage}"}}' in text
+    assert 'model_demo_http_requests_total{endpoint="/predict",method="POST",status="422"} 1' in text
+    assert 'model_demo_request_rows_bucket{endpoint="/batch_predict",le="4"}' in text
+    assert "model_demo_model_info{" in text and "model_demo_executor_pending" in text
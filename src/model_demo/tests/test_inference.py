@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+import torch
+
+from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.inference import COLUMNWISE_MIN_ROWS, LinearInferenceEngine
+from src.model_demo.models.model_demo import export_serving_artifact
+from src.model_demo.utils import infer_model
+
+
+@pytest.mark.parametrize("n_rows", [1, 100, COLUMNWISE_MIN_ROWS + 1])
+@pytest.mark.parametrize("output_dim", [1, 3])
+def test_engine_matches_infer_model(n_rows, output_dim) -> None:
+    torch.manual_seed(0)
+    model = LR(2, output_dim)
+    X = torch.randn(n_rows, 2)
+    expected = infer_model(model, X, device="cpu").reshape(n_rows, -1).squeeze(-1)
+
+    torch_engine = LinearInferenceEngine.from_model(model)
+    numpy_engine = LinearInferenceEngine.from_model(model, backend="numpy")
+
+    assert torch.allclose(torch_engine.predict(X), expected, atol=1e-5)
+    assert np.allclose(numpy_engine.predict(X.numpy()), expected.numpy(), atol=1e-5)
+
+
+def test_engine_writes_into_out_buffer() -> None:
+    engine = LinearInferenceEngine.from_model(LR(2, 1))
+    X = torch.randn(64, 2)
+    out = torch.empty(64)
+
+    assert engine.predict(X, out=out) is out
+    assert torch.allclose(out, engine.predict(X))
+
+
+@pytest.mark.parametrize("output_dim", [1, 3])
+def test_engine_predicts_nothing_for_zero_rows(output_dim) -> None:
+    model = LR(2, output_dim)
+    shape = (0,) if output_dim == 1 else (0, output_dim)
+
+    assert LinearInferenceEngine.from_model(model).predict(torch.empty(0, 2)).shape == shape
+    assert LinearInferenceEngine.from_model(model, backend="numpy").predict(np.empty((0, 2))).shape == shape
+
+
+def test_engine_npz_round_trip(tmp_path) -> None:
+    model = LR(2, 1)
+    LinearInferenceEngine.from_model(model).save_npz(tmp_path / "weights.npz")
+    engine = LinearInferenceEngine.from_npz(tmp_path / "weights.npz")
+
+    X = np.random.default_rng(0).normal(size=(10, 2)).astype(np.float32)
+    assert engine.backend == "numpy"
+    assert np.allclose(engine.predict(X), infer_model(model, torch.from_numpy(X), device="cpu").numpy(), atol=1e-6)
+
+
+def test_torchscript_artifact_matches_model(tmp_path) -> None:
+    model = LR(2, 1)
+    path = tmp_path / "model_scripted.pt"
+    export_serving_artifact(model, path)
+    scripted = torch.jit.freeze(torch.jit.load(path).eval())
+    X = torch.randn(10, 2)
+
+    with torch.inference_mode():
+        assert torch.allclose(scripted(X), model(X))
@@ -0,0 +1,41 @@
+import asyncio
+
+from fastapi import FastAPI, Request
+import httpx
+import pytest
+
+from src.model_demo.web_service.load_test import LoadTestConfig, compare, parse_batch_sizes, run_load_test
+
+
+def test_parse_batch_sizes() -> None:
+    assert parse_batch_sizes("16:0.6, 256:0.3,4096") == {16: 0.6, 256: 0.3, 4096: 1.0}
+    with pytest.raises(ValueError):
+        parse_batch_sizes("0:1")
+
+
+def test_run_load_test_counts_requests_per_kind() -> None:
+    app = FastAPI()
+
+    @app.post("/predict")
+    async def predict(request: Request):
+        await request.json()
+        return {"Prediction": 1.0}
+
+    @app.post("/batch_predict")
+    async def batch_predict(request: Request):
+        return {"Predictions": [1.0] * len((await request.json())["input_data"])}
+
+    config = LoadTestConfig(url="http://test", concurrency=4, requests=200, warmup_s=0, batch_ratio=0.5,
+                            batch_sizes={4: 1.0, 32: 1.0})
+    results = asyncio.run(run_load_test(config, transport=httpx.ASGITransport(app=app)))
+
+    assert results["overall"]["requests"] == 200 and results["overall"]["errors"] == 0
+    assert set(results["by_kind"]) == {"predict", "batch_4", "batch_32"}
+    assert sum(section["requests"] for section in results["by_kind"].values()) == 200
+    assert results["status_codes"] == {"200": 200}
+    rows = sum(section["rows_per_s"] for section in results["by_kind"].values())
+    assert results["overall"]["rows_per_s"] == pytest.approx(rows, rel=1e-3)
+    assert results["overall"]["p50_ms"] <= results["overall"]["p99_ms"]
+
+    lines = compare(results, {"results": results})
+    assert len(lines) == 4 and all("+0.0%" in line for line in lines)
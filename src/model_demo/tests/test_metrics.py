@@ -0,0 +1,46 @@
+from src.model_demo.web_service.metrics import Counter, Gauge, Histogram, MetricsRegistry, StageTimer
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    histogram = Histogram("latency_seconds", "Latency.", ("endpoint",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/predict")
+    histogram.observe(0.5, "/predict")
+    histogram.observe_many(2.0, 2, "/predict")
+
+    lines = list(histogram.samples())
+    assert lines == [
+        'model_demo_latency_seconds_bucket{endpoint="/predict",le="0.1"} 1',
+        'model_demo_latency_seconds_bucket{endpoint="/predict",le="1"} 2',
+        'model_demo_latency_seconds_bucket{endpoint="/predict",le="+Inf"} 4',
+        'model_demo_latency_seconds_sum{endpoint="/predict"} 4.55',
+        'model_demo_latency_seconds_count{endpoint="/predict"} 4',
+    ]
+
+
+def test_registry_renders_recorded_and_collected_metrics() -> None:
+    registry = MetricsRegistry()
+    requests = registry.register(Counter("requests_total", "Requests.", ("status",)))
+    requests.inc(1, 200)
+    requests.inc(2, 200)
+    registry.register(Gauge("unused", "Never set, not rendered."))
+
+    @registry.collect
+    def queue_depth():
+        gauge = Gauge("queue_depth", 'Queued "jobs".')
+        gauge.set(3)
+        return [gauge]
+
+    text = registry.render()
+    assert "# TYPE model_demo_requests_total counter" in text
+    assert 'model_demo_requests_total{status="200"} 3' in text
+    assert "model_demo_queue_depth 3" in text and "unused" not in text
+
+
+def test_stage_timer_observes_each_stage() -> None:
+    histogram = Histogram("stage_seconds", "Stages.", ("endpoint", "stage"))
+    timer = StageTimer(histogram, "/predict")
+    timer.mark("parse")
+    timer.mark("infer")
+
+    assert set(histogram.values) == {("/predict", "parse"), ("/predict", "infer")}
+    assert all(state[2] == 1 for state in histogram.values.values())
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+
+import pytest
+import torch
+
+from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.web_service.model_cache import ModelCache, UnknownModel, engine_nbytes
+from src.model_demo.web_service.model_loading import load_linear_engine
+
+
+def test_lru_eviction_under_the_memory_budget() -> None:
+    loads = []
+
+    def load(model_id):
+        if model_id == "missing":
+            raise FileNotFoundError(model_id)
+        loads.append(model_id)
+        return model_id
+
+    cache = ModelCache(load, max_bytes=200, sizeof=lambda model: 100)
+
+    async def scenario():
+        await cache.get("a")
+        await cache.get("b")
+        await cache.get("a")      # hit: "b" is now the least recently used
+        await cache.get("c")      # over budget: evicts "b"
+        assert cache.stats()["loaded"] == ["a", "c"]
+        await cache.get("b")      # loaded again, evicts "a"
+        with pytest.raises(UnknownModel):
+            await cache.get("missing")
+        with pytest.raises(UnknownModel):
+            await cache.get("../escape")
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert loads == ["a", "b", "c", "b"]
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 5, 2)
+    assert stats["loaded"] == ["c", "b"] and stats["bytes"] == 200
+
+
+def test_concurrent_requests_share_one_load() -> None:
+    release, loads = threading.Event(), []
+
+    def load(model_id):
+        loads.append(model_id)
+        release.wait()
+        return object()
+
+    cache = ModelCache(load, sizeof=lambda model: 1)
+
+    async def scenario():
+        requests = [asyncio.create_task(cache.get("a")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*requests)
+
+    models = asyncio.run(scenario())
+    assert loads == ["a"] and models[0] is models[1] is models[2]
+
+
+def test_engine_dimensions_come_from_the_weights(tmp_path) -> None:
+    torch.manual_seed(0)
+    model = LR(3, 2)
+    torch.save(model.state_dict(), tmp_path / "weights.pth")
+
+    engine = load_linear_engine(tmp_path / "weights.pth", tmp_path / "no_normalizer.json")
+    X = torch.randn(4, 3)
+    assert (engine.input_dim, engine.output_dim) == (3, 2)
+    assert torch.allclose(engine.predict(X), model(X).detach(), atol=1e-6)
+    assert engine_nbytes(engine) > 3 * 2 * 4
@@ -0,0 +1,30 @@
+import numpy as np
+import torch
+
+from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.normalization import FeatureNormalizer
+
+
+def test_streaming_fit_matches_full_data(tmp_path) -> None:
+    X = np.random.default_rng(0).normal([10., -5.], [3., 0.5], size=(1000, 2)).astype(np.float32)
+    normalizer = FeatureNormalizer.fit(torch.from_numpy(X).split(128))
+
+    assert np.allclose(normalizer.mean, X.mean(axis=0, dtype=np.float64))
+    assert np.allclose(normalizer.std, X.std(axis=0, dtype=np.float64))
+
+    normalizer.save(tmp_path / "normalizer.json")
+    loaded = FeatureNormalizer.load(tmp_path / "normalizer.json")
+    scaled = loaded.transform(torch.from_numpy(X))
+    assert torch.allclose(scaled.mean(0), torch.zeros(2), atol=1e-5)
+    assert np.allclose(loaded.transform(X), scaled.numpy(), atol=1e-5)
+
+
+def test_folded_model_takes_raw_inputs() -> None:
+    X = torch.randn(50, 2) * 3 + 10
+    normalizer = FeatureNormalizer().update(X)
+    model = LR(2, 1)
+    expected = model(normalizer.transform(X)).detach()
+
+    normalizer.fold_into_model(model)
+
+    assert torch.allclose(model(X).detach(), expected, atol=1e-5)
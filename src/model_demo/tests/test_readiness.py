@@ -0,0 +1,39 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.model_demo.web_service.readiness import ModelNotReadyError, Readiness
+
+
+def test_requests_wait_for_the_loader() -> None:
+    async def scenario():
+        release = threading.Event()
+        readiness = Readiness(lambda: release.wait() and {"load_s": 0.5})
+        readiness.start()
+
+        assert not readiness.ready and readiness.status()["ready"] is False
+        with pytest.raises(ModelNotReadyError):
+            await readiness.wait(timeout_s=0.01)
+        waiter = asyncio.create_task(readiness.wait(timeout_s=5))
+        release.set()
+        await waiter
+        assert readiness.ready and readiness.status()["load_s"] == 0.5
+
+    asyncio.run(scenario())
+
+
+def test_failed_load_is_reported() -> None:
+    def loader():
+        raise RuntimeError("Model file not found")
+
+    async def scenario():
+        readiness = Readiness(loader)
+        readiness.start()
+        await readiness.stop()
+
+        assert not readiness.ready and "Model file not found" in readiness.status()["error"]
+        with pytest.raises(ModelNotReadyError, match="failed to load"):
+            await readiness.wait(timeout_s=1)
+
+    asyncio.run(scenario())
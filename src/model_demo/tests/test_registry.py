@@ -0,0 +1,86 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from src.model_demo.registry import ModelRegistry
+from src.model_demo.web_service.model_store import LOCAL_VERSION, ModelStore, ServedModel, UnknownModelVersion
+
+
+def _publish(registry: ModelRegistry, tmp_path: Path, weights: bytes, **kwargs) -> str:
+    source = tmp_path / "source.pth"
+    source.write_bytes(weights)
+    return registry.publish({"weights.pth": source, "missing.json": tmp_path / "missing.json"}, **kwargs)
+
+
+def test_publish_versions_and_rollback(tmp_path) -> None:
+    registry = ModelRegistry(tmp_path / "registry", keep=2)
+    assert registry.versions() == [] and registry.latest() is None
+
+    v1 = _publish(registry, tmp_path, b"one", config={"lr": 0.01}, metrics={"mse": 0.5})
+    v2 = _publish(registry, tmp_path, b"two")
+    assert (v1, v2) == ("v0001", "v0002") and registry.latest() == v2
+    assert registry.metadata(v1)["metrics"] == {"mse": 0.5}
+    assert list(registry.metadata(v1)["files"]) == ["weights.pth"]  # missing sources are skipped
+
+    registry.set_latest(v1)
+    v3 = _publish(registry, tmp_path, b"three", set_latest=False)
+    v4 = _publish(registry, tmp_path, b"four", set_latest=False)
+    # keep=2 keeps the two newest versions and the LATEST one
+    assert registry.versions() == [v1, v3, v4] and registry.latest() == v1
+    with pytest.raises(KeyError):
+        registry.set_latest("v0002")
+
+
+def test_verify_detects_a_modified_file(tmp_path) -> None:
+    registry = ModelRegistry(tmp_path / "registry")
+    version = _publish(registry, tmp_path, b"weights")
+    registry.verify(version)
+
+    (registry.path(version) / "weights.pth").write_bytes(b"tampered")
+    with pytest.raises(ValueError, match="checksum"):
+        registry.verify(version)
+
+
+def _store(tmp_path: Path, registry: ModelRegistry) -> ModelStore:
+    def build(version, model_dir):
+        weights = (Path(model_dir) / "weights.pth").read_bytes()
+        return ServedModel(version, Path(model_dir), weights, lambda inputs: weights)
+
+    (tmp_path / "weights.pth").write_bytes(b"local")
+    return ModelStore(build, registry, fallback_dir=tmp_path, poll_s=0)
+
+
+def test_store_swaps_to_latest_and_pins_versions(tmp_path) -> None:
+    registry = ModelRegistry(tmp_path / "registry")
+    store = _store(tmp_path, registry)
+    assert store.initial_version() == LOCAL_VERSION
+
+    async def scenario():
+        store.install(store.load(store.initial_version()))
+        v1 = _publish(registry, tmp_path, b"one")
+        await store.check_registry()
+        assert store.current.version == v1 and store.current.model == b"one"
+        assert list(store.loaded) == [v1]  # the local model is released
+
+        pinned = await store.get(LOCAL_VERSION)
+        assert pinned.model == b"local" and (await store.get()).version == v1
+        with pytest.raises(UnknownModelVersion):
+            await store.get("v0042")
+
+    asyncio.run(scenario())
+
+
+def test_store_keeps_serving_when_a_version_fails_to_load(tmp_path) -> None:
+    registry = ModelRegistry(tmp_path / "registry")
+    v1 = _publish(registry, tmp_path, b"one")
+    store = _store(tmp_path, registry)
+
+    async def scenario():
+        store.install(store.load(store.initial_version()))
+        v2 = _publish(registry, tmp_path, b"two")
+        (registry.path(v2) / "weights.pth").write_bytes(b"corrupt")
+        await store.check_registry()
+        assert store.current.version == v1 and store.swaps == 0
+
+    asyncio.run(scenario())
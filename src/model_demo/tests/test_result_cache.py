@@ -0,0 +1,51 @@
+import numpy as np
+
+from src.model_demo.web_service.result_cache import PredictionCache, row_keys
+
+
+def test_lookup_returns_misses_in_order_and_evicts_lru() -> None:
+    cache = PredictionCache(max_entries=3)
+    keys = row_keys(np.array([[1, 2], [3, 4], [5, 6], [1, 2]], dtype=np.float32))
+    assert keys[0] == keys[3] and keys[0] != keys[1]
+
+    values, missing = cache.lookup("v1", keys[:3])
+    assert values == [None, None, None] and missing == [0, 1, 2]
+    cache.store("v1", keys[:3], [10.0, 30.0, 50.0])
+
+    values, missing = cache.lookup("v1", keys)
+    assert values == [10.0, 30.0, 50.0, 10.0] and missing == []
+    assert cache.lookup("v2", keys[:1])[1] == [0]  # other model version, other entries
+
+    cache.store("v1", row_keys(np.array([[7, 8]], dtype=np.float32)), [70.0])
+    assert cache.lookup("v1", keys[1:2])[1] == [0]  # [3, 4] was the least recently used
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_and_invalidation() -> None:
+    now = [0.0]
+    cache = PredictionCache(max_entries=10, ttl_s=5, clock=lambda: now[0])
+    keys = row_keys(np.array([[1, 2]], dtype=np.float32))
+    cache.store("v1", keys, [1.0])
+
+    now[0] = 4.0
+    assert cache.lookup("v1", keys)[0] == [1.0]
+    now[0] = 6.0
+    assert cache.lookup("v1", keys)[0] == [None] and cache.stats()["expired"] == 1
+
+    cache.store("v1", keys, [1.0])
+    cache.invalidate()
+    assert len(cache) == 0 and cache.lookup("v1", keys)[0] == [None]
+
+
+def test_latency_saved_uses_the_measured_miss_time() -> None:
+    cache = PredictionCache(max_entries=10)
+    keys = row_keys(np.array([[1, 2], [3, 4]], dtype=np.float32))
+    cache.record_inference(0.002, 1)     # one /predict miss
+    cache.record_inference(0.001, 100)   # a batch of misses
+    cache.store("v1", keys, [1.0, 2.0])
+
+    cache.lookup("v1", keys[:1])         # single row: saves a whole request
+    cache.lookup("v1", keys)             # batch rows: saves their per-row time
+    stats = cache.stats()
+    assert stats["hit_ratio"] == 1.0
+    assert np.isclose(stats["latency_saved_s"], 0.002 + 2 * 0.00001)
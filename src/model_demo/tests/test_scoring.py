@@ -0,0 +1,70 @@
+import json
+
+import numpy as np
+import pytest
+import torch
+
+from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.datasets import ShardedDataset, ShardedDatasetWriter
+from src.model_demo.scoring import PROGRESS_FNAME, score
+
+
+def _save_model(tmp_path):
+    torch.manual_seed(0)
+    model = LR(2, 1)
+    torch.save(model.state_dict(), tmp_path / "weights.pth")
+    return tmp_path / "weights.pth", model.linear.weight.detach().numpy(), model.linear.bias.detach().numpy()
+
+
+def test_score_npy_and_csv_in_chunks(tmp_path) -> None:
+    model_path, weight, bias = _save_model(tmp_path)
+    X = np.random.default_rng(0).normal(10, 3, (1000, 2)).astype(np.float32)
+    expected = X @ weight[0] + bias[0]
+
+    np.save(tmp_path / "rows.npy", X)
+    summary = score(tmp_path / "rows.npy", tmp_path / "npy_out", model_path, chunk_rows=300, workers=2)
+    assert summary["rows"] == 1000 and summary["chunks"] == 4
+    parts = [np.load(tmp_path / "npy_out" / f"part-{i:05d}.npy") for i in range(4)]
+    assert np.allclose(np.concatenate(parts), expected, atol=1e-4)
+
+    # columns are picked by name, in model input order
+    np.savetxt(tmp_path / "rows.csv", X[:, ::-1], delimiter=",", header="feature_X_2,feature_X_1", comments="")
+    score(tmp_path / "rows.csv", tmp_path / "csv_out", model_path, chunk_rows=400, columns=["feature_X_1", "feature_X_2"])
+    parts = [np.loadtxt(tmp_path / "csv_out" / f"part-{i:05d}.csv", delimiter=",", skiprows=1) for i in range(3)]
+    assert np.allclose(np.concatenate(parts), expected, atol=1e-3)
+
+
+def test_score_sharded_dataset_resumes_missing_chunks(tmp_path) -> None:
+    model_path, weight, bias = _save_model(tmp_path)
+    X = np.random.default_rng(1).normal(10, 3, (500, 2)).astype(np.float32)
+    with ShardedDatasetWriter(tmp_path / "data", shard_rows=200) as writer:
+        writer.write("test", X, np.zeros(len(X)))
+
+    output = tmp_path / "scored"
+    assert score(tmp_path / "data", output, model_path, chunk_rows=150)["chunks"] == 5  # 150+50 per full shard, then 100
+
+    # an interrupted run: the last chunk was never recorded
+    with open(output / PROGRESS_FNAME) as f:
+        progress = json.load(f)
+    progress["chunks"].pop()
+    progress["complete"] = False
+    with open(output / PROGRESS_FNAME, "w") as f:
+        json.dump(progress, f)
+    summary = score(tmp_path / "data", output, model_path, chunk_rows=150, resume=True)
+    assert summary["chunks"] == 1 and summary["resumed_chunks"] == 4
+
+    features, predictions = ShardedDataset(output)["test"].tensors()
+    assert np.array_equal(features.numpy(), X)
+    assert np.allclose(predictions.numpy()[:, 0], X @ weight[0] + bias[0], atol=1e-4)
+
+
+def test_resume_with_other_weights_is_refused(tmp_path) -> None:
+    model_path, _, _ = _save_model(tmp_path)
+    np.save(tmp_path / "rows.npy", np.ones((100, 2), dtype=np.float32))
+    score(tmp_path / "rows.npy", tmp_path / "out", model_path, chunk_rows=40)
+
+    with pytest.raises(ValueError, match="Cannot resume"):
+        score(tmp_path / "rows.npy", tmp_path / "out", model_path, chunk_rows=40, backend="numpy", resume=True)
+    torch.save(LR(2, 1).state_dict(), model_path)  # retrained in place, same path
+    with pytest.raises(ValueError, match="Cannot resume"):
+        score(tmp_path / "rows.npy", tmp_path / "out", model_path, chunk_rows=40, resume=True)
@@ -0,0 +1,35 @@
+import torch
+
+from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.inference import LinearInferenceEngine, worker_threads
+from src.model_demo.web_service import executor
+from src.model_demo.web_service.shared_weights import attach_weights, publish_weights
+
+
+def test_attached_weights_match_and_are_not_copied(tmp_path) -> None:
+    torch.manual_seed(0)
+    model = LR(3, 2)
+    directory = publish_weights(model, tmp_path / "weights")
+
+    attached = attach_weights(directory)
+    X = torch.randn(5, 3)
+    assert torch.allclose(attached(X), model(X))
+
+    engine = LinearInferenceEngine.from_model(attached)
+    assert engine.weight_t.data_ptr() == attached.linear.weight.data_ptr()
+    assert torch.allclose(engine.predict(X), model(X).detach())
+
+
+def test_process_worker_attaches_to_shared_weights(tmp_path) -> None:
+    model = LR(2, 1)
+    directory = publish_weights(model, tmp_path / "weights")
+
+    executor.load_worker_model(tmp_path / "missing.pth", shared_weights_dir=directory)
+    X = torch.tensor([[1.0, 2.0]])
+    assert torch.allclose(executor.worker_infer(X), model(X).detach().flatten())
+
+
+def test_worker_threads_split_the_cores() -> None:
+    assert worker_threads(4, cpu_count=16) == 4
+    assert worker_threads(32, cpu_count=16) == 1
+    assert worker_threads(4, threads_per_worker=2, cpu_count=16) == 2
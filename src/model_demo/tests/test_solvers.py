@@ -0,0 +1,29 @@
+import pytest
+import torch
+
+from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.solvers import SOLVERS, fit_closed_form, solve_least_squares
+
+
+@pytest.mark.parametrize("solver", SOLVERS[1:])
+def test_solver_writes_exact_weights(solver) -> None:
+    torch.manual_seed(0)
+    X = torch.normal(10, 3, (1000, 2))
+    y = X @ torch.tensor([[2.], [-3.]]) + 4.
+    model = fit_closed_form(LR(2, 1), X, y, solver=solver, chunk_rows=128)
+
+    assert torch.allclose(model.linear.weight, torch.tensor([[2., -3.]]), atol=1e-4)
+    assert torch.allclose(model.linear.bias, torch.tensor([4.]), atol=1e-3)
+
+
+@pytest.mark.parametrize("solver", ["normal_equations", "streaming_qr"])
+def test_streaming_solver_matches_lstsq(solver) -> None:
+    torch.manual_seed(0)
+    X, y = torch.randn(500, 3), torch.randn(500, 2)
+    chunks = list(zip(X.split(64), y.split(64)))
+
+    weight, bias = solve_least_squares(chunks, solver)
+    expected_weight, expected_bias = solve_least_squares(chunks, "lstsq")
+
+    assert weight.shape == (2, 3) and bias.shape == (2,)
+    assert torch.allclose(weight, expected_weight) and torch.allclose(bias, expected_bias)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+import torch
+
+from src.model_demo.splits import (RowSubset, assign_folds, bucketize, kfold_splits, offset_split,
+                                   permutation_split, stratified_split, train_test_rows)
+
+
+def test_permutation_split_partitions_rows() -> None:
+    train, test = permutation_split(1000, train_size=0.8, seed=0)
+
+    assert len(train) == 800 and len(test) == 200 and train.dtype == np.int32
+    assert np.array_equal(np.sort(np.concatenate([train, test])), np.arange(1000))
+    assert np.all(np.diff(train) > 0) and np.all(np.diff(test) > 0)
+    assert np.array_equal(permutation_split(1000, 0.8, seed=0)[0], train)
+
+
+def test_offset_split_is_a_view() -> None:
+    X, y = torch.randn(10, 2), torch.randn(10, 1)
+    train_rows, test_rows = offset_split(len(X), train_size=0.7)
+
+    X_train, _ = RowSubset(X, y, train_rows).tensors()
+    X_test, _ = RowSubset(X, y, test_rows).tensors()
+    assert X_train.data_ptr() == X.data_ptr() and torch.equal(X_test, X[7:])
+
+
+def test_row_subset_batches_cover_the_rows() -> None:
+    X = np.arange(40, dtype=np.float32).reshape(20, 2)
+    y = X[:, :1] * 10
+    for rows in (slice(5, 20), np.array([1, 4, 9, 16, 19])):
+        subset = RowSubset(X, y, rows)
+        expected = X[rows]
+        for shuffle in (False, True):
+            batches = list(subset.batches(4, shuffle=shuffle, generator=torch.Generator().manual_seed(0)))
+            X_rows = torch.cat([X_batch for X_batch, _ in batches])
+            y_rows = torch.cat([y_batch for _, y_batch in batches])
+            assert sorted(X_rows[:, 0].tolist()) == sorted(expected[:, 0].tolist())
+            assert torch.equal(y_rows[:, 0], X_rows[:, 0] * 10)
+        assert torch.equal(torch.cat([X_chunk for X_chunk, _ in subset.chunks(3)]), torch.from_numpy(expected))
+
+
+def test_stratified_split_keeps_bucket_ratio() -> None:
+    y = np.random.default_rng(0).exponential(size=(1000, 1))
+    strata = bucketize(y, n_buckets=10)
+    train, test = stratified_split(strata, train_size=0.8, seed=0)
+
+    assert np.array_equal(np.sort(np.concatenate([train, test])), np.arange(1000))
+    assert np.array_equal(np.bincount(strata[train], minlength=10), np.full(10, 80))
+    assert np.array_equal(np.sort(train_test_rows(1000, 0.8, "stratified", seed=0, y=y)[0]), train)
+
+
+def test_kfold_splits_are_balanced() -> None:
+    strata = np.repeat(np.arange(3), [30, 30, 40])
+    folds = assign_folds(100, k=5, seed=0, strata=strata)
+    assert folds.dtype == np.uint8 and np.array_equal(np.bincount(folds), np.full(5, 20))
+    for stratum in range(3):
+        counts = np.bincount(folds[strata == stratum], minlength=5)
+        assert counts.max() - counts.min() <= 1
+
+    seen = []
+    for train, test in kfold_splits(100, k=5, seed=0):
+        assert len(np.intersect1d(train, test)) == 0 and len(train) + len(test) == 100
+        seen.append(test)
+    assert np.array_equal(np.sort(np.concatenate(seen)), np.arange(100))
+
+
+def test_invalid_split_arguments() -> None:
+    with pytest.raises(ValueError):
+        permutation_split(10, train_size=1.5)
+    with pytest.raises(ValueError):
+        train_test_rows(10, method="stratified")
+    with pytest.raises(ValueError):
+        assign_folds(10, k=1)
@@ -0,0 +1,42 @@
+import json
+import logging
+
+import numpy as np
+import torch
+
+from src.model_demo.structured_logging import JsonFormatter, SamplingFilter, stop_listeners, summarize
+from src.model_demo.utils import setup_logger
+
+
+def test_summaries_do_not_grow_with_the_payload() -> None:
+    small = summarize(torch.ones(3, 2))
+    large = summarize(torch.ones(100_000, 2), max_items=4)
+    assert small == [[1.0, 1.0]] * 3
+    assert large == {"shape": [100000, 2], "dtype": "torch.float32", "head": [[1.0, 1.0]] * 4}
+    assert summarize(np.arange(5.0)[0]) == 0.0
+    assert summarize("x" * 20, max_chars=5) == "xxxxx...(15 more chars)"
+    assert summarize(list(range(10)), max_items=2) == {"len": 10, "head": [0, 1]}
+
+
+def test_only_marked_records_are_sampled() -> None:
+    sampling = SamplingFilter(sample_rate=0.0)
+    marked = logging.makeLogRecord({"msg": "/predict", "sampled": True})
+    assert not sampling.filter(marked) and sampling.dropped == 1
+    assert sampling.filter(logging.makeLogRecord({"msg": "Model loaded"}))
+
+
+def test_json_records_carry_the_extra_fields() -> None:
+    record = logging.makeLogRecord({"msg": "/batch_predict", "levelname": "INFO", "name": "api", "payload": {"rows": 2}})
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "/batch_predict" and entry["payload"] == {"rows": 2} and entry["logger"] == "api"
+
+
+def test_queue_mode_writes_summarized_json_lines(tmp_path) -> None:
+    log_file = tmp_path / "api.log"
+    logger = setup_logger("test_queue_mode", str(log_file), mode="queue", fmt="json", max_items=2)
+    logger.propagate = False
+    logger.info("/batch_predict", extra={"sampled": True, "payload": {"inputs": torch.zeros(1000, 2)}})
+    stop_listeners("test_queue_mode")  # waits for the listener thread to write the queued records
+
+    entry = json.loads(log_file.read_text().splitlines()[-1])
+    assert entry["payload"]["inputs"] == {"shape": [1000, 2], "dtype": "torch.float32", "head": [[0.0, 0.0]] * 2}
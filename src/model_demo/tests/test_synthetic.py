@@ -0,0 +1,23 @@
+import numpy as np
+
+from src.model_demo.data_prep.synthetic import generate_sharded_dataset, synthesize_chunk
+
+
+def test_generation_is_independent_of_worker_count(tmp_path) -> None:
+    datasets = [
+        generate_sharded_dataset(tmp_path / str(workers), [2., -3.], 4., n_rows=2500, chunk_rows=1000, seed=7, workers=workers)
+        for workers in (1, 2)
+    ]
+
+    assert [len(datasets[0]["train"]), len(datasets[0]["test"])] == [2000, 500]
+    for split in ("train", "test"):
+        (X_1, y_1), (X_2, y_2) = datasets[0][split].tensors(), datasets[1][split].tensors()
+        assert np.array_equal(X_1.numpy(), X_2.numpy()) and np.array_equal(y_1.numpy(), y_2.numpy())
+
+
+def test_chunks_follow_the_linear_model() -> None:
+    X, y = synthesize_chunk([2., -3.], 4., n_rows=1000, seed=0, index=3)
+
+    assert X.dtype == np.float32 and X.shape == (1000, 2) and y.shape == (1000, 1)
+    assert np.allclose(y[:, 0], X @ np.array([2., -3.]) + 4., atol=0.1)
+    assert not np.array_equal(X, synthesize_chunk([2., -3.], 4., n_rows=1000, seed=0, index=4)[0])
@@ -0,0 +1,61 @@
+import pytest
+import torch
+import torch.nn as nn
+
+from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.datasets import ShardedDataset, ShardedDatasetWriter
+from src.model_demo.training import fit, fit_batches, minibatches
+from src.model_demo.utils import load_data
+
+
+def test_minibatches_cover_every_row_once() -> None:
+    X = torch.arange(10.).reshape(-1, 1)
+    batches = list(minibatches(X, X * 2, batch_size=4))
+
+    assert [len(X_batch) for X_batch, _ in batches] == [4, 4, 2]
+    assert sorted(torch.cat([X_batch for X_batch, _ in batches]).flatten().tolist()) == X.flatten().tolist()
+    assert all(torch.equal(y_batch, X_batch * 2) for X_batch, y_batch in batches)
+
+
+@pytest.mark.parametrize("accumulation_steps", [1, 3])
+def test_fit_recovers_true_weights(accumulation_steps) -> None:
+    torch.manual_seed(0)
+    X = torch.randn(1000, 2)
+    y = X @ torch.tensor([[2.], [-3.]]) + 4.
+    model = LR(2, 1)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.01)
+
+    history = fit(model, X, y, optimizer, nn.MSELoss(), epochs=100, batch_size=100,
+                  accumulation_steps=accumulation_steps, patience=10, min_delta=1e-6)
+
+    assert history.final_loss < 0.01
+    assert history.losses[-1] < history.losses[0]
+    assert torch.allclose(model.linear.weight, torch.tensor([[2., -3.]]), atol=0.05)
+
+
+def test_fit_stops_early_on_plateau() -> None:
+    X, y = torch.randn(50, 2), torch.randn(50, 1)
+    model = LR(2, 1)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.0)  # the loss can never improve
+
+    history = fit(model, X, y, optimizer, nn.MSELoss(), epochs=100, batch_size=10, patience=3, min_delta=1e-6)
+
+    assert history.stopped_early
+    assert history.epochs_run == 4
+
+
+def test_fit_batches_streams_a_sharded_split(tmp_path) -> None:
+    torch.manual_seed(0)
+    X = torch.randn(1000, 2)
+    y = X @ torch.tensor([[2.], [-3.]]) + 4.
+    with ShardedDatasetWriter(tmp_path, shard_rows=300) as writer:
+        writer.write("train", X, y)
+    train = ShardedDataset(tmp_path)["train"]
+    model = LR(2, 1)
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.01)
+
+    history = fit_batches(model, lambda: load_data(train, 100), len(train), optimizer, nn.MSELoss(), epochs=100,
+                          patience=10, min_delta=1e-6)
+
+    assert len(train.shards) == 4 and history.final_loss < 0.01
+    assert torch.allclose(model.linear.weight, torch.tensor([[2., -3.]]), atol=0.05)
@@ -0,0 +1,113 @@
+"""
+Mini-batch training loop for tensor-resident data.
+
+The data set fits in memory as two tensors, so a DataLoader (per-sample `__getitem__`, collation and, with
+`num_workers`, worker processes and pickling) adds cost without adding anything. `minibatches` shuffles once
+per epoch with an on-device `torch.randperm`, gathers the shuffled tensors in one indexing call and hands out
+contiguous slices of them as batches. `fit` runs forward/backward/step on every batch, with optional gradient
+accumulation and early stopping once the epoch loss stops improving.
+
+A data set that does not fit in memory (a multi-shard ShardedSplit) goes through `fit_batches` instead, which
+takes a function returning one epoch of batches, e.g. `load_data(train_split, batch_size)` reading one
+memory-mapped shard at a time.
+
+    history = fit(model, X_train, y_train, optimizer, nn.MSELoss(), epochs=100, batch_size=100)
+    history = fit_batches(model, lambda: load_data(train_split, 100), len(train_split), optimizer, nn.MSELoss(), epochs=100)
+    history.final_loss, history.epochs_run, history.stopped_early
+
+"""
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator
+
+import torch
+import torch.nn as nn
+
+
+@dataclass
+class TrainingHistory:
+    """ Per-epoch mean training loss and why training stopped. """
+    losses: list[float] = field(default_factory=list)
+    stopped_early: bool = False
+
+    @property
+    def epochs_run(self) -> int:
+        return len(self.losses)
+
+    @property
+    def final_loss(self) -> float:
+        return self.losses[-1] if self.losses else float("nan")
+
+
+def minibatches(X: torch.Tensor, y: torch.Tensor, batch_size: int, shuffle: bool = True,
+                generator: torch.Generator | None = None) -> Iterator[tuple[torch.Tensor, torch.Tensor]]:
+    """ One epoch of (X, y) batches; the last batch is smaller when batch_size does not divide len(X). """
+    if batch_size < 1:
+        raise ValueError(f"batch_size should be a positive integer, got {batch_size}")
+    if shuffle:
+        perm = torch.randperm(len(X), device=X.device, generator=generator)
+        X, y = X[perm], y[perm]
+    return zip(X.split(batch_size), y.split(batch_size))
+
+def fit(model: nn.Module, X: torch.Tensor, y: torch.Tensor, optimizer: torch.optim.Optimizer, criterion: nn.Module,
+        epochs: int, batch_size: int, accumulation_steps: int = 1, patience: int = 0, min_delta: float = 0.0,
+        generator: torch.Generator | None = None,
+        on_epoch_end: Callable[[int, float], None] | None = None) -> TrainingHistory:
+    """
+    Train `model` on tensors already on the model's device.
+    Parameters:
+        accumulation_steps (int): batches whose gradients are summed before each optimizer step
+            (effective batch size = batch_size * accumulation_steps).
+        patience (int): stop after this many epochs without the loss improving by more than min_delta; 0 disables.
+        generator (torch.Generator): on the data's device, for reproducible shuffling.
+        on_epoch_end (callable): called with (epoch, mean loss), epochs counted from 1.
+    Returns:
+        TrainingHistory with the mean training loss of every epoch run.
+    """
+    return fit_batches(model, lambda: minibatches(X, y, batch_size, generator=generator), len(X), optimizer,
+                       criterion, epochs, accumulation_steps=accumulation_steps, patience=patience,
+                       min_delta=min_delta, on_epoch_end=on_epoch_end)
+
+def fit_batches(model: nn.Module, epoch_batches: Callable[[], Iterable[tuple[torch.Tensor, torch.Tensor]]],
+                n_rows: int, optimizer: torch.optim.Optimizer, criterion: nn.Module, epochs: int,
+                accumulation_steps: int = 1, patience: int = 0, min_delta: float = 0.0,
+                on_epoch_end: Callable[[int, float], None] | None = None) -> TrainingHistory:
+    """
+    Train `model` on the (X, y) batches returned by epoch_batches(), called once per epoch; the batches should
+    be on the model's device and cover n_rows rows. Only one batch needs to be in memory at a time.
+    The other parameters and the return value are those of `fit`.
+    """
+    if n_rows == 0:
+        raise ValueError("Cannot train on an empty data set")
+    if accumulation_steps < 1:
+        raise ValueError(f"accumulation_steps should be a positive integer, got {accumulation_steps}")
+    device = next(model.parameters()).device
+    history = TrainingHistory()
+    best_loss, bad_epochs = float("inf"), 0
+    model.train()
+    for epoch in range(1, epochs + 1):
+        # summed on-device so the epoch loss costs one host sync instead of one per batch
+        loss_sum = torch.zeros((), device=device)
+        optimizer.zero_grad(set_to_none=True)
+        for step, (X_batch, y_batch) in enumerate(epoch_batches(), start=1):
+            loss = criterion(model(X_batch), y_batch)
+            (loss / accumulation_steps).backward()
+            loss_sum += loss.detach() * len(X_batch)
+            if step % accumulation_steps == 0:
+                optimizer.step()
+                optimizer.zero_grad(set_to_none=True)
+        if step % accumulation_steps:
+            optimizer.step()  # leftover batches at the end of the epoch
+
+        epoch_loss = loss_sum.item() / n_rows
+        history.losses.append(epoch_loss)
+        if on_epoch_end is not None:
+            on_epoch_end(epoch, epoch_loss)
+
+        if epoch_loss < best_loss - min_delta:
+            best_loss, bad_epochs = epoch_loss, 0
+        else:
+            bad_epochs += 1
+            if patience and bad_epochs >= patience:
+                history.stopped_early = True
+                break
+    return history
@@ -2,12 +2,14 @@ import logging
 import numpy as np
 import numpy.typing as npt
 import torch
-import torch.optim as optim
 from pathlib import Path
 from logging.handlers import RotatingFileHandler
 from pydantic import BaseModel
 from typing import Iterator, List, Any, Tuple, Union
 
+# The data set and evaluation modules are imported inside the training helpers that use them, so the web
+# service, which imports this module for the request schemas and the logger, does not load them
+
 def find_directory(target_dir_name="logs", start_path=None):
     """
     Search for the first occurrence of a directory by traversing up the parent directories.
@@ -39,7 +41,8 @@ def find_directory(target_dir_name="logs", start_path=None):
         
     return None
 
-def setup_logger(logger_name: str='MyAppLogger', log_file:str='app.log', log_level=logging.DEBUG):
+def setup_logger(logger_name: str='MyAppLogger', log_file:str='app.log', log_level=logging.DEBUG, mode: str = "sync",
+                 fmt: str = "text", sample_rate: float = 1.0, max_items: int = 8, max_chars: int = 512):
     """
     Create a centralized logger configuration.
     List of logging levels: DEBUG (10) > INFO (20) > WARNING (30) > ERROR (40) > CRITICAL (50)
@@ -47,9 +50,17 @@ def setup_logger(logger_name: str='MyAppLogger', log_file:str='app.log', log_lev
         logger_name (str): a user defined name for the logger
         log_file (str): a file path to save logs.
         log_level (logging): a selected level for logging.
+        mode (str): "sync" writes from the logging call, "queue" hands records to a listener thread.
+        fmt (str): "text" lines or "json" records (see structured_logging.py).
+        sample_rate (float): share of the records logged with extra={"sampled": True} that are kept.
+        max_items, max_chars (int): bounds of the summary that replaces a record's `payload`.
     Returns:
         A logger object.
     """
+    from src.model_demo.structured_logging import LOG_MODES, PayloadFilter, SamplingFilter, attach_queue, make_formatter
+
+    if mode not in LOG_MODES:
+        raise ValueError(f"mode should be one of {LOG_MODES}, got {mode!r}")
     # Create logger
     logger = logging.getLogger(logger_name)
     logger.setLevel(log_level)
@@ -57,15 +68,11 @@ def setup_logger(logger_name: str='MyAppLogger', log_file:str='app.log', log_lev
     # Prevent adding handlers if logger is already configured
     if not logger.handlers:
         # Create formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%m/%d/%Y %I:%M:%S %p'
-        )
+        formatter = make_formatter(fmt)
         
         # Console handler
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
         
         # File handler with rotation (max 5MB, keep 5 backups)
         file_handler = RotatingFileHandler(
@@ -74,7 +81,16 @@ def setup_logger(logger_name: str='MyAppLogger', log_file:str='app.log', log_lev
             backupCount=5
         )
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+
+        # sampling first, so dropped records are never summarized
+        logger.addFilter(SamplingFilter(sample_rate))
+        logger.addFilter(PayloadFilter(max_items, max_chars))
+        if mode == "queue":
+            # formatting and I/O run on the listener thread, the logging call only enqueues
+            attach_queue(logger, [console_handler, file_handler])
+        else:
+            logger.addHandler(console_handler)
+            logger.addHandler(file_handler)
     
     return logger
 
@@ -107,45 +123,84 @@ class PredictionFeatures(BaseModel):
 class PredictionFeaturesBatch(BaseModel):
     input_data: List[Tuple[Union[int, float], Union[int, float]]]
 
+# for /models/{id}/...: the number of features is the input_dim of that model
+class ModelFeatures(BaseModel):
+    features: List[Union[int, float]]
+
+class ModelFeaturesBatch(BaseModel):
+    input_data: List[List[Union[int, float]]]
+
 
 def load_data(tensors: torch.Tensor, batch_size:torch.Tensor, is_train: bool=True) -> Iterator[Any]:
-   """ Construct a PyTorch data iterator."""
+   """
+   Construct a PyTorch data iterator. A ShardedSplit is read shard by shard from its memory-mapped files and a
+   RowSubset gathers its rows batch by batch.
+   """
+   from src.model_demo.datasets import ShardedSplit
+   from src.model_demo.splits import RowSubset
+
+   if isinstance(tensors, (ShardedSplit, RowSubset)):
+       return tensors.batches(batch_size, shuffle=is_train)
    dataset = torch.utils.data.TensorDataset(*tensors)
    return torch.utils.data.DataLoader(dataset, batch_size, shuffle=is_train, num_workers=2, pin_memory=True)
 
 
 # Function for inference and loss calculation
-def infer_evaluate_model(model, test_loader, criterion, device='cuda' if torch.cuda.is_available() else 'cpu') -> Tuple[torch.Tensor, float]:
+def infer_evaluate_model(model, test_loader, criterion=None, device='cuda' if torch.cuda.is_available() else 'cpu',
+                         n_samples: int | None = None, predictions_path: str | Path | None = None,
+                         ) -> Tuple[torch.Tensor, "EvaluationMetrics"]:
+    """
+    Predict over a data loader and compute streaming regression metrics.
+    The predictions buffer is allocated once, with n_samples rows (default: len(test_loader.dataset)), on the
+    device for in-memory output, or as a .npy memory-mapped file when predictions_path is given (returned as a
+    CPU tensor backed by that file). Each batch is written into its slice, so besides that buffer memory use
+    does not grow with the number of batches.
+    Returns:
+        (predictions of shape (n_samples, output_dim), EvaluationMetrics with the mean criterion loss as `loss`)
+    """
+    from src.model_demo.evaluation import StreamingRegressionMetrics
+
     model.eval()  # Set model to evaluation mode
     model.to(device)
 
-    predictions = torch.tensor([])
+    if n_samples is None:
+        try:
+            n_samples = len(test_loader.dataset)
+        except (AttributeError, TypeError):
+            raise ValueError("Pass n_samples when the loader has no sized .dataset")
 
-    total_loss = 0.0
-    total_samples = 0
-    
-    with torch.no_grad():  # Disable gradients for inference
+    predictions, memmap = None, None
+    metrics = StreamingRegressionMetrics()
+    offset = 0
+
+    with torch.inference_mode():  # Disable gradients for inference
         for inputs, labels in test_loader:
             inputs, labels = inputs.to(device), labels.to(device)
-            
+
             # Forward pass (inference)
             outputs = model(inputs)
-            # Append using torch.cat
-            
-            predictions = torch.cat((predictions, outputs))
-            # Alternatively, use torch.hstack (same for 1D tensors)
-            # predictions = torch.hstack((predictions, outputs))
-
-            # Calculate loss
-            loss = criterion(outputs, labels)
-            
-            # Accumulate loss
-            total_loss += loss.item() * inputs.size(0)
-            total_samples += inputs.size(0)
-    
-    # Calculate average loss
-    avg_loss = total_loss / total_samples
-    return predictions, avg_loss
+            if predictions is None:
+                predictions, memmap = _allocate_predictions((n_samples, *outputs.shape[1:]), outputs, predictions_path)
+            if offset + len(outputs) > n_samples:
+                raise ValueError(f"The loader yielded more than n_samples={n_samples} rows")
+            predictions[offset:offset + len(outputs)].copy_(outputs)
+            offset += len(outputs)
+
+            metrics.update(outputs, labels, criterion(outputs, labels) if criterion is not None else None)
+
+    if offset != n_samples:
+        raise ValueError(f"The loader yielded {offset} rows, expected n_samples={n_samples}")
+    if memmap is not None:
+        memmap.flush()
+    return predictions, metrics.compute()
+
+def _allocate_predictions(shape: tuple, outputs: torch.Tensor, path: str | Path | None) -> Tuple[torch.Tensor, Any]:
+    """ The predictions buffer, plus the np.memmap behind it when writing to a file. """
+    if path is None:
+        return torch.empty(shape, dtype=outputs.dtype, device=outputs.device), None
+    dtype = torch.empty((), dtype=outputs.dtype).numpy().dtype
+    memmap = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+    return torch.from_numpy(memmap), memmap
 
 # Function for inference 
 def infer_model(model, inputs, device='cuda' if torch.cuda.is_available() else 'cpu') -> torch.Tensor:
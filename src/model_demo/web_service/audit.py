@@ -0,0 +1,232 @@
+"""
+Asynchronous, batched prediction audit log.
+
+The endpoints used to open `predictions.txt`, append a free-text block and close it again on every
+request. `AuditLogWriter.write` only puts the record on an in-memory queue; a background thread
+serializes queued records and flushes them in batches (every `flush_size` records or `flush_interval_s`
+seconds, whichever comes first), rotates the file once it grows past `max_bytes` and drains the queue
+on `close()`. Request handling never waits on the disk.
+
+Records are written as JSON lines, one object per request:
+    {"time": "...", "endpoint": "/predict", "inputs": [[1.0, 2.0]], "predictions": [-18.1]}
+With `fmt="parquet"` (requires the optional `pyarrow` package) every flush is written as a row group instead,
+with one fixed schema of every record field (null where a record does not have it).
+
+A record keeps references to the caller's tensors until it is written, so one 100k-row /batch_predict
+record holds as much memory as 100k /predict records. The queue is therefore bounded by rows as well as by
+records: once `max_queue_rows` rows are waiting (queued or buffered for the next flush), further records
+are dropped and counted instead of queued.
+
+A flush that fails (a full disk, an unwritable file) is logged and its records counted as `failed`; their
+rows are released all the same, so the writer keeps going and later records are not dropped for it.
+
+"""
+from datetime import datetime
+import json
+import logging
+import os
+from pathlib import Path
+import queue
+import threading
+import time
+from typing import Any
+
+import numpy as np
+
+AUDIT_FORMATS = ("jsonl", "parquet")
+
+_STOP = object()
+
+
+def _rows(values: Any) -> int:
+    """ Number of rows of a tensor, array or sequence; 1 for a scalar. """
+    shape = getattr(values, "shape", None)
+    if shape is not None:
+        return shape[0] if len(shape) else 1
+    try:
+        return len(values)
+    except TypeError:
+        return 1
+
+def _to_list(values: Any) -> list:
+    """ Tensors, arrays and nested sequences to plain (nested) lists of floats. """
+    if hasattr(values, "tolist"):
+        values = values.tolist()
+    return np.asarray(values, dtype=float).tolist()
+
+
+class AuditLogWriter:
+    """
+    Write prediction records to disk from a background thread.
+    Parameters:
+        path (str or Path): audit file, rotated to path.1, path.2, ... like logging's RotatingFileHandler.
+        fmt (str): "jsonl" or "parquet".
+        flush_size (int): flush once this many records are buffered.
+        flush_interval_s (float): or once the oldest buffered record is this old.
+        max_bytes (int): rotate the file once it is larger than this (0 disables rotation).
+        backup_count (int): number of rotated files to keep.
+        max_queue (int): records waiting beyond this are dropped (and counted) rather than blocking a request.
+        max_queue_rows (int): likewise for the total input rows of the waiting records (0 for no row limit).
+        close_timeout_s (float): close() gives up waiting for the writer thread after this long.
+    """
+    def __init__(self, path: str | Path, fmt: str = "jsonl", flush_size: int = 512, flush_interval_s: float = 1.0,
+                 max_bytes: int = 50*1024*1024, backup_count: int = 5, max_queue: int = 100_000,
+                 max_queue_rows: int = 1_000_000, close_timeout_s: float = 30.0,
+                 logger: logging.Logger | None = None):
+        if fmt not in AUDIT_FORMATS:
+            raise ValueError(f"audit format should be one of {AUDIT_FORMATS}, got {fmt!r}")
+        if fmt == "parquet":
+            import pyarrow  # noqa: F401 - fail at startup, not in the writer thread
+        self.path = Path(path)
+        self.fmt = fmt
+        self.flush_size = flush_size
+        self.flush_interval_s = flush_interval_s
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.max_queue_rows = max_queue_rows
+        self.close_timeout_s = close_timeout_s
+        self.logger = logger or logging.getLogger(__name__)
+        self.queued_rows = 0  # rows of the records not written yet, updated by write() and the writer thread
+        self._rows_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._parquet_writer = None
+
+        self.written = 0
+        self.dropped = 0
+        self.dropped_rows = 0
+        self.failed = 0
+        self.flushes = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """ Flush everything queued so far and stop the writer thread. """
+        if self._thread is None:
+            return
+        thread, self._thread = self._thread, None
+        try:
+            # the sentinel must not be dropped: wait for room, but not forever if the writer is stuck on the disk
+            self.queue.put(_STOP, timeout=self.close_timeout_s)
+        except queue.Full:
+            self.logger.error(f"Audit writer did not drain its queue in {self.close_timeout_s}s; "
+                              f"{self.queue.qsize()} records are not written")
+            return
+        thread.join(self.close_timeout_s)
+        if thread.is_alive():
+            self.logger.error(f"Audit writer did not finish in {self.close_timeout_s}s")
+
+    def write(self, endpoint: str, inputs: Any, predictions: Any, **extra) -> None:
+        """ Queue one prediction record. Inputs/predictions may be tensors or arrays; never blocks. """
+        rows = _rows(inputs)
+        with self._rows_lock:
+            if self.max_queue_rows and self.queued_rows + rows > self.max_queue_rows:
+                self.dropped += 1
+                self.dropped_rows += rows
+                return
+            self.queued_rows += rows
+        record = {"time": datetime.now().isoformat(), "endpoint": endpoint, "inputs": inputs, "predictions": predictions, **extra}
+        try:
+            self.queue.put_nowait((rows, record))
+        except queue.Full:
+            with self._rows_lock:
+                self.queued_rows -= rows
+                self.dropped += 1
+                self.dropped_rows += rows
+
+    def stats(self) -> dict:
+        return {"path": str(self.path), "format": self.fmt, "queued": self.queue.qsize(), "queued_rows": self.queued_rows,
+                "max_queue_rows": self.max_queue_rows, "written": self.written, "dropped": self.dropped,
+                "dropped_rows": self.dropped_rows, "failed": self.failed, "flushes": self.flushes}
+
+    def _run(self) -> None:
+        buffer, deadline = [], None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                buffer.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval_s
+            if buffer and (len(buffer) >= self.flush_size or time.monotonic() >= deadline):
+                self._flush(buffer)
+                buffer, deadline = [], None
+        if buffer:
+            self._flush(buffer)
+        if self._parquet_writer is not None:
+            try:
+                self._parquet_writer.close()
+            except Exception as e:
+                self.logger.error(f"Audit file {self.path} could not be closed: {e}")
+            self._parquet_writer = None
+
+    def _flush(self, items: list) -> None:
+        records = [record for _, record in items]
+        try:
+            for record in records:
+                record["inputs"] = _to_list(record["inputs"])
+                record["predictions"] = np.atleast_1d(_to_list(record["predictions"])).tolist()
+            if self.fmt == "parquet":
+                self._write_parquet(records)
+            else:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(record) + "\n" for record in records))
+            self.written += len(records)
+            self.flushes += 1
+        except Exception as e:
+            # an exception here would end the writer thread, and with it every later record
+            self.failed += len(records)
+            self.logger.error(f"Audit flush of {len(records)} records to {self.path} failed: {e}", exc_info=True)
+        finally:
+            with self._rows_lock:
+                # the records and the tensors they referenced can be freed now
+                self.queued_rows -= sum(rows for rows, _ in items)
+        try:
+            if self.max_bytes and self.path.exists() and self.path.stat().st_size >= self.max_bytes:
+                self._rotate()
+        except OSError as e:
+            self.logger.error(f"Audit file {self.path} could not be rotated: {e}")
+
+    def _write_parquet(self, records: list) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # every record field, including the extras of /batch_predict/stream, so all row groups share one schema
+        schema = pa.schema([
+            ("time", pa.string()),
+            ("endpoint", pa.string()),
+            ("inputs", pa.list_(pa.list_(pa.float64()))),
+            ("predictions", pa.list_(pa.float64())),
+            ("version", pa.string()),
+            ("first_row", pa.int64()),
+            ])
+        for record in records:
+            # one predictions list per record, whatever the model's output_dim
+            record["predictions"] = np.ravel(record["predictions"]).tolist()
+        table = pa.Table.from_pylist(records, schema=schema)
+        if self._parquet_writer is None:
+            self._parquet_writer = pq.ParquetWriter(self.path, schema)
+        self._parquet_writer.write_table(table)
+
+    def _rotate(self) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()  # a parquet file is only readable once its footer is written
+            self._parquet_writer = None
+        if self.backup_count <= 0:
+            self.path.unlink()
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
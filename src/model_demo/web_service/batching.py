@@ -0,0 +1,150 @@
+"""
+Server-side dynamic micro-batching for single-row prediction requests.
+
+Every `/predict` call used to run its own one-row forward pass. Under load most of that time is module
+dispatch and tensor setup rather than arithmetic, so `MicroBatcher` holds incoming rows in an asyncio
+queue for at most `max_wait_ms` (or until `max_batch_size` rows are waiting), stacks them into one
+tensor, runs a single forward pass and hands each caller its own result.
+
+"""
+import asyncio
+from collections import Counter, deque
+import inspect
+import time
+from typing import Awaitable, Callable, Sequence
+
+import numpy as np
+import torch
+
+
+class LatencyRecorder:
+    """ Keep the most recent latency samples (in milliseconds) for percentile reporting. """
+    def __init__(self, maxlen: int = 10000):
+        self.samples = deque(maxlen=maxlen)
+        self.count = 0
+
+    def record(self, latency_ms: float) -> None:
+        self.samples.append(latency_ms)
+        self.count += 1
+
+    def percentiles(self, qs: Sequence[float] = (50, 90, 99)) -> dict:
+        if not self.samples:
+            return {f"p{q:g}": None for q in qs}
+        values = np.percentile(np.fromiter(self.samples, dtype=float), qs)
+        return {f"p{q:g}": round(float(v), 4) for q, v in zip(qs, values)}
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-row requests into one batched forward pass.
+    Parameters:
+        infer_fn (callable): takes a 2D float tensor of stacked rows and returns one prediction per row,
+            either directly or as an awaitable (e.g. a job on the inference executor).
+        max_batch_size (int): dispatch a batch as soon as this many rows are queued.
+        max_wait_ms (float): dispatch a partial batch once its oldest row has waited this long.
+    """
+    def __init__(self, infer_fn: Callable[[torch.Tensor], torch.Tensor | Awaitable[torch.Tensor]], max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size should be a positive integer value")
+        self.infer_fn = infer_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+        self.latency = LatencyRecorder()
+        self.batch_sizes = Counter()
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self) -> None:
+        """ Start the background batching task on the running event loop. """
+        if self.running:
+            return
+        self.queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """ Flush the rows already queued, then stop the background task. """
+        if not self.running:
+            return
+        await self.queue.put(None)  # sentinel, processed after everything queued before it
+        await self._worker
+        self._worker = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight)
+
+    async def submit(self, row: Sequence[float]) -> float:
+        """ Queue one feature row and wait for its prediction. """
+        if not self.running:
+            raise RuntimeError("MicroBatcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        start = time.perf_counter()
+        await self.queue.put((row, future))
+        result = await future
+        self.latency.record((time.perf_counter() - start) * 1000)
+        return result
+
+    async def _collect(self) -> tuple[list, bool]:
+        """ Wait for the first row, then gather more until the batch is full or the wait budget is spent. """
+        first = await self.queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self.queue.get_nowait() if remaining <= 0 else await asyncio.wait_for(self.queue.get(), remaining)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            if batch:
+                # do not wait for this batch: the next one accumulates while it runs
+                task = asyncio.create_task(self._dispatch(batch))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: list) -> None:
+        rows = [row for row, _ in batch]
+        futures = [future for _, future in batch]
+        self.batch_sizes[len(batch)] += 1
+        try:
+            inputs = torch.tensor(rows, dtype=torch.float32)
+            outputs = self.infer_fn(inputs)
+            if inspect.isawaitable(outputs):
+                outputs = await outputs
+            outputs = outputs.reshape(-1).tolist()
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, output in zip(futures, outputs):
+            if not future.done():  # the caller may have been cancelled meanwhile
+                future.set_result(output)
+
+    def stats(self) -> dict:
+        """ Summarize request latency percentiles and the batch-size histogram. """
+        batches = sum(self.batch_sizes.values())
+        rows = sum(size * n for size, n in self.batch_sizes.items())
+        return {
+            "requests": self.latency.count,
+            "batches": batches,
+            "mean_batch_size": round(rows / batches, 4) if batches else None,
+            "latency_ms": self.latency.percentiles(),
+            "batch_size_histogram": {str(size): n for size, n in sorted(self.batch_sizes.items())},
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+        }
@@ -0,0 +1,126 @@
+"""
+Bounded executor that keeps model inference off the asyncio event loop.
+
+The endpoints are `async def`, so any blocking call made inside them stalls every other request on the
+same uvicorn worker. `InferenceExecutor.run` hands the forward pass to a thread or process pool and
+awaits it, so the event loop only handles I/O. Once more than `max_queue_depth` jobs are pending, new
+jobs are refused with `ServerBusyError`, which the API turns into a 503 response.
+
+"""
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+import torch
+
+from src.model_demo.inference import LinearInferenceEngine
+from src.model_demo.web_service.model_loading import load_linear_engine
+
+EXECUTOR_KINDS = ("inline", "thread", "process")
+
+
+class ServerBusyError(RuntimeError):
+    """ Raised when the inference queue is full and a job is refused. """
+
+
+class InferenceExecutor:
+    """
+    Run blocking inference jobs on a bounded pool with backpressure.
+    Parameters:
+        kind (str): "thread", "process", or "inline" (run on the event loop, as before; for comparisons).
+        max_workers (int): number of pool workers.
+        max_queue_depth (int): maximum number of pending (queued or running) jobs before refusing new ones.
+        initializer, initargs: passed on to the process pool, e.g. to load the model in each worker.
+    """
+    def __init__(self, kind: str = "thread", max_workers: int = 4, max_queue_depth: int = 256,
+                 initializer: Callable | None = None, initargs: tuple = ()):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"executor should be one of {EXECUTOR_KINDS}, got {kind!r}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.initializer = initializer
+        self.initargs = initargs
+        self.pool: Executor | None = None
+        self.pending = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        if self.pool is not None or self.kind == "inline":
+            return
+        if self.kind == "process":
+            self.pool = ProcessPoolExecutor(self.max_workers, initializer=self.initializer, initargs=self.initargs)
+        else:
+            self.pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="inference")
+
+    def shutdown(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """ Run fn(*args) on the pool; raise ServerBusyError once the queue depth limit is reached. """
+        if self.pending >= self.max_queue_depth:
+            self.rejected += 1
+            raise ServerBusyError(f"Inference queue is full ({self.pending} pending jobs)")
+        self.pending += 1
+        try:
+            if self.kind == "inline":
+                return fn(*args)
+            self.start()
+            return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+        finally:
+            self.pending -= 1
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue_depth": self.max_queue_depth,
+            "pending": self.pending,
+            "rejected": self.rejected,
+        }
+
+
+## Process pool workers cannot share the parent's model object, each loads its own copy once.
+_worker_engine = None
+# engines of other model versions (registry directories), loaded on first use in this worker
+_worker_engines: dict[str, LinearInferenceEngine] = {}
+_worker_settings: dict = {}
+MAX_WORKER_ENGINES = 4
+
+def load_worker_model(model_path: str | Path, input_dim: int = 2, output_dim: int = 1, backend: str = "torch",
+                      normalizer_path: str | Path | None = None, shared_weights_dir: str | Path | None = None) -> None:
+    """
+    Process pool initializer: load the trained weights (and fold in the feature normalizer, if any) into this worker,
+    or map the weights published by serve.py when shared_weights_dir is given (see shared_weights.py).
+    """
+    global _worker_engine
+    torch.set_num_threads(1)  # one pool process per core, not one pool of processes each spawning all cores
+    _worker_settings.update(model_fname=Path(model_path).name, backend=backend,
+                            normalizer_fname=None if normalizer_path is None else Path(normalizer_path).name)
+    if shared_weights_dir:
+        from src.model_demo.web_service.shared_weights import attach_weights
+
+        _worker_engine = LinearInferenceEngine.from_model(attach_weights(shared_weights_dir), backend=backend, device="cpu")
+        return
+    _worker_engine = load_linear_engine(model_path, normalizer_path, backend, input_dim=input_dim, output_dim=output_dim)
+
+def worker_infer(inputs: torch.Tensor, model_dir: str | None = None):
+    """
+    Inference job executed inside a process pool worker, with the model of model_dir when given (a registry
+    version or a /models/{id} model, whose dimensions are read from its weights).
+    """
+    if model_dir is None:
+        return _worker_engine.predict(inputs)
+    engine = _worker_engines.get(model_dir)
+    if engine is None:
+        settings = _worker_settings
+        normalizer_fname = settings["normalizer_fname"]
+        engine = load_linear_engine(Path(model_dir) / settings["model_fname"],
+                                    None if normalizer_fname is None else Path(model_dir) / normalizer_fname, settings["backend"])
+        if len(_worker_engines) >= MAX_WORKER_ENGINES:
+            del _worker_engines[next(iter(_worker_engines))]  # the oldest version
+        _worker_engines[model_dir] = engine
+    return engine.predict(inputs)
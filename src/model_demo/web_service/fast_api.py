@@ -5,30 +5,125 @@ Built on Starlette (for web handling) and Pydantic (for data validation), with s
 Ideal for creating production-ready APIs with automatic documentation (Swagger UI, ReDoc) and type safety.
 Runs on an ASGI server like Uvicorn, typically on http://localhost:8000 during development.
 
+Importing this module only sets up the app: the model is loaded and warmed up on a worker thread once the
+server has started (see readiness.py), `/ready` reports when that is done, and modules that only some
+requests need (the HTML templates, uvicorn for `__main__`) are imported on first use.
+
 """
-from datetime import datetime
+from contextlib import asynccontextmanager
+from functools import cache, partial
+import json
 import os
 from pathlib import Path
+import time
 
 from fastapi import HTTPException, FastAPI, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
 import numpy as np
-import pandas as pd
+from pydantic import ValidationError
 import torch
-import uvicorn
 
 from src.model_demo.configs.config import MetadataConfigSchema
-from src.model_demo.configs.config import LinearRegressionModel as LR
-from src.model_demo.utils import PredictionFeatures, PredictionFeaturesBatch, infer_model, setup_logger, get_device
+from src.model_demo.inference import LinearInferenceEngine
+from src.model_demo.registry import ModelRegistry
+from src.model_demo.utils import ModelFeatures, ModelFeaturesBatch, PredictionFeatures, PredictionFeaturesBatch, setup_logger, get_device
+from src.model_demo.web_service import codecs, streaming
+from src.model_demo.web_service.audit import AuditLogWriter
+from src.model_demo.web_service.batching import MicroBatcher
+from src.model_demo.web_service.executor import InferenceExecutor, ServerBusyError, load_worker_model, worker_infer
+from src.model_demo.web_service.metrics import (BATCH_SIZE_BUCKETS, CONTENT_TYPE, REGISTRY, REQUEST_ROWS, STAGE_SECONDS,
+                                                Counter, Gauge, Histogram, MetricsMiddleware, StageTimer)
+from src.model_demo.web_service.model_cache import ModelCache, UnknownModel
+from src.model_demo.web_service.model_loading import load_linear_engine, load_trained_model
+from src.model_demo.web_service.model_store import LOCAL_VERSION, ModelStore, ServedModel, UnknownModelVersion
+from src.model_demo.web_service.readiness import ModelNotReadyError, Readiness
+from src.model_demo.web_service.result_cache import PredictionCache, row_keys
+from src.model_demo.web_service.shared_weights import (NUM_THREADS_ENV, SHARED_VERSION_ENV, SHARED_WEIGHTS_ENV,
+                                                       attach_weights, set_worker_threads)
 
 cfg = MetadataConfigSchema()
 
 device = get_device()
 
 ## Logger setup
-logger = setup_logger(logger_name=__name__, log_file=f'{cfg.path.data_dir}/api_logfile.log')
+# records go through a queue to a listener thread; prediction records are sampled and their payloads cut short
+logger = setup_logger(logger_name=__name__, log_file=f'{cfg.path.data_dir}/api_logfile.log', mode=cfg.serving.log_mode,
+                      fmt=cfg.serving.log_format, sample_rate=cfg.serving.log_sample_rate,
+                      max_items=cfg.serving.log_max_items, max_chars=cfg.serving.log_max_chars)
+
+model_path = Path(cfg.path.model_dir) / cfg.fname.model_fname
+
+# Under serve.py every uvicorn worker gets its share of the cores (see shared_weights.py)
+set_worker_threads(int(os.getenv(NUM_THREADS_ENV, cfg.serving.threads_per_worker)))
+
+# Blocking inference runs on a bounded pool so the event loop only handles I/O (see executor.py)
+if cfg.serving.executor == "process":
+    # each worker process loads its own copy of the weights, or maps the shared ones under serve.py
+    executor = InferenceExecutor("process", cfg.serving.max_workers, cfg.serving.max_queue_depth,
+                                 initializer=load_worker_model, initargs=(model_path, 2, 1, cfg.serving.engine_backend,
+                                           Path(cfg.path.model_dir) / cfg.fname.normalizer_fname,
+                                           os.getenv(SHARED_WEIGHTS_ENV)))
+else:
+    executor = InferenceExecutor(cfg.serving.executor, cfg.serving.max_workers, cfg.serving.max_queue_depth)
+
+# the model version process pool workers load in their initializer; other versions they load by directory
+worker_default_version = os.getenv(SHARED_VERSION_ENV, LOCAL_VERSION) if os.getenv(SHARED_WEIGHTS_ENV) else LOCAL_VERSION
+
+async def run_inference(inputs: torch.Tensor, served: ServedModel | None = None):
+    """
+    Run the model forward pass on the inference executor; raises ServerBusyError when it is saturated.
+    Returns one prediction per row, as a tensor or a NumPy array depending on the engine backend.
+    Uses the current model version unless `served` is given.
+    Waits for the model while it is still loading; raises ModelNotReadyError if that takes too long.
+    """
+    if not readiness.ready:
+        await readiness.wait(cfg.serving.ready_timeout_s)
+    served = served or store.current
+    if executor.kind == "process":
+        model_dir = None if served.version == worker_default_version else str(served.model_dir)
+        return await executor.run(worker_infer, inputs, model_dir)
+    return await executor.run(served.predict_fn, inputs)
+
+# Prediction records are queued here and written to disk in batches by a background thread (see audit.py)
+audit_path = Path(cfg.path.data_dir) / cfg.fname.audit_fname
+if os.getenv(SHARED_WEIGHTS_ENV):
+    # several serve.py workers: one audit file each, so they never rotate a file another one is appending to
+    audit_path = audit_path.with_name(f"{audit_path.stem}-{os.getpid()}{audit_path.suffix}")
+audit = AuditLogWriter(
+    audit_path,
+    fmt=cfg.serving.audit_format,
+    flush_size=cfg.serving.audit_flush_size,
+    flush_interval_s=cfg.serving.audit_flush_interval_s,
+    max_bytes=cfg.serving.audit_max_bytes,
+    backup_count=cfg.serving.audit_backup_count,
+    max_queue_rows=cfg.serving.audit_max_queue_rows,
+    logger=logger,
+    )
+
+VERSION_HEADER = "X-Model-Version"
+
+def make_batcher(served: ServedModel) -> MicroBatcher:
+    # Coalesces concurrent single-row /predict requests for one model version into one forward pass (see batching.py)
+    return MicroBatcher(
+        partial(run_inference, served=served),
+        max_batch_size=cfg.serving.max_batch_size,
+        max_wait_ms=cfg.serving.max_wait_ms,
+        )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # the batching task has to live on the server's event loop, so it is started here rather than at import
+    readiness.start()
+    audit.start()
+    executor.start()
+    store.start()
+    yield
+    await readiness.stop()
+    await store.stop()  # drains every version's micro-batcher
+    executor.shutdown()
+    audit.close()  # drains the records still queued
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -36,34 +131,140 @@ app = FastAPI(
     description="API for simple linear model prediction",
     version="1.0.0",
     docs_url="/docs",  # Custom URL for Swagger UI
+    lifespan=lifespan,
     )
 
+# Count and time every request per route template for /metrics (see metrics.py)
+app.add_middleware(MetricsMiddleware)
+
 # Mount the static directory
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-templates = Jinja2Templates(directory="templates")
+@cache
+def templates():
+    # Jinja2 is only needed for the HTML pages, so it is imported by the first page request
+    from fastapi.templating import Jinja2Templates
+    return Jinja2Templates(directory="templates")
 
 logger.info(f"Using {device} device")
 logger.info(f"Running at: {Path.cwd()}")
 
+def module_predict(module, inputs: torch.Tensor) -> torch.Tensor:
+    """ Forward pass through a torch module; one prediction per row like the inference engine. """
+    with torch.inference_mode():
+        outputs = module(inputs.to(device))
+    return outputs.reshape(len(inputs), -1).squeeze(-1)
+
+def build_served_model(version: str, model_dir: Path) -> ServedModel:
+    """
+    Load one model version, prepare the serving runtime and run a few warm-up predictions; runs on a worker
+    thread, at startup and for every version the store loads later.
+    """
+    start = time.perf_counter()
+    if os.getenv(SHARED_WEIGHTS_ENV) and version == os.getenv(SHARED_VERSION_ENV, LOCAL_VERSION):
+        # started by serve.py: the parent loaded this version (normalizer folded in) once, map its weights
+        loaded = attach_weights(os.getenv(SHARED_WEIGHTS_ENV)).to(device)
+        logger.info(f"Attached to shared model weights: {os.getenv(SHARED_WEIGHTS_ENV)}")
+    else:
+        loaded = load_trained_model(cfg, device, logger, model_dir)
+
+    # Inference runs through an engine prepared once from the loaded weights (see inference.py) or through the model graph
+    if cfg.serving.runtime == "engine":
+        engine = LinearInferenceEngine.from_model(loaded, backend=cfg.serving.engine_backend)
+        fn = engine.predict
+    elif cfg.serving.runtime == "torchscript":
+        # freezing inlines the weights as constants and runs graph optimizations, once at startup
+        scripted = loaded if isinstance(loaded, torch.jit.ScriptModule) else torch.jit.script(loaded)
+        fn = partial(module_predict, torch.jit.freeze(scripted))
+    elif cfg.serving.runtime == "eager":
+        fn = partial(module_predict, loaded)
+    else:
+        raise ValueError(f"serving.runtime should be one of 'engine', 'torchscript', 'eager', got {cfg.serving.runtime!r}")
+    loaded_at = time.perf_counter()
+
+    # the first calls pay for lazy initialization (allocator, kernel selection, TorchScript profiling runs)
+    warmup = torch.zeros(max(cfg.serving.max_batch_size, 1), 2)
+    for _ in range(3):
+        fn(warmup)
+        fn(warmup[:1])
+    timings = {"load_s": loaded_at - start, "warmup_s": time.perf_counter() - loaded_at}
+    logger.info(f"Model version {version}, runtime {cfg.serving.runtime}: ready in {timings['load_s']:.3f}s + {timings['warmup_s']:.3f}s warm-up")
+    return ServedModel(version, Path(model_dir), loaded, fn, timings)
+
+# Predictions of repeated rows, cleared when a new model version is swapped in (see result_cache.py)
+result_cache = (PredictionCache(cfg.serving.result_cache_entries, cfg.serving.result_cache_ttl_s)
+                if cfg.serving.result_cache_entries > 0 else None)
+
+def invalidate_results(served: ServedModel) -> None:
+    if result_cache is not None:
+        result_cache.invalidate()
+
+# Loaded model versions; the registry's LATEST version is swapped in while serving (see model_store.py)
+store = ModelStore(
+    build_served_model,
+    ModelRegistry(cfg.path.registry_dir),
+    fallback_dir=cfg.path.model_dir,
+    make_batcher=make_batcher if cfg.serving.enable_batching else None,
+    poll_s=cfg.serving.registry_poll_s,
+    on_swap=invalidate_results,
+    logger=logger,
+    )
 
-# create an instance of the same model first
-model = LR(2,1)
-
-# Load the trained model weights, weights_only=True as a best practice.
-try:
-    model.load_state_dict(torch.load(Path(cfg.path.model_dir) / cfg.fname.model_fname, weights_only=True))
-except FileNotFoundError:
-    logger.error("Model file not found")
-    raise RuntimeError("Model file not found")
-model.to(device)
-model.eval()  # Set to evaluate mode
+def load_model_by_id(model_id: str) -> LinearInferenceEngine:
+    """ The engine of a /models/{id} model; raises FileNotFoundError when it has no model directory. """
+    model_dir = Path(cfg.path.models_dir) / model_id
+    return load_linear_engine(model_dir / cfg.fname.model_fname, model_dir / cfg.fname.normalizer_fname,
+                              backend=cfg.serving.engine_backend, device=device)
+
+# Per-id models under /models/{id}/..., loaded on first use and evicted least recently used first (see model_cache.py)
+model_cache = ModelCache(load_model_by_id, max_bytes=int(cfg.serving.model_cache_mb * 2**20), logger=logger)
+
+async def run_model_inference(model_id: str, engine: LinearInferenceEngine, inputs: torch.Tensor):
+    """ Run a /models/{id} model on the inference executor; process pool workers load it from its directory. """
+    if executor.kind == "process":
+        return await executor.run(worker_infer, inputs, str(Path(cfg.path.models_dir) / model_id))
+    return await executor.run(engine.predict, inputs)
+
+def load_model() -> dict:
+    """ Load and warm up the startup model version; called on a worker thread at startup. Returns the timings reported by /ready. """
+    served = store.load(store.initial_version())
+    store.install(served)
+    return {"version": served.version, **served.timings}
+
+def __getattr__(name: str):
+    # `model` and `predict_fn` of the version currently serving, e.g. for tests and notebooks
+    if name in ("model", "predict_fn") and store.current is not None:
+        return getattr(store.current, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Flips to ready once load_model() has loaded and warmed up the model (see readiness.py)
+readiness = Readiness(load_model)
+
+async def cached_batch_inference(inputs: torch.Tensor, served: ServedModel) -> np.ndarray:
+    """ Predictions for a batch from the result cache, running the model on the missed rows only; in input order. """
+    keys = row_keys(inputs.numpy())
+    values, missing = result_cache.lookup(served.version, keys)
+    if not missing:
+        return np.array(values, dtype=np.float32)
+    predictions = np.array([0.0 if value is None else value for value in values], dtype=np.float32)
+    start = time.perf_counter()
+    missed = codecs.to_numpy(await run_inference(inputs if len(missing) == len(keys) else inputs[missing], served)).reshape(-1)
+    result_cache.record_inference(time.perf_counter() - start, len(missing))
+    predictions[missing] = missed
+    result_cache.store(served.version, [keys[i] for i in missing], missed.tolist())
+    return predictions
+
+async def get_served(request: Request) -> ServedModel:
+    """ The model version for this request: pinned with ?version= or an X-Model-Version header, else the current one. """
+    if not readiness.ready:
+        await readiness.wait(cfg.serving.ready_timeout_s)
+    return await store.get(request.query_params.get("version") or request.headers.get("x-model-version"))
 
 # Define a get endpoint for URL path `/`- HTTP method for data requests
 @app.get("/", response_class=HTMLResponse) # HTMLResponse renders a web page
 async def root(request: Request):
     #return {"message": "Welcome to my API"} # when applying the default response_class is JSON
-    return templates.TemplateResponse(
+    return templates().TemplateResponse(
         "main.html",  # Template file
         {"request": request}  # Context data passed to the template
     )
@@ -72,82 +273,392 @@ async def root(request: Request):
 @app.get("/predict", response_class=HTMLResponse)
 async def root(request: Request):
     #return {"message": "Welcome to my API"} # when applying the default response_class is JSON
-    return templates.TemplateResponse(
+    return templates().TemplateResponse(
         "predict.html",
         {"request": request}  # Context data passed to the template
     )
 
 @app.get("/batch_predict", response_class=HTMLResponse)
 async def batch(request: Request):
-    return templates.TemplateResponse(
+    return templates().TemplateResponse(
         "batch_predict.html",  # Template file for batch prediction
         {"request": request}  # Context data passed to the template
     )
 
 
 # API end point for data submission for API prediction (HTTP post) 
-@app.post("/predict", description="Predict using a single set of features (X_1, X_2).")
-async def predict(features: PredictionFeatures):
-# defined an asynchronous function named prediction - allowing other tasks to run while it waits for I/O-bound operations
-    try:
-        # Create input DataFrame for prediction
-        input_df = pd.DataFrame([{
-            "X_1": features.feature_X_1,
-            "X_2": features.feature_X_2
-        }])
+# The body is parsed and validated in the handler, so each stage shows up separately in /metrics
+predict_request_body = {"required": True, "content": {codecs.JSON: {"schema": PredictionFeatures.model_json_schema()}}}
 
-        # Convert DataFrame to NumPy array
-        np_array = input_df.to_numpy()  # or df.values
+def json_invalid(e: json.JSONDecodeError) -> RequestValidationError:
+    # the same 422 FastAPI answers for a malformed JSON body it parses itself
+    return RequestValidationError([{"type": "json_invalid", "loc": ("body", e.pos), "msg": "JSON decode error",
+                                    "input": {}, "ctx": {"error": e.msg}}])
 
-        # Convert NumPy array to PyTorch tensor
-        inputs = torch.tensor(np_array, dtype=torch.float32)
-
-        # model inference
-        outputs = infer_model(model, inputs).tolist()
-
-        with open(Path(cfg.path.data_dir) / 'predictions.txt', 'a') as f:
-            f.write(f"{datetime.now()}\nInput:\n{input_df}\nPrediction:\n{outputs}\n\n")
-
-        logger.info(f"Input: {input_df}, Prediction: {outputs}")
-
-        return {
-            "Model prediction": outputs
-        }
+@app.post("/predict", description="Predict using a single set of features (X_1, X_2).", openapi_extra={"requestBody": predict_request_body})
+async def predict(request: Request):
+# defined an asynchronous function named prediction - allowing other tasks to run while it waits for I/O-bound operations
+    timer = StageTimer(STAGE_SECONDS, "/predict")
+    try:
+        payload = json.loads(await request.body())
+        timer.mark("parse")
+        features = PredictionFeatures.model_validate(payload)
+        timer.mark("validate")
+
+        # Build the input row straight from the request fields (no DataFrame/NumPy round trip)
+        row = [float(features.feature_X_1), float(features.feature_X_2)]
+        timer.mark("tensorize")
+
+        # model inference on the version the request started with, through its micro-batcher when it is running
+        served = await get_served(request)
+        outputs = None
+        if result_cache is not None:
+            keys = row_keys(np.array([row], dtype=np.float32))
+            outputs = result_cache.lookup(served.version, keys)[0][0]
+        if outputs is None:
+            start = time.perf_counter()
+            if served.batcher is not None and served.batcher.running:
+                outputs = await served.batcher.submit(row)
+            else:
+                inputs = torch.tensor([row], dtype=torch.float32)
+                outputs = (await run_inference(inputs, served)).tolist()[0]
+            if result_cache is not None:
+                result_cache.record_inference(time.perf_counter() - start, 1)
+                result_cache.store(served.version, keys, [outputs])
+        timer.mark("infer")
+
+        audit.write("/predict", [row], outputs)
+        timer.mark("audit")
+
+        logger.info("/predict", extra={"sampled": True, "payload": {"version": served.version, "inputs": row, "predictions": outputs}})
+
+        response = JSONResponse({
+            "Model prediction": outputs,
+            "Model version": served.version,
+        }, headers={VERSION_HEADER: served.version})
+        timer.mark("serialize")
+        return response
+    except json.JSONDecodeError as e:
+        raise json_invalid(e)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+    except UnknownModelVersion as e:
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {e.args[0]}")
+    except ServerBusyError as e:
+        logger.warning(f"Prediction rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Server busy: {str(e)}")
+    except ModelNotReadyError as e:
+        logger.warning(f"Prediction rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Prediction failed: {str(e)}")
 
 # # API end point for data submission for API Batch prediction
-@app.post("/batch_predict", description="Predict using batch input like [[X_1, X_2], ...]")
-async def batch_predict(features: PredictionFeaturesBatch):
+# The body is read raw so it can be JSON or a binary/columnar format (see codecs.py); the schema below keeps the docs page accurate.
+batch_request_body = {
+    "required": True,
+    "content": {
+        codecs.JSON: {"schema": PredictionFeaturesBatch.model_json_schema()},
+        codecs.OCTET_STREAM: {"schema": {"type": "string", "format": "binary"}},
+        codecs.NPY: {"schema": {"type": "string", "format": "binary"}},
+        codecs.ARROW_STREAM: {"schema": {"type": "string", "format": "binary"}},
+        codecs.ARROW_FILE: {"schema": {"type": "string", "format": "binary"}},
+    },
+}
+
+@app.post("/batch_predict", description="Predict using batch input like [[X_1, X_2], ...]", openapi_extra={"requestBody": batch_request_body})
+async def batch_predict(request: Request):
 # defined an asynchronous function named prediction - allowing other tasks to run while it waits for I/O-bound operations
+    timer = StageTimer(STAGE_SECONDS, "/batch_predict")
     try:
-        # Create input data for prediction
-        inputs = np.array(features.input_data)
-
-        # Validate input shape
-        if inputs.ndim != 2 or inputs.shape[1] != 2:
-            raise ValueError("Input must be a 2D array with 2 features per row")
-
-        # Convert NumPy array to PyTorch tensor
-        inputs = torch.tensor(inputs, dtype=torch.float32)
+        # Decode the body into a (n_rows, 2) float32 tensor, zero-copy for binary formats
+        response_type = codecs.negotiate(request.headers.get("accept"))
+        rows = codecs.decode_rows(await request.body(), request.headers.get("content-type"), request.headers.get("x-row-count"))
+        timer.mark("parse")
+        inputs = codecs.as_tensor(rows)
+        timer.mark("tensorize")
+        codecs.check_input_array(inputs.numpy())
+        timer.mark("validate")
+        REQUEST_ROWS.observe(len(inputs), "/batch_predict")
 
         # model inference
-        outputs = infer_model(model, inputs).flatten().tolist()
-
-        with open(Path(cfg.path.data_dir) / 'predictions.txt', 'a') as f:
-            f.write(f"{datetime.now()}\nInput:\n{inputs}\nPrediction:\n{outputs}\n\n")
+        served = await get_served(request)
+        if result_cache is not None and len(inputs) <= cfg.serving.result_cache_max_rows:
+            predictions = await cached_batch_inference(inputs, served)
+        else:
+            predictions = (await run_inference(inputs, served)).flatten()
+        timer.mark("infer")
+
+        audit.write("/batch_predict", inputs, predictions)
+        timer.mark("audit")
+
+        logger.info("/batch_predict", extra={"sampled": True, "payload": {"version": served.version, "rows": len(inputs),
+                                                                           "inputs": inputs, "predictions": predictions}})
+
+        content, headers = codecs.encode_predictions(predictions, response_type)
+        if response_type == codecs.JSON:
+            response = JSONResponse({**content, "Model version": served.version}, headers={VERSION_HEADER: served.version})
+        else:
+            response = Response(content, media_type=response_type, headers={**headers, VERSION_HEADER: served.version})
+        timer.mark("serialize")
+        return response
+    except UnknownModelVersion as e:
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {e.args[0]}")
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+    except codecs.UnsupportedMediaType as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except codecs.NotAcceptable as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    except ServerBusyError as e:
+        logger.warning(f"Batch prediction rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Server busy: {str(e)}")
+    except ModelNotReadyError as e:
+        logger.warning(f"Batch prediction rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Batch prediction error: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Batch prediction failed: {str(e)}")
 
-        logger.info(f"Input: {inputs}, Prediction: {outputs}")
+# API end point for streaming batch prediction: rows are read, scored and answered chunk by chunk
+stream_request_body = {
+    "required": True,
+    "content": {
+        codecs.NDJSON: {"schema": {"type": "string", "example": "[1.0, 2.0]\n[3.0, 4.0]\n"}},
+        codecs.OCTET_STREAM: {"schema": {"type": "string", "format": "binary"}},
+    },
+}
+
+@app.post("/batch_predict/stream",
+          description="Stream rows as NDJSON ([X_1, X_2] per line) or raw float32; predictions stream back in the same format as they finish",
+          openapi_extra={"requestBody": stream_request_body})
+async def batch_predict_stream(request: Request):
+    kind = codecs.media_type(request.headers.get("content-type"), default=codecs.NDJSON)
+    if kind == codecs.NDJSON:
+        chunks = streaming.ndjson_chunks(request.stream(), cfg.serving.stream_chunk_rows, cfg.serving.stream_max_line_bytes)
+    elif kind == codecs.OCTET_STREAM:
+        chunks = streaming.binary_chunks(request.stream(), cfg.serving.stream_chunk_rows)
+    else:
+        raise HTTPException(status_code=415, detail=f"Unsupported Content-Type: {kind}")
+    # the whole stream is scored by one version, chosen before the status line goes out
+    try:
+        served = await get_served(request)
+    except UnknownModelVersion as e:
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {e.args[0]}")
+    except ModelNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    async def predictions():
+        rows = 0
+        try:
+            async for inputs in chunks:
+                timer = StageTimer(STAGE_SECONDS, "/batch_predict/stream")
+                outputs = codecs.to_numpy(await run_inference(inputs, served)).reshape(-1)
+                timer.mark("infer")
+                audit.write("/batch_predict/stream", inputs, outputs, version=served.version, first_row=rows)
+                timer.mark("audit")
+                rows += len(inputs)
+                if kind == codecs.NDJSON:
+                    yield "".join(f"{value}\n" for value in outputs.tolist())
+                else:
+                    yield outputs.tobytes()
+        except Exception as e:
+            # the status line is already sent: NDJSON reports the failure in-band, a raw float32 body has no
+            # room for that and is aborted, so the client sees an incomplete response rather than a short one
+            logger.error(f"Streaming batch prediction error after {rows} rows: {str(e)}")
+            if kind == codecs.NDJSON:
+                yield json.dumps({"error": str(e), "row": getattr(e, "row", rows)}) + "\n"
+                return
+            raise streaming.StreamAborted(f"Stream aborted after {rows} rows: {e}") from e
+        REQUEST_ROWS.observe(rows, "/batch_predict/stream")
+        logger.info("/batch_predict/stream", extra={"sampled": True, "payload": {"version": served.version, "rows": rows}})
+
+    return streaming.DuplexStreamingResponse(predictions(), media_type=kind, headers={VERSION_HEADER: served.version})
+
+# Per-id models: /models/{id}/predict and /models/{id}/batch_predict take as many features as that model's input_dim
+@app.post("/models/{model_id}/predict", description="Predict one row with the model `model_id`: {\"features\": [X_1, ..., X_n]}.")
+async def model_predict(model_id: str, features: ModelFeatures):
+    timer = StageTimer(STAGE_SECONDS, "/models/{model_id}/predict")
+    try:
+        engine = await model_cache.get(model_id)
+        if len(features.features) != engine.input_dim:
+            raise HTTPException(status_code=422, detail=f"Model {model_id} takes {engine.input_dim} features, got {len(features.features)}")
+        inputs = torch.from_numpy(codecs.as_input_array(np.array([features.features], dtype=np.float32), engine.input_dim))
+        timer.mark("tensorize")
+        outputs = codecs.to_numpy(await run_model_inference(model_id, engine, inputs))[0].tolist()
+        timer.mark("infer")
+
+        audit.write(f"/models/{model_id}/predict", inputs, outputs)
+        timer.mark("audit")
+        logger.info("/models/{model_id}/predict", extra={"sampled": True, "payload": {"model_id": model_id, "inputs": features.features,
+                                                                                       "predictions": outputs}})
 
         return {
-            "Model prediction": outputs
+            "Model prediction": outputs,
+            "Model id": model_id,
         }
+    except HTTPException:
+        raise
+    except UnknownModel:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {model_id}")
+    except ServerBusyError as e:
+        logger.warning(f"Prediction rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Server busy: {str(e)}")
     except Exception as e:
-        logger.error(f"Batch prediction error: {str(e)}")
+        logger.error(f"Model {model_id} prediction error: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Prediction failed: {str(e)}")
+
+model_batch_request_body = {
+    "required": True,
+    "content": {
+        codecs.JSON: {"schema": ModelFeaturesBatch.model_json_schema()},
+        **{kind: spec for kind, spec in batch_request_body["content"].items() if kind != codecs.JSON},
+    },
+}
+
+@app.post("/models/{model_id}/batch_predict", description="Batch prediction with the model `model_id`, same formats as /batch_predict",
+          openapi_extra={"requestBody": model_batch_request_body})
+async def model_batch_predict(model_id: str, request: Request):
+    endpoint = "/models/{model_id}/batch_predict"
+    timer = StageTimer(STAGE_SECONDS, endpoint)
+    try:
+        engine = await model_cache.get(model_id)
+        response_type = codecs.negotiate(request.headers.get("accept"))
+        rows = codecs.decode_rows(await request.body(), request.headers.get("content-type"), request.headers.get("x-row-count"),
+                                  n_features=engine.input_dim)
+        timer.mark("parse")
+        inputs = codecs.as_tensor(rows)
+        timer.mark("tensorize")
+        codecs.check_input_array(inputs.numpy(), engine.input_dim)
+        timer.mark("validate")
+        REQUEST_ROWS.observe(len(inputs), endpoint)
+
+        predictions = codecs.to_numpy(await run_model_inference(model_id, engine, inputs))
+        timer.mark("infer")
+
+        # flattened so every audit record has the same schema, whatever the model's output_dim
+        audit.write(f"/models/{model_id}/batch_predict", inputs, predictions.reshape(-1))
+        timer.mark("audit")
+        logger.info(endpoint, extra={"sampled": True, "payload": {"model_id": model_id, "rows": len(inputs),
+                                                                  "inputs": inputs, "predictions": predictions}})
+
+        content, headers = codecs.encode_predictions(predictions, response_type)
+        if response_type == codecs.JSON:
+            response = JSONResponse({**content, "Model id": model_id})
+        else:
+            response = Response(content, media_type=response_type, headers=headers)
+        timer.mark("serialize")
+        return response
+    except UnknownModel:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {model_id}")
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+    except codecs.UnsupportedMediaType as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except codecs.NotAcceptable as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    except ServerBusyError as e:
+        logger.warning(f"Batch prediction rejected: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Server busy: {str(e)}")
+    except Exception as e:
+        logger.error(f"Model {model_id} batch prediction error: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Batch prediction failed: {str(e)}")
 
+# Prometheus metrics: request counts and latencies, per-stage timings, batch sizes, queue depths, model version
+@REGISTRY.collect
+def serving_metrics():
+    served = store.current
+    info = Gauge("model_info", "The model version serving unpinned requests (value 1).", ("version", "runtime"))
+    if served is not None:
+        info.set(1, served.version, cfg.serving.runtime)
+    swaps = Counter("model_swaps_total", "Model versions swapped in since startup.")
+    swaps.inc(store.swaps)
+    pending = Gauge("executor_pending", "Inference jobs queued or running on the executor.")
+    pending.set(executor.pending)
+    rejected = Counter("executor_rejected_total", "Inference jobs refused because the executor queue was full.")
+    rejected.inc(executor.rejected)
+    audit_queue = Gauge("audit_queue_depth", "Prediction audit records waiting to be written.")
+    audit_queue.set(audit.queue.qsize())
+    audit_rows = Gauge("audit_queue_rows", "Input rows of the prediction audit records waiting to be written.")
+    audit_rows.set(audit.queued_rows)
+    audit_dropped = Counter("audit_dropped_total", "Prediction audit records dropped because the queue was full.")
+    audit_dropped.inc(audit.dropped)
+    audit_failed = Counter("audit_failed_total", "Prediction audit records lost because writing them to disk failed.")
+    audit_failed.inc(audit.failed)
+    batch_queue = Gauge("microbatch_queue_depth", "Rows waiting in the /predict micro-batcher.", ("version",))
+    batch_sizes = Histogram("microbatch_size", "Rows per /predict micro-batch.", ("version",), BATCH_SIZE_BUCKETS)
+    for version, loaded in list(store.loaded.items()):
+        if loaded.batcher is not None:
+            batch_queue.set(loaded.batcher.queue.qsize() if loaded.batcher.queue is not None else 0, version)
+            for size, n in loaded.batcher.batch_sizes.items():
+                batch_sizes.observe_many(size, n, version)
+    metrics = [info, swaps, pending, rejected, audit_queue, audit_rows, audit_dropped, audit_failed, batch_queue, batch_sizes]
+    model_stats = model_cache.stats()
+    for key in ("hits", "misses", "evictions"):
+        metric = Counter(f"model_cache_{key}_total", f"/models/{{id}} model cache {key}.")
+        metric.inc(model_stats[key])
+        metrics.append(metric)
+    model_bytes = Gauge("model_cache_bytes", "Estimated memory held by the /models/{id} model cache.")
+    model_bytes.set(model_stats["bytes"])
+    metrics.append(model_bytes)
+    if result_cache is not None:
+        result_stats = result_cache.stats()
+        for key in ("hits", "misses", "evictions"):
+            metric = Counter(f"result_cache_{key}_total", f"Prediction result cache {key} (rows).")
+            metric.inc(result_stats[key])
+            metrics.append(metric)
+        saved = Counter("result_cache_latency_saved_seconds_total", "Estimated inference time saved by result cache hits.")
+        saved.inc(result_stats["latency_saved_s"])
+        metrics.append(saved)
+    return metrics
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+# Readiness probe: 503 until the model is loaded and warmed up, 200 afterwards
+@app.get("/ready")
+async def ready():
+    return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
+# Request latency percentiles and batch-size histogram of the /predict micro-batcher
+@app.get("/stats/batching")
+async def batching_stats():
+    served = store.current
+    batcher = served.batcher if served is not None else None
+    if batcher is None:
+        return {"enabled": False, "version": served.version if served else None}
+    return {"enabled": batcher.running, "version": served.version, **batcher.stats()}
+
+# Current, loaded and published model versions (see model_store.py and registry.py)
+@app.get("/models/versions")
+async def model_versions():
+    return store.status()
+
+# Hits, misses, evictions and memory of the /models/{id} model cache
+@app.get("/stats/models")
+async def model_cache_stats():
+    return model_cache.stats()
+
+# Hit ratio and estimated latency saved by the prediction result cache
+@app.get("/stats/cache")
+async def result_cache_stats():
+    return result_cache.stats() if result_cache is not None else {"enabled": False}
+
+# Queue depth and rejections of the inference executor
+@app.get("/stats/executor")
+async def executor_stats():
+    return executor.stats()
+
+# Queued, written and dropped prediction audit records
+@app.get("/stats/audit")
+async def audit_stats():
+    return audit.stats()
+
 if __name__ == "__main__":
     # Option: If "API_PORT" was set as a environment variables or in a config file, default is 8000 is not found.
+    import uvicorn
+
     port = int(os.getenv("API_PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
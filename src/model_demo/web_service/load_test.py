@@ -0,0 +1,258 @@
+"""
+Load-testing client for the web service.
+
+`submit_for_inference.py` sends one blocking request. This CLI drives the API from `concurrency` async
+workers sharing one pooled keep-alive connection pool (httpx), with a mix of single-row /predict and
+/batch_predict requests whose batch sizes follow a given distribution, for a fixed duration or number of
+requests. It reports throughput and latency percentiles per request kind and saves them, with the run
+configuration, as JSON so runs can be compared over time (`--baseline` prints the change against an
+earlier result file).
+
+    # against a server that is already running
+    python -m src.model_demo.web_service.load_test --concurrency 32 --duration 30
+    # 20% /batch_predict with 16, 256 or 4096 rows (weights 0.6/0.3/0.1), raw float32 bodies, fixed request count
+    python -m src.model_demo.web_service.load_test --batch-ratio 0.2 --batch-sizes 16:0.6,256:0.3,4096:0.1 --format binary --requests 5000
+    # start a local uvicorn server for the run, compare with an earlier run
+    python -m src.model_demo.web_service.load_test --spawn --port 8125 --baseline data/model_demo/load_tests/load_test-20250101-120000.json
+
+"""
+import argparse
+import asyncio
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+import json
+import os
+from pathlib import Path
+import platform
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+OUTPUT_DIR = "data/model_demo/load_tests"
+APP = "src.model_demo.web_service.fast_api:app"
+
+
+@dataclass
+class LoadTestConfig:
+    """ One load test run; saved next to its results. """
+    url: str = "http://127.0.0.1:8000"
+    concurrency: int = 16
+    duration_s: float = 10.0          # used when requests is 0
+    requests: int = 0                 # total requests, 0 to run for duration_s
+    warmup_s: float = 1.0             # traffic before measuring, not counted
+    batch_ratio: float = 0.0          # share of /batch_predict requests, the rest are single-row /predict
+    batch_sizes: dict[int, float] = field(default_factory=lambda: {64: 1.0})  # rows -> weight
+    body_format: str = "json"         # /batch_predict bodies: "json" or "binary" (raw float32)
+    timeout_s: float = 30.0
+    seed: int = 0
+
+
+@dataclass
+class Sample:
+    kind: str          # "predict" or "batch_<rows>"
+    rows: int
+    status: int        # HTTP status, 0 for a transport error
+    latency_s: float
+
+
+def parse_batch_sizes(spec: str) -> dict[int, float]:
+    """ "16:0.6,256:0.3,4096" -> {16: 0.6, 256: 0.3, 4096: 1.0}; a missing weight counts as 1. """
+    sizes = {}
+    for part in spec.split(","):
+        rows, _, weight = part.strip().partition(":")
+        if int(rows) < 1 or (weight and float(weight) < 0):
+            raise ValueError(f"Invalid batch size spec {part!r}")
+        sizes[int(rows)] = float(weight) if weight else 1.0
+    return sizes
+
+def latency_summary(latencies_s: list[float]) -> dict:
+    """ Percentiles, mean and max in milliseconds. """
+    if not latencies_s:
+        return {"p50_ms": None, "p90_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None}
+    values = np.asarray(latencies_s) * 1000
+    p50, p90, p99 = np.percentile(values, (50, 90, 99))
+    return {"p50_ms": round(float(p50), 3), "p90_ms": round(float(p90), 3), "p99_ms": round(float(p99), 3),
+            "mean_ms": round(float(values.mean()), 3), "max_ms": round(float(values.max()), 3)}
+
+def summarize(samples: list[Sample], elapsed_s: float) -> dict:
+    """ Throughput and latency overall and per request kind. """
+    def section(group: list[Sample]) -> dict:
+        ok = [s for s in group if 200 <= s.status < 300]
+        return {
+            "requests": len(group),
+            "errors": len(group) - len(ok),
+            "requests_per_s": round(len(ok) / elapsed_s, 2) if elapsed_s else None,
+            "rows_per_s": round(sum(s.rows for s in ok) / elapsed_s, 2) if elapsed_s else None,
+            **latency_summary([s.latency_s for s in ok]),
+        }
+    by_kind = defaultdict(list)
+    for sample in samples:
+        by_kind[sample.kind].append(sample)
+    return {
+        "elapsed_s": round(elapsed_s, 3),
+        "overall": section(samples),
+        "by_kind": {kind: section(group) for kind, group in sorted(by_kind.items())},
+        "status_codes": {str(code): n for code, n in sorted(Counter(s.status for s in samples).items())},
+    }
+
+
+class RequestMix:
+    """ Draws requests from the configured mix; bodies are built once per batch size and reused. """
+    def __init__(self, config: LoadTestConfig):
+        self.config = config
+        self.rng = np.random.default_rng(config.seed)
+        self.sizes = list(config.batch_sizes)
+        weights = np.asarray(list(config.batch_sizes.values()), dtype=float)
+        self.weights = weights / weights.sum()
+        features = self.rng.normal(10, 3, (max(self.sizes), 2)).astype(np.float32)
+        self.bodies = {size: self._batch_body(features[:size]) for size in self.sizes}
+        self.single = [{"feature_X_1": float(x1), "feature_X_2": float(x2)} for x1, x2 in features[:256]]
+
+    def _batch_body(self, rows: np.ndarray) -> tuple[bytes, dict]:
+        if self.config.body_format == "binary":
+            return rows.astype("<f4").tobytes(), {"Content-Type": "application/octet-stream", "X-Row-Count": str(len(rows))}
+        return json.dumps({"input_data": rows.tolist()}).encode(), {"Content-Type": "application/json"}
+
+    def next(self) -> tuple[str, str, bytes, dict, int]:
+        """ (kind, path, body, headers, rows) of the next request. """
+        if self.rng.random() < self.config.batch_ratio:
+            size = self.sizes[self.rng.choice(len(self.sizes), p=self.weights)]
+            body, headers = self.bodies[size]
+            return f"batch_{size}", "/batch_predict", body, headers, size
+        row = self.single[self.rng.integers(len(self.single))]
+        return "predict", "/predict", json.dumps(row).encode(), {"Content-Type": "application/json"}, 1
+
+
+async def run_load_test(config: LoadTestConfig, transport: httpx.AsyncBaseTransport | None = None) -> dict:
+    """ Run the load test and return its summary; `transport` replaces the network, e.g. in tests. """
+    if config.concurrency < 1:
+        raise ValueError(f"concurrency should be a positive integer, got {config.concurrency}")
+    mix = RequestMix(config)
+    limits = httpx.Limits(max_connections=config.concurrency, max_keepalive_connections=config.concurrency)
+    samples: list[Sample] = []
+    sent = 0
+
+    async with httpx.AsyncClient(base_url=config.url, limits=limits, timeout=config.timeout_s, transport=transport) as client:
+        async def worker(stop_at: float, record: bool) -> None:
+            nonlocal sent
+            while time.perf_counter() < stop_at:
+                if record and config.requests:
+                    if sent >= config.requests:
+                        return
+                    sent += 1
+                kind, path, body, headers, rows = mix.next()
+                start = time.perf_counter()
+                try:
+                    response = await client.post(path, content=body, headers=headers)
+                    await response.aread()
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = 0
+                if record:
+                    samples.append(Sample(kind, rows, status, time.perf_counter() - start))
+
+        if config.warmup_s > 0:
+            warmup_until = time.perf_counter() + config.warmup_s
+            await asyncio.gather(*(worker(warmup_until, record=False) for _ in range(config.concurrency)))
+        start = time.perf_counter()
+        stop_at = float("inf") if config.requests else start + config.duration_s
+        await asyncio.gather(*(worker(stop_at, record=True) for _ in range(config.concurrency)))
+        elapsed = time.perf_counter() - start
+    return summarize(samples, elapsed)
+
+
+def environment() -> dict:
+    """ Where the run happened, for comparing result files. """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"time": datetime.now().isoformat(timespec="seconds"), "host": platform.node(), "cpus": os.cpu_count(),
+            "python": platform.python_version(), "git_commit": commit}
+
+def compare(results: dict, baseline: dict) -> list[str]:
+    """ One line per request kind: throughput and latency percentiles against the baseline run. """
+    def change(new, old):
+        return f"{new} ({(new - old) / old * 100:+.1f}%)" if new is not None and old else f"{new}"
+    lines = []
+    current = {"overall": results["overall"], **results["by_kind"]}
+    previous = {"overall": baseline["results"]["overall"], **baseline["results"]["by_kind"]}
+    for kind, section in current.items():
+        old = previous.get(kind)
+        if old is None:
+            continue
+        lines.append(f"{kind:>12}  req/s {change(section['requests_per_s'], old['requests_per_s'])}  "
+                     f"p50 {change(section['p50_ms'], old['p50_ms'])} ms  p99 {change(section['p99_ms'], old['p99_ms'])} ms")
+    return lines
+
+def print_results(results: dict) -> None:
+    print(f"{'kind':>12}{'requests':>10}{'errors':>8}{'req/s':>10}{'rows/s':>12}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}")
+    for kind, section in {"overall": results["overall"], **results["by_kind"]}.items():
+        print(f"{kind:>12}{section['requests']:>10}{section['errors']:>8}{section['requests_per_s']:>10}"
+              f"{section['rows_per_s']:>12}{section['p50_ms']!s:>9}{section['p90_ms']!s:>9}{section['p99_ms']!s:>9}")
+    print(f"status codes: {results['status_codes']}")
+
+def start_server(port: int, timeout_s: float = 120.0) -> subprocess.Popen:
+    """ Start uvicorn with the API on `port` and wait until /ready answers 200. """
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", APP, "--port", str(port), "--log-level", "warning"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.perf_counter() + timeout_s
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready", timeout=5).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        if server.poll() is not None:
+            break
+        time.sleep(0.05)
+    server.terminate()
+    raise RuntimeError(f"The API did not become ready on port {port}")
+
+def main() -> None:
+    defaults = LoadTestConfig()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help=f"server base URL (default {defaults.url}, or the --spawn port)")
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency)
+    parser.add_argument("--duration", type=float, default=defaults.duration_s, help="seconds to run when --requests is 0")
+    parser.add_argument("--requests", type=int, default=defaults.requests)
+    parser.add_argument("--warmup", type=float, default=defaults.warmup_s)
+    parser.add_argument("--batch-ratio", type=float, default=defaults.batch_ratio, help="share of /batch_predict requests")
+    parser.add_argument("--batch-sizes", type=parse_batch_sizes, default=defaults.batch_sizes, help="rows:weight,...")
+    parser.add_argument("--format", choices=("json", "binary"), default=defaults.body_format)
+    parser.add_argument("--timeout", type=float, default=defaults.timeout_s)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--spawn", action="store_true", help="start a local uvicorn server for the run")
+    parser.add_argument("--port", type=int, default=8125, help="port of the --spawn server")
+    parser.add_argument("--output", type=Path, default=None, help=f"result file (default {OUTPUT_DIR}/load_test-<time>.json)")
+    parser.add_argument("--baseline", type=Path, default=None, help="earlier result file to compare with")
+    args = parser.parse_args()
+
+    config = LoadTestConfig(url=args.url or (f"http://127.0.0.1:{args.port}" if args.spawn else defaults.url),
+                            concurrency=args.concurrency, duration_s=args.duration, requests=args.requests,
+                            warmup_s=args.warmup, batch_ratio=args.batch_ratio, batch_sizes=args.batch_sizes,
+                            body_format=args.format, timeout_s=args.timeout, seed=args.seed)
+    server = start_server(args.port) if args.spawn else None
+    try:
+        results = asyncio.run(run_load_test(config))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print_results(results)
+    output = args.output or Path(OUTPUT_DIR) / f"load_test-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"config": asdict(config), "environment": environment(), "results": results}, f, indent=2)
+    print(f"Results saved to {output}")
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            print("\n".join(compare(results, json.load(f))))
+
+if __name__ == "__main__":
+    main()
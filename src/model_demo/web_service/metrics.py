@@ -0,0 +1,184 @@
+"""
+Prometheus-style metrics for the web service, served as text at `/metrics`.
+
+A small implementation of counters, gauges and histograms in the Prometheus text exposition format
+(version 0.0.4), so the API needs no extra dependency. Recording is a dict lookup and a few list updates,
+cheap enough to leave on for every request:
+
+    REQUEST_ROWS.observe(len(inputs), "/batch_predict")
+    timer = StageTimer(STAGE_SECONDS, "/predict")   # starts the clock
+    ...parse...
+    timer.mark("parse")                             # observes the time since the previous mark
+    ...validate...
+    timer.mark("validate")
+
+Values that already live elsewhere (queue depths, cache counters, the model version) are read at scrape
+time by collectors registered with `REGISTRY.collect(fn)`, so the hot path does not update them twice.
+Metrics are recorded from the event loop only; thread and process pool workers do not touch them.
+
+"""
+from bisect import bisect_left
+from collections.abc import Iterable
+import math
+import time
+from typing import Callable
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "model_demo_"
+
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (1, 4, 16, 64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _label_text(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """ Base class: a name, a help text, label names and one value (or set of values) per label combination. """
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: dict[tuple, object] = {}
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.values.items():
+            yield f"{self.name}{_label_text(self.labelnames, labels)} {_format_value(value)}"
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, *labels) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels) -> None:
+        self.values[labels] = value
+
+
+class Histogram(Metric):
+    """ Cumulative histogram with fixed upper bounds; `observe` is a binary search and three additions. """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        self.observe_many(value, 1, *labels)
+
+    def observe_many(self, value: float, count: int, *labels) -> None:
+        """ Record `count` observations of the same value, e.g. from an existing size histogram. """
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]  # per-bucket counts, sum, count
+        state[0][bisect_left(self.buckets, value)] += count
+        state[1] += value * count
+        state[2] += count
+
+    def samples(self) -> Iterable[str]:
+        for labels, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, n in zip((*self.buckets, math.inf), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_label_text(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_label_text(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_label_text(self.labelnames, labels)} {count}"
+
+
+class MetricsRegistry:
+    """ The metrics rendered at /metrics: recorded ones plus the ones built by collectors at scrape time. """
+    def __init__(self):
+        self.metrics: list[Metric] = []
+        self.collectors: list[Callable[[], Iterable[Metric]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def collect(self, collector: Callable[[], Iterable[Metric]]) -> Callable:
+        """ Register a function returning fresh metrics at every scrape; usable as a decorator. """
+        self.collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        metrics = [*self.metrics, *(metric for collector in self.collectors for metric in collector())]
+        return "\n".join(metric.render() for metric in metrics if metric.values) + "\n"
+
+
+class StageTimer:
+    """ Observe the time between successive `mark(stage)` calls of one request into a stage histogram. """
+    __slots__ = ("histogram", "endpoint", "last")
+
+    def __init__(self, histogram: Histogram, endpoint: str):
+        self.histogram = histogram
+        self.endpoint = endpoint
+        self.last = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.histogram.observe(now - self.last, self.endpoint, stage)
+        self.last = now
+
+
+REGISTRY = MetricsRegistry()
+REQUESTS = REGISTRY.register(Counter("http_requests_total", "HTTP requests by route template, method and status code.",
+                                     ("endpoint", "method", "status")))
+REQUEST_SECONDS = REGISTRY.register(Histogram("http_request_duration_seconds", "Time from request start to the last response byte.",
+                                              ("endpoint", "method")))
+STAGE_SECONDS = REGISTRY.register(Histogram("stage_duration_seconds", "Time spent per request stage: parse, validate, "
+                                            "tensorize, infer, serialize, audit.", ("endpoint", "stage")))
+REQUEST_ROWS = REGISTRY.register(Histogram("request_rows", "Rows per prediction request.", ("endpoint",), ROW_BUCKETS))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and timing them per route template (`/models/{model_id}/predict`,
+    not every concrete path, to keep the number of label values bounded).
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            endpoint = getattr(scope.get("route"), "path", "unmatched")
+            REQUESTS.inc(1, endpoint, scope["method"], status[0])
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint, scope["method"])
@@ -0,0 +1,131 @@
+"""
+LRU cache of the per-model engines served under `/models/{id}/...`.
+
+One process serves many small linear models (e.g. one per customer, each with its own input_dim and
+output_dim), stored as `<path.models_dir>/<id>/` directories with the same files as `path.model_dir`.
+Keeping all of them loaded does not scale and reloading one per request is slow, so `ModelCache` loads a
+model on its first request (on a worker thread, concurrent requests for the same id share one load) and
+keeps the most recently used ones while their estimated size stays under `max_bytes`. Evicting a model
+only drops the cache's reference: requests already holding it finish normally.
+
+    cache = ModelCache(load_engine, max_bytes=64 * 2**20)
+    engine = await cache.get("customer-42")     # UnknownModel for an id without a model directory
+    cache.stats()                               # hits, misses, evictions, bytes, loaded ids
+
+"""
+import asyncio
+from collections import OrderedDict
+import logging
+import re
+from typing import Any, Callable
+
+# ids name a directory: no separators, no leading dot (no "..")
+MODEL_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,127}$")
+# Python objects, tensor headers and the engine's attributes, on top of the weight buffers
+ENTRY_OVERHEAD_BYTES = 4096
+
+
+class UnknownModel(KeyError):
+    """ Raised for a model id that is invalid or has no model directory; the API answers 404. """
+
+
+def engine_nbytes(engine: Any) -> int:
+    """ Estimated memory held by a LinearInferenceEngine: its weight buffers plus a fixed per-model overhead. """
+    buffers = (engine.weight_t, engine.weight_vec, engine.bias)
+    return ENTRY_OVERHEAD_BYTES + sum(b.nbytes if hasattr(b, "nbytes") else b.numel() * b.element_size()
+                                      for b in buffers if b is not None)
+
+
+class ModelCache:
+    """
+    Models loaded on demand by id, least recently used evicted first.
+    Parameters:
+        load (callable): model id -> model; blocking, runs on a worker thread. Raises FileNotFoundError for unknown ids.
+        max_bytes (int): budget for the models held, as estimated by `sizeof`. The model just loaded is always
+            kept, even when it alone exceeds the budget. 0 means no limit.
+        sizeof (callable): model -> estimated bytes.
+    """
+    def __init__(self, load: Callable[[str], Any], max_bytes: int = 0, sizeof: Callable[[Any], int] = engine_nbytes,
+                 logger: logging.Logger | None = None):
+        self.load = load
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.logger = logger or logging.getLogger(__name__)
+        self.models: OrderedDict[str, tuple[Any, int]] = OrderedDict()  # id -> (model, bytes), oldest first
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._loading: dict[str, asyncio.Future] = {}
+
+    def __contains__(self, model_id: str) -> bool:
+        return model_id in self.models
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+    async def get(self, model_id: str) -> Any:
+        """ The model for `model_id`, loaded on a miss; raises UnknownModel. """
+        entry = self.models.get(model_id)
+        if entry is not None:
+            self.models.move_to_end(model_id)
+            self.hits += 1
+            return entry[0]
+        if not MODEL_ID_PATTERN.match(model_id):
+            raise UnknownModel(model_id)
+        self.misses += 1
+        pending = self._loading.get(model_id)
+        if pending is not None:
+            # another request is loading this model already
+            return await asyncio.shield(pending)
+        pending = self._loading[model_id] = asyncio.get_running_loop().create_future()
+        try:
+            model = await asyncio.to_thread(self.load, model_id)
+        except FileNotFoundError as e:
+            error = UnknownModel(model_id)
+            error.__cause__ = e
+            pending.set_exception(error)
+            raise error
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        except BaseException:
+            pending.cancel()  # e.g. the request was cancelled; waiting requests fail and retry on their next request
+            raise
+        else:
+            pending.set_result(model)
+            self._add(model_id, model)
+            return model
+        finally:
+            del self._loading[model_id]
+            if not pending.cancelled():
+                pending.exception()  # mark it retrieved: no "exception was never retrieved" warning without waiters
+
+    def _add(self, model_id: str, model: Any) -> None:
+        size = self.sizeof(model)
+        self.models[model_id] = (model, size)
+        self.nbytes += size
+        while self.max_bytes and self.nbytes > self.max_bytes and len(self.models) > 1:
+            evicted, (_, evicted_size) = self.models.popitem(last=False)
+            self.nbytes -= evicted_size
+            self.evictions += 1
+            self.logger.info(f"Evicted model {evicted} from the model cache ({evicted_size} bytes)")
+
+    def evict(self, model_id: str) -> bool:
+        """ Drop one model, e.g. after its files were replaced; the next request loads it again. """
+        entry = self.models.pop(model_id, None)
+        if entry is None:
+            return False
+        self.nbytes -= entry[1]
+        return True
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "models": len(self.models),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else None,
+            "loaded": list(self.models),  # least recently used first
+            }
@@ -0,0 +1,70 @@
+"""
+Load the trained model for serving, the same way in the API process and in the `serve.py` launcher, from
+`path.model_dir` or from a version directory of the model registry (which holds the same files).
+`load_linear_engine` loads the weights of any LinearRegressionModel straight into an inference engine,
+with the dimensions read from the weights (the /models/{id} models and the process pool workers).
+
+The TorchScript artifact is preferred when it exists, otherwise the state dict is loaded into a
+LinearRegressionModel. The feature normalizer saved at training time, if any, is folded into the linear
+layer, so the returned model takes raw request features.
+
+"""
+import logging
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+
+from src.model_demo.configs.config import MetadataConfigSchema
+from src.model_demo.configs.config import LinearRegressionModel as LR
+from src.model_demo.inference import LinearInferenceEngine
+from src.model_demo.normalization import FeatureNormalizer
+
+
+def load_trained_model(cfg: MetadataConfigSchema, device: str = "cpu", logger: logging.Logger | None = None,
+                       model_dir: str | Path | None = None) -> nn.Module:
+    """
+    The trained model in eval mode on `device`, normalizer folded in; raises RuntimeError when there is none.
+    model_dir defaults to cfg.path.model_dir.
+    """
+    logger = logger or logging.getLogger(__name__)
+    model_dir = Path(model_dir or cfg.path.model_dir)
+    scripted_path = model_dir / cfg.fname.scripted_model_fname
+    if scripted_path.exists():
+        # the TorchScript artifact exported at training time carries its own graph and weights
+        model = torch.jit.load(scripted_path, map_location=device)
+        logger.info(f"Loaded TorchScript model: {scripted_path}")
+    else:
+        # create an instance of the same model first
+        model = LR(2,1)
+
+        # Load the trained model weights, weights_only=True as a best practice.
+        try:
+            model.load_state_dict(torch.load(model_dir / cfg.fname.model_fname, weights_only=True))
+        except FileNotFoundError:
+            logger.error("Model file not found")
+            raise RuntimeError("Model file not found")
+    model.to(device)
+    model.eval()  # Set to evaluate mode
+
+    normalizer_path = model_dir / cfg.fname.normalizer_fname
+    if normalizer_path.exists():
+        # the model was trained on standardized features: fold the saved training statistics into its linear
+        # layer once, so raw request features are scaled exactly like the training data at no per-request cost
+        FeatureNormalizer.load(normalizer_path).fold_into_model(model)
+        logger.info(f"Folded feature normalizer into the model: {normalizer_path}")
+    return model
+
+def load_linear_engine(model_path: str | Path, normalizer_path: str | Path | None = None, backend: str = "torch",
+                       device: str = "cpu", input_dim: int | None = None, output_dim: int | None = None) -> LinearInferenceEngine:
+    """
+    A LinearInferenceEngine for the state dict at model_path, normalizer folded in when normalizer_path exists.
+    input_dim/output_dim default to the shape of the saved weights.
+    """
+    state_dict = torch.load(model_path, weights_only=True, map_location="cpu")
+    weight_output_dim, weight_input_dim = state_dict["linear.weight"].shape
+    model = LR(input_dim or weight_input_dim, output_dim or weight_output_dim)
+    model.load_state_dict(state_dict)
+    if normalizer_path is not None and Path(normalizer_path).exists():
+        FeatureNormalizer.load(normalizer_path).fold_into_model(model)
+    return LinearInferenceEngine.from_model(model, backend=backend, device=device)
@@ -0,0 +1,164 @@
+"""
+Versioned models held by the API, hot-swapped from the model registry.
+
+`ModelStore` keeps the loaded versions and the one that serves unpinned requests (`current`). A background
+task polls the registry's LATEST pointer every `poll_s` seconds; when it changes, the new version is loaded
+and warmed up on a worker thread while the old one keeps serving, then `current` is swapped in a single
+assignment. Requests take a reference to their `ServedModel` when they start, so the ones in flight
+finish on the version they started with, and each version's micro-batcher drains its queue before it is
+stopped. A request can pin a version (`version` query parameter or `X-Model-Version` header); versions
+other than the current one are loaded on first use and released at the next swap.
+
+Without a registry (or with an empty one) the model in `path.model_dir` is served as version "local".
+
+    store = ModelStore(build_served_model, registry, fallback_dir=cfg.path.model_dir, poll_s=1.0)
+    store.install(store.load(store.initial_version()))   # startup, on a worker thread
+    served = await store.get(version=None)               # per request; served.version goes in the response
+
+"""
+import asyncio
+from dataclasses import dataclass, field
+import logging
+from pathlib import Path
+from typing import Any, Callable
+
+from src.model_demo.registry import ModelRegistry
+from src.model_demo.web_service.batching import MicroBatcher
+
+LOCAL_VERSION = "local"
+
+
+class UnknownModelVersion(KeyError):
+    """ Raised for a pinned version that is not in the registry; the API answers 404. """
+
+
+@dataclass
+class ServedModel:
+    """ One loaded model version, ready to predict. """
+    version: str
+    model_dir: Path
+    model: Any
+    predict_fn: Callable
+    timings: dict = field(default_factory=dict)
+    batcher: MicroBatcher | None = None
+
+
+class ModelStore:
+    """
+    Loaded model versions and the one serving unpinned requests.
+    Parameters:
+        build (callable): (version, model_dir) -> ServedModel; loads and warms up a model, runs on a worker thread.
+        registry (ModelRegistry): where versions come from; None serves fallback_dir only.
+        fallback_dir (Path): model directory served as LOCAL_VERSION when the registry has no versions.
+        make_batcher (callable): ServedModel -> MicroBatcher for its /predict requests; None disables batching.
+        poll_s (float): seconds between checks of the registry's LATEST pointer; 0 disables hot reload.
+        on_swap (callable): called with the new ServedModel after every swap, e.g. to clear caches of the old one.
+    """
+    def __init__(self, build: Callable[[str, Path], ServedModel], registry: ModelRegistry | None,
+                 fallback_dir: str | Path, make_batcher: Callable[[ServedModel], MicroBatcher] | None = None,
+                 poll_s: float = 1.0, on_swap: Callable[[ServedModel], None] | None = None,
+                 logger: logging.Logger | None = None):
+        self.build = build
+        self.registry = registry
+        self.fallback_dir = Path(fallback_dir)
+        self.make_batcher = make_batcher
+        self.poll_s = poll_s
+        self.on_swap = on_swap
+        self.logger = logger or logging.getLogger(__name__)
+        self.current: ServedModel | None = None
+        self.loaded: dict[str, ServedModel] = {}
+        self.swaps = 0
+        self._failed_version = None
+        self._watcher: asyncio.Task | None = None
+        self._retiring: set[asyncio.Task] = set()
+
+    def initial_version(self) -> str:
+        latest = self.registry.latest() if self.registry is not None else None
+        return latest or LOCAL_VERSION
+
+    def load(self, version: str) -> ServedModel:
+        """ Load (blocking) one version; registry versions are checked against their recorded checksums first. """
+        if version == LOCAL_VERSION:
+            return self.build(version, self.fallback_dir)
+        if self.registry is None or version not in self.registry:
+            raise UnknownModelVersion(version)
+        self.registry.verify(version)
+        return self.build(version, self.registry.path(version))
+
+    def install(self, served: ServedModel) -> None:
+        """ Make `served` the current version. """
+        self.loaded[served.version] = served
+        self.current = served
+
+    async def get(self, version: str | None = None) -> ServedModel:
+        """ The current version, or the pinned one (loaded on first use). """
+        served = self.current if version is None or version == self.current.version else self.loaded.get(version)
+        if served is None:
+            if version != LOCAL_VERSION and (self.registry is None or version not in self.registry):
+                raise UnknownModelVersion(version)
+            served = await asyncio.to_thread(self.load, version)
+            served = self.loaded.setdefault(version, served)
+        if self.make_batcher is not None and served.batcher is None:
+            served.batcher = self.make_batcher(served)
+            await served.batcher.start()
+        return served
+
+    async def activate(self, version: str) -> ServedModel:
+        """ Load and warm up `version` off the event loop, swap it in, then retire the other loaded versions. """
+        served = self.loaded.get(version) or await asyncio.to_thread(self.load, version)
+        previous = self.current
+        self.install(served)  # from here on new requests get the new version
+        self.swaps += 1
+        if self.on_swap is not None:
+            self.on_swap(served)
+        self.logger.info(f"Serving model version {version} (was {previous.version if previous else None})")
+        for old in [v for v in self.loaded.values() if v is not served]:
+            del self.loaded[old.version]
+            if old.batcher is not None:
+                # the batcher flushes the rows already queued; requests in flight keep their reference
+                task = asyncio.create_task(old.batcher.stop())
+                self._retiring.add(task)
+                task.add_done_callback(self._retiring.discard)
+        return served
+
+    async def check_registry(self) -> None:
+        """ Swap in the registry's LATEST version if it changed; a version that fails to load is skipped. """
+        latest = self.registry.latest() if self.registry is not None else None
+        if latest is None or latest == self.current.version or latest == self._failed_version:
+            return
+        try:
+            await self.activate(latest)
+        except Exception as e:
+            self._failed_version = latest
+            self.logger.error(f"Could not load model version {latest}, still serving {self.current.version}: {e}")
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_s)
+            if self.current is not None:
+                await self.check_registry()
+
+    def start(self) -> None:
+        """ Start watching the registry; has to be called from the server's event loop. """
+        if self._watcher is None and self.registry is not None and self.poll_s > 0:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
+            self._watcher = None
+        for served in list(self.loaded.values()):
+            if served.batcher is not None:
+                await served.batcher.stop()
+        if self._retiring:
+            await asyncio.gather(*self._retiring)
+
+    def status(self) -> dict:
+        return {
+            "current": self.current.version if self.current else None,
+            "loaded": list(self.loaded),
+            "latest": self.registry.latest() if self.registry is not None else None,
+            "versions": self.registry.versions() if self.registry is not None else [],
+            "swaps": self.swaps,
+            }
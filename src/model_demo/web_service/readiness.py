@@ -0,0 +1,78 @@
+"""
+Background model loading and the readiness state behind `/ready`.
+
+Loading the weights and warming up the first forward pass used to happen while `fast_api` was imported, so
+a new replica could not answer anything, not even a health check, until it was done. `Readiness.start` runs
+the loader on a worker thread once the server is up instead: the process binds its port right away, `/ready`
+answers 503 until the model is loaded and warmed (or loading failed) and 200 afterwards, and prediction
+requests that arrive in between wait for it, up to a timeout.
+
+    readiness = Readiness(load_and_warm_up)  # the loader returns a dict of timings
+    readiness.start()                   # in the lifespan handler
+    await readiness.wait(timeout_s=30)  # in an endpoint; raises ModelNotReadyError on timeout or failure
+    readiness.status()                  # {"ready": True, "error": None, "ready_after_s": ..., "load_s": ..., "warmup_s": ...}
+
+"""
+import asyncio
+import time
+from typing import Callable
+
+
+class ModelNotReadyError(RuntimeError):
+    """ Raised when the model is still loading after the wait timeout, or failed to load. """
+
+
+class Readiness:
+    """ Tracks a loader run on a worker thread; ready once it has returned without raising. """
+    def __init__(self, loader: Callable[[], dict]):
+        self.loader = loader
+        self.created = time.perf_counter()
+        self.ready_after_s = None
+        self.timings: dict = {}
+        self.error: BaseException | None = None
+        self._done: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self._done is not None and self._done.is_set() and self.error is None
+
+    def start(self) -> None:
+        """ Run the loader on a worker thread, once; has to be called from the server's event loop. """
+        if self._task is not None:
+            return
+        self._done = asyncio.Event()
+        self._task = asyncio.create_task(self._load())
+
+    async def _load(self) -> None:
+        try:
+            self.timings = await asyncio.to_thread(self.loader) or {}
+        except Exception as e:
+            self.error = e
+        finally:
+            self.ready_after_s = time.perf_counter() - self.created
+            self._done.set()
+
+    async def wait(self, timeout_s: float | None = None) -> None:
+        """ Return once the model is ready; raise ModelNotReadyError if it is not ready within timeout_s. """
+        # without a lifespan handler (e.g. an in-process ASGI client) the first request starts loading
+        self.start()
+        if not self._done.is_set():
+            try:
+                await asyncio.wait_for(asyncio.shield(self._done.wait()), timeout_s)
+            except TimeoutError:
+                raise ModelNotReadyError(f"Model is still loading after {timeout_s}s")
+        if self.error is not None:
+            raise ModelNotReadyError(f"Model failed to load: {self.error}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            await asyncio.wait([self._task])
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "error": None if self.error is None else str(self.error),
+            "ready_after_s": self.ready_after_s,
+            **self.timings,
+            }
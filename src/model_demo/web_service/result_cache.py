@@ -0,0 +1,119 @@
+"""
+In-process cache of prediction results for repeated feature vectors.
+
+Much of the /predict traffic repeats the same rows. `PredictionCache` maps (model version, exact float32
+bytes of a row) to its prediction, bounded by `max_entries` (least recently used evicted first) and
+optionally by age (`ttl_s`). `/predict` answers a hit without going through the micro-batcher or the
+executor; `/batch_predict` looks every row up, runs the model on the misses only and merges the results
+back in request order. The API clears the cache whenever a new model version is swapped in.
+
+The latency saved is estimated from the measured inference time of the misses: per request for single
+rows (/predict, where a miss also waits for its micro-batch) and per row for batches.
+
+    cache = PredictionCache(max_entries=100_000, ttl_s=300)
+    keys = row_keys(rows)                                  # rows: (n_rows, n_features) float32
+    values, missing = cache.lookup(version, keys)          # values[i] is None for the rows in `missing`
+    cache.store(version, [keys[i] for i in missing], predictions_of_missing_rows)
+
+"""
+from collections import OrderedDict
+import time
+from typing import Callable
+
+import numpy as np
+
+
+def row_keys(rows: np.ndarray) -> list[bytes]:
+    """ One hashable key per row: its raw float32 bytes, so only identical feature values match. """
+    rows = np.ascontiguousarray(rows, dtype=np.float32)
+    return rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))).ravel().tolist()
+
+
+class PredictionCache:
+    """
+    Bounded LRU/TTL cache of single-output predictions keyed by model version and row.
+    Parameters:
+        max_entries (int): rows kept; the least recently used are evicted first.
+        ttl_s (float): seconds an entry stays valid, 0 for no expiry.
+        clock (callable): monotonic time source, replaceable in tests.
+    """
+    def __init__(self, max_entries: int, ttl_s: float = 0.0, clock: Callable[[], float] = time.monotonic):
+        if max_entries <= 0:
+            raise ValueError(f"max_entries should be a positive integer, got {max_entries}")
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.clock = clock
+        self.entries: OrderedDict[tuple[str, bytes], tuple[float, float]] = OrderedDict()  # key -> (value, stored at)
+        self.hits = self.misses = self.evictions = self.expired = self.invalidations = 0
+        # measured inference time of the misses, [seconds, rows] for single-row calls and for batches
+        self._single = [0.0, 0]
+        self._batch = [0.0, 0]
+        self.latency_saved_s = 0.0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, version: str, keys: list[bytes]) -> tuple[list[float | None], list[int]]:
+        """ Cached values for `keys` (None for misses) and the positions of the misses, in order. """
+        values, missing = [], []
+        entries, now = self.entries, self.clock()
+        for i, key in enumerate(keys):
+            entry = entries.get((version, key))
+            if entry is not None and self.ttl_s and now - entry[1] > self.ttl_s:
+                del entries[(version, key)]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                values.append(None)
+                missing.append(i)
+            else:
+                entries.move_to_end((version, key))
+                values.append(entry[0])
+        hits = len(keys) - len(missing)
+        self.hits += hits
+        self.misses += len(missing)
+        if hits:
+            self.latency_saved_s += hits * self._per_row_s(len(keys) == 1)
+        return values, missing
+
+    def store(self, version: str, keys: list[bytes], values) -> None:
+        now, entries = self.clock(), self.entries
+        for key, value in zip(keys, values):
+            entries[(version, key)] = (value, now)
+            entries.move_to_end((version, key))
+        overflow = len(entries) - self.max_entries
+        for _ in range(max(overflow, 0)):
+            entries.popitem(last=False)
+        self.evictions += max(overflow, 0)
+
+    def record_inference(self, seconds: float, rows: int) -> None:
+        """ Time spent computing `rows` missed rows; the basis of the latency-saved estimate. """
+        measured = self._single if rows == 1 else self._batch
+        measured[0] += seconds
+        measured[1] += rows
+
+    def _per_row_s(self, single: bool) -> float:
+        seconds, rows = self._single if single else self._batch
+        if not rows:
+            seconds, rows = self._batch if single else self._single
+        return seconds / rows if rows else 0.0
+
+    def invalidate(self) -> None:
+        """ Drop every entry, e.g. when a new model version starts serving. """
+        self.entries.clear()
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else None,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "invalidations": self.invalidations,
+            "latency_saved_s": self.latency_saved_s,
+            }
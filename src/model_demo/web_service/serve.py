@@ -0,0 +1,62 @@
+"""
+Multi-worker launcher for the web service.
+
+`fastapi run` starts one process. This launcher loads the trained model once, publishes its weights to
+shared memory (see shared_weights.py) and starts uvicorn with several worker processes that map those
+weights instead of loading their own copies. Every worker gets cores // workers torch threads (or
+--threads-per-worker), so N workers together do not start N times as many compute threads as there are cores.
+
+    python -m src.model_demo.web_service.serve                       # serving.workers from the config
+    python -m src.model_demo.web_service.serve --workers 4 --port 8000
+    python -m src.model_demo.web_service.serve --workers 4 --threads-per-worker 2
+
+"""
+import argparse
+import os
+
+from src.model_demo.configs.config import MetadataConfigSchema
+from src.model_demo.inference import worker_threads
+from src.model_demo.web_service.shared_weights import (NUM_THREADS_ENV, SHARED_VERSION_ENV, SHARED_WEIGHTS_ENV,
+                                                       publish_weights, remove_weights)
+
+APP = "src.model_demo.web_service.fast_api:app"
+
+
+def main() -> None:
+    cfg = MetadataConfigSchema()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=cfg.serving.workers)
+    parser.add_argument("--threads-per-worker", type=int, default=cfg.serving.threads_per_worker)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", 8000)))
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error(f"--workers should be a positive integer, got {args.workers}")
+
+    import uvicorn
+
+    from src.model_demo.registry import ModelRegistry
+    from src.model_demo.web_service.model_loading import load_trained_model
+    from src.model_demo.web_service.model_store import LOCAL_VERSION
+
+    # the registry's LATEST version if there is one; versions published later are loaded by each worker itself
+    registry = ModelRegistry(cfg.path.registry_dir)
+    version = registry.latest() or LOCAL_VERSION
+    model_dir = registry.path(version) if version != LOCAL_VERSION else None
+
+    # the workers are new processes that import fast_api; they find the weights and thread count in the environment
+    weights_dir = publish_weights(load_trained_model(cfg, model_dir=model_dir))
+    threads = worker_threads(args.workers, args.threads_per_worker)
+    os.environ[SHARED_WEIGHTS_ENV] = str(weights_dir)
+    os.environ[SHARED_VERSION_ENV] = version
+    os.environ[NUM_THREADS_ENV] = str(threads)
+    # OpenMP and MKL read these when a thread first runs parallel code, including threads created after startup
+    os.environ["OMP_NUM_THREADS"] = os.environ["MKL_NUM_THREADS"] = str(threads)
+    print(f"Serving {APP} with {args.workers} workers x {threads} threads, model version {version} shared from {weights_dir}")
+    try:
+        uvicorn.run(APP, host=args.host, port=args.port, workers=args.workers)
+    finally:
+        remove_weights(weights_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Model weights shared by every serving worker through memory-mapped files.
+
+With several uvicorn worker processes, each one used to load and keep its own copy of the weights. With
+`serve.py` the parent process loads the model once (normalizer folded in), writes the weights with
+`publish_weights` as raw `.npy` files, in /dev/shm when it exists, and passes the directory to the workers
+in the `MODEL_DEMO_SHARED_WEIGHTS` environment variable. `attach_weights` memory-maps those files and wraps
+them as the parameters of a LinearRegressionModel without copying, so all workers read the same physical
+pages.
+
+The weight is stored transposed, (input_dim, output_dim) like the inference engine keeps it, so the engine
+built from the attached model uses the mapped buffer as is.
+
+    directory = publish_weights(model)                   # parent, once
+    model = attach_weights(directory)                    # every worker
+    engine = LinearInferenceEngine.from_model(model)     # still backed by the shared pages
+
+"""
+import os
+from pathlib import Path
+import shutil
+import tempfile
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from src.model_demo.configs.config import LinearRegressionModel as LR
+
+SHARED_WEIGHTS_ENV = "MODEL_DEMO_SHARED_WEIGHTS"
+NUM_THREADS_ENV = "MODEL_DEMO_NUM_THREADS"
+SHARED_VERSION_ENV = "MODEL_DEMO_SHARED_VERSION"  # the model version the shared weights belong to
+WEIGHT_T_FNAME = "weight_t.npy"
+BIAS_FNAME = "bias.npy"
+
+
+def publish_weights(model: nn.Module, directory: str | Path | None = None) -> Path:
+    """ Write `model.linear`'s weights for the workers to attach to; returns the directory (created if needed). """
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix="model_demo_weights_", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    linear = model.linear
+    weight_t = linear.weight.detach().cpu().numpy().astype(np.float32).T
+    bias = linear.bias.detach().cpu().numpy().astype(np.float32)
+    # write then rename, so a worker never maps a half-written file
+    for fname, array in ((WEIGHT_T_FNAME, np.ascontiguousarray(weight_t)), (BIAS_FNAME, bias)):
+        tmp_path = directory / f"{fname}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, directory / fname)
+    return directory
+
+def attach_weights(directory: str | Path) -> LR:
+    """ A LinearRegressionModel whose parameters are memory-mapped views of the published weight files. """
+    directory = Path(directory)
+    # copy-on-write mapping: pages stay shared with the other workers, torch gets a writable buffer
+    weight_t = np.load(directory / WEIGHT_T_FNAME, mmap_mode="c")
+    bias = np.load(directory / BIAS_FNAME, mmap_mode="c")
+    input_dim, output_dim = weight_t.shape
+    model = LR(input_dim, output_dim)
+    model.linear.weight = nn.Parameter(torch.from_numpy(weight_t).T, requires_grad=False)
+    model.linear.bias = nn.Parameter(torch.from_numpy(bias), requires_grad=False)
+    return model.eval()
+
+def remove_weights(directory: str | Path) -> None:
+    shutil.rmtree(directory, ignore_errors=True)
+
+def set_worker_threads(num_threads: int) -> None:
+    """
+    Limit torch's intra-op threads in this process, e.g. cores // workers so workers do not oversubscribe the
+    CPU. OpenMP reads the limit per thread, so the launcher also sets OMP_NUM_THREADS for threads started later.
+    """
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
@@ -0,0 +1,161 @@
+"""
+Incremental request decoding for the streaming batch endpoint (`/batch_predict/stream`).
+
+`/batch_predict` needs the whole batch in one body and answers with one list. The streaming endpoint reads
+the body as it arrives and regroups it into fixed-size chunks of rows, so the server only ever holds about
+one chunk of input (plus the partial line or row that straddles two network reads) regardless of the
+total input size.
+
+    application/x-ndjson       one row per line, either [X_1, X_2] or {"feature_X_1": ..., "feature_X_2": ...}
+    application/octet-stream   little-endian float32 rows, two values per row, no header needed
+
+Rows are validated with the same rules as `/batch_predict` (two int/float features, finite values). A chunk
+is validated in one Pydantic pass; when that fails its lines are validated one by one, so the error names the
+row that failed and the rows before it are still predicted. An NDJSON line longer than `max_line_bytes` is an
+error too, so a body without newlines cannot grow the pending line without bound.
+
+Errors after the status line has gone out (an invalid or truncated row, a full inference queue, a failed
+inference) cannot change the 200 status. An NDJSON response ends with an {"error": ..., "row": ...} line.
+A raw float32 response has no room for an in-band marker, so the server aborts it with `StreamAborted`:
+the connection closes without the terminating chunk, and HTTP clients report an incomplete body (e.g.
+httpx.RemoteProtocolError) instead of a short float32 body that looks complete.
+
+"""
+from typing import AsyncIterator, Iterator
+
+from fastapi.responses import StreamingResponse
+import numpy as np
+from pydantic import TypeAdapter, ValidationError
+from starlette.requests import ClientDisconnect
+import torch
+
+from src.model_demo.utils import PredictionFeatures
+from src.model_demo.web_service.codecs import N_FEATURES, as_input_array
+
+# the row type of PredictionFeaturesBatch.input_data, or the body of a single /predict request
+_rows_adapter = TypeAdapter(list[tuple[int | float, int | float] | PredictionFeatures])
+
+_row_adapter = TypeAdapter(tuple[int | float, int | float] | PredictionFeatures)
+
+_ROW_BYTES = N_FEATURES * 4
+MAX_LINE_BYTES = 64 * 1024
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that can send while the request body is still being read.
+    Starlette's StreamingResponse watches `receive` for client disconnects while it sends, which would
+    swallow request body chunks the response generator still needs. Here only the body reader calls
+    `receive`, and a disconnect surfaces there as ClientDisconnect.
+    """
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+
+class StreamAborted(RuntimeError):
+    """ Raised from a raw float32 response stream to abort the connection instead of ending the body cleanly. """
+
+
+class StreamDecodeError(ValueError):
+    """ A row of the streamed body is invalid; `row` is its 0-based position in the stream. """
+    def __init__(self, message: str, row: int):
+        super().__init__(message)
+        self.row = row
+
+
+def _rows_to_tensor(rows: list) -> torch.Tensor:
+    """ Validated rows (tuples or PredictionFeatures) as a float32 tensor; ValueError for non-finite values. """
+    array = np.array(
+        [(row.feature_X_1, row.feature_X_2) if isinstance(row, PredictionFeatures) else row for row in rows],
+        dtype=np.float32,
+        ).reshape(-1, N_FEATURES)
+    return torch.from_numpy(as_input_array(array))
+
+def _parse_ndjson_lines(lines: list[bytes], first_row: int) -> tuple[torch.Tensor, StreamDecodeError | None]:
+    """
+    Validate a chunk of NDJSON lines in one Pydantic pass and stack them into a float32 tensor. If the chunk
+    is invalid, returns the rows before the first invalid line and the error for that line.
+    """
+    try:
+        return _rows_to_tensor(_rows_adapter.validate_json(b"[" + b",".join(lines) + b"]")), None
+    except (ValidationError, ValueError):
+        pass
+    # JSON syntax errors carry no row position: find the failing line one by one
+    rows = []
+    for offset, line in enumerate(lines):
+        try:
+            row = _row_adapter.validate_json(line)
+            _rows_to_tensor([row])
+        except ValidationError as e:
+            return _rows_to_tensor(rows), StreamDecodeError(f"Invalid row: {e.errors(include_url=False)[0]['msg']}", first_row + offset)
+        except ValueError as e:
+            return _rows_to_tensor(rows), StreamDecodeError(str(e), first_row + offset)
+        rows.append(row)
+    return _rows_to_tensor(rows), None
+
+def _ndjson_chunk(lines: list[bytes], first_row: int) -> Iterator[torch.Tensor]:
+    """ The valid rows of a chunk, then its error, if any. """
+    inputs, error = _parse_ndjson_lines(lines, first_row)
+    if len(inputs):
+        yield inputs
+    if error is not None:
+        raise error
+
+async def ndjson_chunks(stream: AsyncIterator[bytes], chunk_rows: int,
+                        max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[torch.Tensor]:
+    """ Regroup an NDJSON byte stream into (<= chunk_rows, 2) float32 tensors. """
+    pending, lines, first_row = b"", [], 0
+    async for data in stream:
+        pending += data
+        *complete, pending = pending.split(b"\n")
+        too_long = len(pending) > max_line_bytes
+        for line in complete:
+            line = line.strip()
+            if not line:
+                continue
+            if len(line) > max_line_bytes:
+                too_long = True
+                break
+            lines.append(line)
+            if len(lines) == chunk_rows:
+                for inputs in _ndjson_chunk(lines, first_row):
+                    yield inputs
+                first_row += len(lines)
+                lines = []
+        if too_long:
+            # a line too long to be a row: predict the rows before it, then stop
+            for inputs in _ndjson_chunk(lines, first_row):
+                yield inputs
+            raise StreamDecodeError(f"Line longer than {max_line_bytes} bytes", first_row + len(lines))
+    if pending.strip():
+        lines.append(pending.strip())
+    if lines:
+        for inputs in _ndjson_chunk(lines, first_row):
+            yield inputs
+
+async def binary_chunks(stream: AsyncIterator[bytes], chunk_rows: int) -> AsyncIterator[torch.Tensor]:
+    """ Regroup a raw little-endian float32 byte stream into (<= chunk_rows, 2) float32 tensors. """
+    chunk_bytes = chunk_rows * _ROW_BYTES
+    pending, first_row = bytearray(), 0
+    async for data in stream:
+        pending += data
+        while len(pending) >= chunk_bytes:
+            yield _binary_rows(pending[:chunk_bytes], first_row)
+            del pending[:chunk_bytes]
+            first_row += chunk_rows
+    if len(pending) % _ROW_BYTES:
+        raise StreamDecodeError(f"Body is not a whole number of {N_FEATURES} x float32 rows", first_row + len(pending) // _ROW_BYTES)
+    if pending:
+        yield _binary_rows(pending, first_row)
+
+def _binary_rows(data: bytearray, first_row: int) -> torch.Tensor:
+    array = np.frombuffer(data, dtype="<f4").reshape(-1, N_FEATURES)
+    try:
+        return torch.from_numpy(as_input_array(array))
+    except ValueError as e:
+        raise StreamDecodeError(str(e), first_row)